@@ -0,0 +1,259 @@
+"""
+Generator of synthetic Solidity projects for benchmarking the contract cross reference printers.
+
+    python -m benchmarks.corpus OUT_DIR --contracts 1000 --inheritance-depth 6 --imports barrel
+"""
+from __future__ import annotations
+
+import random
+from pathlib import Path
+from typing import Dict, List, NamedTuple
+
+import rich_click as click
+
+IMPORT_TOPOLOGIES = ("direct", "chain", "barrel")
+
+
+class CorpusParameters(NamedTuple):
+    contracts: int = 100
+    # longest chain of contract inheritance, 1 means no inheritance
+    inheritance_depth: int = 4
+    # maximum number of direct base contracts
+    inheritance_fan_out: int = 2
+    interface_ratio: float = 0.2
+    abstract_ratio: float = 0.1
+    library_ratio: float = 0.05
+    # external calls through casts like `VulnerableTokenStore(addr).deposit(1)` per contract
+    calls_per_contract: int = 3
+    # casts without a call on the result like `VulnerableTokenStore store = VulnerableTokenStore(addr);` per contract
+    casts_per_contract: int = 1
+    # state variables of a contract type per contract
+    references_per_contract: int = 1
+    contracts_per_file: int = 1
+    # direct: every file imports the files it uses, chain: every file imports the previous one,
+    # barrel: every file imports one file re-exporting everything (an import cycle)
+    import_topology: str = "direct"
+    seed: int = 0
+    pragma: str = "^0.8.0"
+
+
+class _Contract(NamedTuple):
+    index: int
+    kind: str
+    file: int
+    bases: List[int]
+    calls: List[int]
+    casts: List[int]
+    references: List[int]
+
+
+def _name(contract: _Contract) -> str:
+    prefix = {"interface": "I", "library": "L", "abstract": "A", "contract": "C"}[contract.kind]
+    return f"{prefix}{contract.index}"
+
+
+def _plan(parameters: CorpusParameters) -> List[_Contract]:
+    rng = random.Random(parameters.seed)
+    contracts: List[_Contract] = []
+    depths: List[int] = []
+    for i in range(parameters.contracts):
+        r = rng.random()
+        if r < parameters.interface_ratio:
+            kind = "interface"
+        elif r < parameters.interface_ratio + parameters.library_ratio:
+            kind = "library"
+        elif r < parameters.interface_ratio + parameters.library_ratio + parameters.abstract_ratio:
+            kind = "abstract"
+        else:
+            kind = "contract"
+
+        bases: List[int] = []
+        calls: List[int] = []
+        casts: List[int] = []
+        references: List[int] = []
+        if kind in {"contract", "abstract"}:
+            # base lists sorted by index keep every C3 linearization consistent with the declaration order
+            candidates = [
+                c.index
+                for c in contracts[-50:]
+                if c.kind in {"contract", "abstract"} and depths[c.index] < parameters.inheritance_depth
+            ]
+            count = rng.randint(0, min(parameters.inheritance_fan_out, len(candidates)))
+            bases = sorted(rng.sample(candidates, count))
+
+            callable_contracts = [c.index for c in contracts if c.kind != "library"]
+            libraries = [c.index for c in contracts if c.kind == "library"]
+            for _ in range(parameters.calls_per_contract):
+                if libraries and rng.random() < 0.2:
+                    calls.append(rng.choice(libraries))
+                elif callable_contracts:
+                    calls.append(rng.choice(callable_contracts))
+            for _ in range(parameters.references_per_contract):
+                if callable_contracts:
+                    references.append(rng.choice(callable_contracts))
+            # drawn last so that the other references do not depend on the cast density
+            for _ in range(parameters.casts_per_contract):
+                if callable_contracts:
+                    casts.append(rng.choice(callable_contracts))
+
+        depths.append(1 + max((depths[base] for base in bases), default=0))
+        contracts.append(_Contract(i, kind, i // parameters.contracts_per_file, bases, calls, casts, references))
+    return contracts
+
+
+def _source(contract: _Contract, contracts: List[_Contract]) -> List[str]:
+    name = _name(contract)
+    i = contract.index
+    if contract.kind == "interface":
+        return [f"interface {name} {{", f"    function f{i}(uint256 x) external returns (uint256);", "}"]
+    if contract.kind == "library":
+        return [
+            f"library {name} {{",
+            f"    function f{i}(uint256 x) internal pure returns (uint256) {{",
+            f"        return x + {i};",
+            "    }",
+            "}",
+        ]
+
+    header = f"abstract contract {name}" if contract.kind == "abstract" else f"contract {name}"
+    if contract.bases:
+        header += " is " + ", ".join(_name(contracts[base]) for base in contract.bases)
+    lines = [header + " {", f"    uint256 internal v{i};"]
+    for k, target in enumerate(contract.references):
+        lines.append(f"    {_name(contracts[target])} public r{i}_{k};")
+    lines += [
+        f"    function f{i}(uint256 x) external virtual returns (uint256) {{",
+        f"        return x + v{i};",
+        "    }",
+    ]
+    for k, target in enumerate(contract.calls):
+        target_contract = contracts[target]
+        if target_contract.kind == "library":
+            call = f"{_name(target_contract)}.f{target}(x)"
+        else:
+            call = f"{_name(target_contract)}(target).f{target}(x)"
+        lines += [
+            f"    function c{i}_{k}(address target, uint256 x) external returns (uint256) {{",
+            f"        return {call};",
+            "    }",
+        ]
+    for k, target in enumerate(contract.casts):
+        target_name = _name(contracts[target])
+        lines += [
+            f"    function k{i}_{k}(address target) external pure returns (address) {{",
+            f"        {target_name} t = {target_name}(target);",
+            "        return address(t);",
+            "    }",
+        ]
+    lines.append("}")
+    return lines
+
+
+def generate_corpus(root: Path, parameters: CorpusParameters = CorpusParameters()) -> List[Path]:
+    """
+    Write a project of `parameters.contracts` contracts to `root/src` and return the written files.
+    Output only depends on the parameters, so equal parameters and seed give an identical project.
+    """
+    if parameters.import_topology not in IMPORT_TOPOLOGIES:
+        raise ValueError(f"Unknown import topology: {parameters.import_topology}")
+
+    contracts = _plan(parameters)
+    files: Dict[int, List[_Contract]] = {}
+    for contract in contracts:
+        files.setdefault(contract.file, []).append(contract)
+
+    src = root / "src"
+    src.mkdir(parents=True, exist_ok=True)
+    written: List[Path] = []
+    for file, file_contracts in files.items():
+        if parameters.import_topology == "direct":
+            used_files = {
+                contracts[used].file
+                for contract in file_contracts
+                for used in contract.bases + contract.calls + contract.casts + contract.references
+            }
+            imports = [f"F{used_file}.sol" for used_file in sorted(used_files - {file})]
+        elif parameters.import_topology == "chain":
+            # importing a file also imports everything it imported itself
+            imports = [f"F{file - 1}.sol"] if file > 0 else []
+        else:
+            imports = ["All.sol"]
+
+        lines = ["// SPDX-License-Identifier: MIT", f"pragma solidity {parameters.pragma};", ""]
+        lines += [f'import "./{imported}";' for imported in imports]
+        for contract in file_contracts:
+            lines.append("")
+            lines += _source(contract, contracts)
+        path = src / f"F{file}.sol"
+        path.write_text("\n".join(lines) + "\n")
+        written.append(path)
+
+    if parameters.import_topology == "barrel":
+        lines = ["// SPDX-License-Identifier: MIT", f"pragma solidity {parameters.pragma};", ""]
+        lines += [f'import "./F{file}.sol";' for file in files]
+        path = src / "All.sol"
+        path.write_text("\n".join(lines) + "\n")
+        written.append(path)
+    return written
+
+
+_DEFAULTS = CorpusParameters()
+
+
+@click.command(name="corpus")
+@click.argument("out", type=click.Path(file_okay=False, writable=True))
+@click.option("--contracts", type=int, default=_DEFAULTS.contracts, help="Number of contracts")
+@click.option("--inheritance-depth", type=int, default=_DEFAULTS.inheritance_depth, help="Longest inheritance chain")
+@click.option("--inheritance-fan-out", type=int, default=_DEFAULTS.inheritance_fan_out, help="Maximum number of direct bases")
+@click.option("--interfaces", type=float, default=_DEFAULTS.interface_ratio, help="Ratio of interfaces")
+@click.option("--abstracts", type=float, default=_DEFAULTS.abstract_ratio, help="Ratio of abstract contracts")
+@click.option("--libraries", type=float, default=_DEFAULTS.library_ratio, help="Ratio of libraries")
+@click.option("--calls", type=int, default=_DEFAULTS.calls_per_contract, help="External calls per contract")
+@click.option("--casts", type=int, default=_DEFAULTS.casts_per_contract, help="Casts without a call per contract")
+@click.option("--references", type=int, default=_DEFAULTS.references_per_contract, help="Contract typed state variables per contract")
+@click.option("--contracts-per-file", type=int, default=_DEFAULTS.contracts_per_file, help="Contracts per source file")
+@click.option("--imports", type=click.Choice(IMPORT_TOPOLOGIES), default=_DEFAULTS.import_topology, help="Import topology")
+@click.option("--seed", type=int, default=_DEFAULTS.seed, help="Random seed")
+def main(
+    out: str,
+    contracts: int,
+    inheritance_depth: int,
+    inheritance_fan_out: int,
+    interfaces: float,
+    abstracts: float,
+    libraries: float,
+    calls: int,
+    casts: int,
+    references: int,
+    contracts_per_file: int,
+    imports: str,
+    seed: int,
+) -> None:
+    """
+    Generate a synthetic Solidity project.
+    """
+    written = generate_corpus(
+        Path(out),
+        CorpusParameters(
+            contracts,
+            inheritance_depth,
+            inheritance_fan_out,
+            interfaces,
+            abstracts,
+            libraries,
+            calls,
+            casts,
+            references,
+            contracts_per_file,
+            imports,
+            seed,
+        ),
+    )
+    click.echo(
+        f"Generated {len(written)} files in {Path(out) / 'src'} "
+        f"with {calls} external calls and {casts} casts per contract"
+    )
+
+
+if __name__ == "__main__":
+    main()
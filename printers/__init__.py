@@ -1,2 +1,4 @@
 from .contract_cross_reference import ContractCrossReferencePrinter
 from .contract_cross_reference_graph import ContractCrossReferenceGraphPrinter
+from .contract_cross_reference_cycles import ContractCrossReferenceCyclesPrinter
+from .contract_cross_reference_server import ContractCrossReferenceServerPrinter
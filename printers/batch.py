@@ -0,0 +1,401 @@
+"""
+Run one of the contract cross reference printers over many wake projects from a single pool of worker processes, so
+interpreter start, imports and solc installations are paid once per worker instead of once per project:
+
+    python -m printers.batch --projects-from repos.txt --jobs 8 --memory-limit 4096 \\
+        contract-cross-reference-graph --format csr
+
+Every project root holds its own `wake.toml` and gets its printer outputs in its own `.wake/` as with `wake print`.
+The console output and profile of every project and one aggregate `summary.json` are written to `--out`.
+"""
+from __future__ import annotations
+
+import gc
+import hashlib
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import contextmanager, redirect_stdout
+from multiprocessing import get_context
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Iterator, List, NamedTuple, Sequence, Tuple
+
+import rich_click as click
+from rich import print
+from rich.table import Table
+
+from .profiling import peak_rss
+from .reference_graph_session import drop_sessions
+
+STATUS_OK = "ok"
+STATUS_COMPILATION_FAILED = "compilation-failed"
+STATUS_OUT_OF_MEMORY = "out-of-memory"
+STATUS_FAILED = "failed"
+
+PRINTERS = ("contract-cross-reference", "contract-cross-reference-graph", "contract-cross-reference-cycles")
+
+
+class BatchTask(NamedTuple):
+    root: Path
+    printer: str
+    args: Tuple[str, ...]
+    # console output and profile of the project
+    out: Path
+    ignore_errors: bool
+
+
+class ProjectResult(NamedTuple):
+    root: str
+    status: str
+    seconds: float
+    # peak RSS of the worker process so far, it may have analysed other projects before
+    peak_rss: int | None
+    # profile report written by the printer, None when it did not finish
+    profile: Dict | None
+    error: str | None
+
+
+def project_out(out: Path, root: Path) -> Path:
+    """
+    Output directory of the project at `root`, stable across runs and unique for projects with the same directory name.
+    """
+    digest = hashlib.blake2b(str(root).encode(), digest_size=4).hexdigest()
+    return out / f"{root.name}-{digest}"
+
+
+def read_project_list(path: Path) -> List[Path]:
+    """
+    Project roots listed one per line, relative paths are relative to the list. Empty lines and `#` comments are
+    skipped.
+    """
+    roots = []
+    for line in path.read_text().splitlines():
+        line = line.split("#", 1)[0].strip()
+        if line:
+            roots.append((path.parent / line).resolve())
+    return roots
+
+
+def _load_printers(printer: str) -> None:
+    # wake loads printers once per process from the plugin paths of the first lookup, point it to this package
+    # instead of the printers/ directory of whichever project comes first
+    from wake.cli.print import run_print
+
+    command = run_print.get_command(  # pyright: ignore reportGeneralTypeIssues
+        None,  # pyright: ignore reportGeneralTypeIssues
+        printer,
+        plugin_paths=frozenset([Path(__file__).resolve().parent]),
+        verify_paths=False,
+    )
+    if command is None:
+        raise RuntimeError(f"Printer {printer} not found")
+
+
+# address space limit of the analysis in this worker, set by the pool initializer
+_memory_limit: int | None = None
+
+
+@contextmanager
+def limited_memory(memory_limit: int | None) -> Iterator[None]:
+    """
+    Limit the address space of the current process to `memory_limit` bytes inside the block. Exceeding it raises
+    MemoryError instead of waking the OOM killer, which would break the whole pool. Subprocesses inherit the limit and
+    solc reserves far more address space than it uses, so compilation runs outside the block.
+    """
+    try:
+        import resource
+    except ImportError:
+        resource = None
+    if memory_limit is None or resource is None:
+        yield
+        return
+    soft, hard = resource.getrlimit(resource.RLIMIT_AS)
+    # only the soft limit is lowered so that it can be lifted again for the next compilation
+    limit = memory_limit if hard == resource.RLIM_INFINITY else min(memory_limit, hard)
+    resource.setrlimit(resource.RLIMIT_AS, (limit, hard))
+    try:
+        yield
+    finally:
+        resource.setrlimit(resource.RLIMIT_AS, (soft, hard))
+
+
+def configure_worker(memory_limit: int | None) -> None:
+    global _memory_limit
+    _memory_limit = memory_limit
+
+
+def _init_worker(printer: str, memory_limit: int | None) -> None:
+    configure_worker(memory_limit)
+    _load_printers(printer)
+
+
+async def _compile(root: Path):
+    import glob
+
+    from wake.compiler import SolcOutputSelectionEnum, SolidityCompiler
+    from wake.compiler.solc_frontend import SolcOutputErrorSeverityEnum
+    from wake.config import WakeConfig
+    from wake.utils.file_utils import is_relative_to
+
+    config = WakeConfig(project_root_path=root)
+    config.load_configs()
+
+    sol_files = set()
+    for f in glob.iglob(str(root / "**/*.sol"), recursive=True):
+        file = Path(f)
+        if not any(is_relative_to(file, p) for p in config.compiler.solc.exclude_paths) and file.is_file():
+            sol_files.add(file)
+
+    compiler = SolidityCompiler(config)
+    compiler.load()
+    build, _ = await compiler.compile(
+        sol_files, [SolcOutputSelectionEnum.ALL], write_artifacts=True, console=None, no_warnings=True
+    )
+    assert compiler.latest_build_info is not None
+    assert compiler.latest_graph is not None
+    errored = any(
+        error.severity == SolcOutputErrorSeverityEnum.ERROR
+        for info in compiler.latest_build_info.compilation_units.values()
+        for error in info.errors
+    )
+    return config, build, compiler.latest_build_info, compiler.latest_graph, errored
+
+
+def analyse_project(task: BatchTask) -> ProjectResult:
+    """
+    Compile the project at `task.root` and run the printer on it, in the worker process.
+    """
+    import asyncio
+
+    from rich.console import Console
+
+    from wake.printers.api import run_printers
+
+    start = time.perf_counter()
+    task.out.mkdir(parents=True, exist_ok=True)
+    profile_path = task.out / "profile.json"
+    profile_path.unlink(missing_ok=True)
+    status = STATUS_OK
+    error = None
+    try:
+        # printers resolve their outputs and .wake/ relative to the working directory, as under `wake print`
+        os.chdir(task.root)
+        with (task.out / "output.txt").open("w", encoding="utf-8") as f, redirect_stdout(f):
+            config, build, build_info, imports_graph, errored = asyncio.run(_compile(task.root))
+            if errored and not task.ignore_errors:
+                status = STATUS_COMPILATION_FAILED
+            else:
+                with limited_memory(_memory_limit):
+                    run_printers(
+                        task.printer,
+                        build,
+                        build_info,
+                        imports_graph,
+                        config,
+                        Console(file=f, width=120),
+                        None,
+                        None,
+                        args=[*task.args, "--profile-json", str(profile_path)],
+                        verify_paths=False,
+                    )
+    except MemoryError:
+        status = STATUS_OUT_OF_MEMORY
+    except Exception as e:
+        status = STATUS_FAILED
+        error = f"{type(e).__name__}: {e}"
+    finally:
+        # a worker analyses many projects, keep only the graphs of the current one alive
+        drop_sessions(task.root)
+        gc.collect()
+
+    profile = json.loads(profile_path.read_text()) if status == STATUS_OK and profile_path.exists() else None
+    return ProjectResult(str(task.root), status, round(time.perf_counter() - start, 3), peak_rss(), profile, error)
+
+
+def _run_pool(
+    tasks: Sequence[BatchTask],
+    indexes: Sequence[int],
+    results: Dict[int, ProjectResult],
+    jobs: int,
+    memory_limit: int | None,
+    projects_per_worker: int | None,
+    analyse: Callable[[BatchTask], ProjectResult],
+    initializer: Callable[[str, int | None], None],
+) -> None:
+    options = {}
+    if projects_per_worker is not None:
+        options["max_tasks_per_child"] = projects_per_worker
+    with ProcessPoolExecutor(
+        max_workers=min(jobs, len(indexes)),
+        # fresh interpreters, forking would copy the parent's imports and state into every worker
+        mp_context=get_context("spawn"),
+        initializer=initializer,
+        initargs=(tasks[0].printer, memory_limit),
+        **options,
+    ) as executor:
+        futures = {executor.submit(analyse, tasks[i]): i for i in indexes}
+        for future in as_completed(futures):
+            i = futures[future]
+            try:
+                results[i] = future.result()
+            except BrokenProcessPool as e:
+                # a worker was killed, the pool fails all projects that did not finish
+                results[i] = ProjectResult(str(tasks[i].root), STATUS_FAILED, 0.0, None, None, f"worker died: {e}")
+            except Exception as e:
+                results[i] = ProjectResult(
+                    str(tasks[i].root), STATUS_FAILED, 0.0, None, None, f"{type(e).__name__}: {e}"
+                )
+
+
+# ProcessPoolExecutor replaces workers by itself since Python 3.11
+_RECYCLES_WORKERS = sys.version_info >= (3, 11)
+
+
+def run_batch(
+    tasks: Sequence[BatchTask],
+    jobs: int,
+    memory_limit: int | None = None,
+    projects_per_worker: int | None = None,
+    analyse: Callable[[BatchTask], ProjectResult] = analyse_project,
+    initializer: Callable[[str, int | None], None] = _init_worker,
+) -> List[ProjectResult]:
+    """
+    Analyse `tasks` in up to `jobs` worker processes, each limited to `memory_limit` bytes of address space during
+    analysis and replaced after `projects_per_worker` projects so that memory fragmented by one large project is
+    returned. Results are in the order of `tasks`.
+
+    Before Python 3.11 the pool cannot replace single workers, so a fresh pool is started for every
+    `projects_per_worker * jobs` tasks instead, which bounds the projects per worker on average.
+    """
+    if len(tasks) == 0:
+        return []
+    results: Dict[int, ProjectResult] = {}
+    indexes = list(range(len(tasks)))
+    if projects_per_worker is None or _RECYCLES_WORKERS:
+        _run_pool(tasks, indexes, results, jobs, memory_limit, projects_per_worker, analyse, initializer)
+    else:
+        chunk = projects_per_worker * jobs
+        for start in range(0, len(tasks), chunk):
+            _run_pool(tasks, indexes[start : start + chunk], results, jobs, memory_limit, None, analyse, initializer)
+    return [results[i] for i in range(len(tasks))]
+
+
+def summarize(results: Iterable[ProjectResult]) -> Dict:
+    """
+    Aggregate of the batch: projects per status, total time, largest worker peak RSS and the profile counters summed
+    over all projects.
+    """
+    results = list(results)
+    statuses: Dict[str, int] = {}
+    counters: Dict[str, int] = {}
+    for result in results:
+        statuses[result.status] = statuses.get(result.status, 0) + 1
+        if result.profile is not None:
+            for name, value in result.profile.get("counters", {}).items():
+                counters[name] = counters.get(name, 0) + value
+    rss = [result.peak_rss for result in results if result.peak_rss is not None]
+    return {
+        "projects": len(results),
+        "statuses": statuses,
+        "seconds": round(sum(result.seconds for result in results), 3),
+        "max_peak_rss": max(rss) if rss else None,
+        "counters": counters,
+        "results": [result._asdict() for result in results],
+    }
+
+
+@click.command(name="batch", context_settings={"ignore_unknown_options": True, "allow_interspersed_args": False})
+@click.argument("printer", type=click.Choice(PRINTERS))
+@click.argument("args", nargs=-1, type=click.UNPROCESSED)
+@click.option(
+    "--project",
+    "-p",
+    "projects",
+    multiple=True,
+    type=click.Path(exists=True, file_okay=False),
+    help="Root of a project with its own wake.toml.",
+)
+@click.option(
+    "--projects-from",
+    type=click.Path(exists=True, dir_okay=False),
+    default=None,
+    help="File listing project roots, one per line.",
+)
+@click.option(
+    "--jobs",
+    "-j",
+    type=click.IntRange(min=1),
+    default=os.cpu_count() or 1,
+    help="Number of worker processes.",
+)
+@click.option(
+    "--memory-limit",
+    type=click.IntRange(min=1),
+    default=None,
+    help="Address space limit of every worker while the printer analyses a project in MiB, projects exceeding it are reported as out-of-memory. Compilation by solc is not limited.",
+)
+@click.option(
+    "--projects-per-worker",
+    type=click.IntRange(min=1),
+    default=16,
+    help="Replace a worker process after it analysed the given number of projects.",
+)
+@click.option(
+    "--ignore-errors",
+    is_flag=True,
+    default=False,
+    help="Run the printer on projects with compilation errors.",
+)
+@click.option(
+    "-o",
+    "--out",
+    type=click.Path(file_okay=False, writable=True),
+    default=".wake/contract-cross-reference-batch",
+    help="Directory for the console output and profile of every project and summary.json.",
+)
+def main(
+    printer: str,
+    args: Tuple[str, ...],
+    projects: Tuple[str, ...],
+    projects_from: str | None,
+    jobs: int,
+    memory_limit: int | None,
+    projects_per_worker: int,
+    ignore_errors: bool,
+    out: str,
+) -> None:
+    """
+    Run PRINTER with ARGS on every project.
+    """
+    roots = [Path(project).resolve() for project in projects]
+    if projects_from is not None:
+        roots += read_project_list(Path(projects_from))
+    roots = list(dict.fromkeys(roots))
+    if len(roots) == 0:
+        raise click.UsageError("No projects given, use --project or --projects-from")
+
+    out_path = Path(out).resolve()
+    tasks = [BatchTask(root, printer, args, project_out(out_path, root), ignore_errors) for root in roots]
+    results = run_batch(tasks, jobs, memory_limit * 2**20 if memory_limit is not None else None, projects_per_worker)
+
+    summary = summarize(results)
+    out_path.mkdir(parents=True, exist_ok=True)
+    (out_path / "summary.json").write_text(json.dumps(summary, indent=2))
+
+    table = Table(title=f"{printer} over {len(results)} projects")
+    table.add_column("Project")
+    table.add_column("Status")
+    table.add_column("Time", justify="right")
+    for result in results:
+        status = result.status if result.error is None else f"{result.status}: {result.error}"
+        table.add_row(result.root, status, f"{result.seconds:,.1f} s")
+    print(table)
+    if summary["statuses"].get(STATUS_OK, 0) != len(results):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,184 +1,245 @@
 from __future__ import annotations
 
-from collections import deque, defaultdict
+import bisect
+import re
+import sys
 from pathlib import Path
-from typing import List, Set, Tuple
+from typing import Dict, Iterable, Iterator, List, Mapping, Sequence, Set, Tuple, Union
 
-import networkx as nx
 import rich_click as click
 from rich import print
-import rich.tree
+from rich.tree import Tree
 
 import wake.ir as ir
-import wake.ir.types as types
 from wake.cli import SolidityName
 from wake.printers import Printer, printer
 
-import re
+from .graph_algorithms import iter_bits
+from .name_index import NameIndex
+from .profiling import Profiler
+from .reachability import ReachabilityIndex
+from .reference_graph import ReferenceGraph, ReferenceGraphBuilder, ReferenceKind, edge_kind_names
+from .reference_graph_session import printer_visit_builder, refresh_printer_session, save_import_graph
+
+
+# contract name and URL of its source, indexed by graph node
+Labels = Union[Sequence[Tuple[str, str]], Mapping[int, Tuple[str, str]]]
+
+
+def build_trees(
+    nodes: Labels, adjacency: List[List[int]], selected: Iterable[int] | None = None
+) -> Iterator[Tree]:
+    """
+    Yield one tree per node, or per `selected` node, with its adjacent nodes as leaves, in time linear in nodes
+    plus edges.
+    """
+    for node in range(len(nodes)) if selected is None else selected:
+        name, link = nodes[node]
+        tree = Tree(f"[link={link}]{name}[/link]")
+        for adjacent in adjacency[node]:
+            adjacent_name, adjacent_link = nodes[adjacent]
+            tree.add(f"[link={adjacent_link}]{adjacent_name}[/link]")
+        yield tree
+
+
+def plain_lines(
+    nodes: Labels, adjacency: List[List[int]], selected: Iterable[int] | None = None
+) -> Iterator[str]:
+    """
+    Same content as `build_trees` as tab separated lines without any markup, adjacent nodes are indented by a tab.
+    """
+    for node in range(len(nodes)) if selected is None else selected:
+        name, link = nodes[node]
+        yield f"{name}\t{link}\n"
+        for adjacent in adjacency[node]:
+            adjacent_name, adjacent_link = nodes[adjacent]
+            yield f"\t{adjacent_name}\t{adjacent_link}\n"
+
+
+def transitive_adjacency(
+    adjacency: List[List[int]], depth: int | None = None, selected: Iterable[int] | None = None
+) -> List[List[int]]:
+    """
+    Replace direct adjacent nodes with all nodes reachable within `depth` hops, or without limit if `depth` is None.
+    With `selected`, only the rows of those nodes are computed and all other rows are left empty.
+    """
+    rows = []
+    for adjacent in adjacency:
+        row = 0
+        for node in adjacent:
+            row |= 1 << node
+        rows.append(row)
+    index = ReachabilityIndex(rows)
+    if selected is None:
+        return [list(iter_bits(index.reachable(node, depth))) for node in range(len(adjacency))]
+    transitive: List[List[int]] = [[] for _ in adjacency]
+    for node in selected:
+        transitive[node] = list(iter_bits(index.reachable(node, depth)))
+    return transitive
+
+
+def line_numbers(newlines: List[int], offsets: Iterable[int]) -> List[int]:
+    """
+    1-based line numbers of byte `offsets` in a file with newline characters at the sorted `newlines` offsets.
+    """
+    return [bisect.bisect_left(newlines, offset) + 1 for offset in offsets]
 
 
 class ContractCrossReferencePrinter(Printer):
-    # _names: Set[str]
+    _names: Set[str]
     _inherit: bool
+    _cache: bool
+    _transitive: bool
+    _depth: int | None
+    _plain: bool
+    _limit: int | None
+    _offset: int
+    _top: int | None
     _contracts: List[ir.ContractDefinition]
+    _collector: ReferenceGraphBuilder | None
+    _profiler: Profiler
+    _profile_json: Path | None
 
     def __init__(self):
         self._contracts = []
-
-    def find_ContractDefinition(self, node: ir.SolidityAbc): 
-        while node is not None:
-            if isinstance(node, ir.InheritanceSpecifier) and not self._inherit:
-                return None                          
-            if isinstance(node, ir.ContractDefinition):
-                return node
-            if isinstance(node, ir.SourceUnit):
-                return None
-            node = node.parent
-
+        self._collector = None
 
     def print(self) -> None:
-        # for node in self._contracts:
-        #     print("-------------------")
-        #     print(node.name)
-        #     identifiers: List[ir.Identifier] = [id for id in node.references if isinstance(id, ir.Identifier)]
-
-        #     for id in identifiers:
-        #         if isinstance(id, ir.ExpressionAbc) and id.statement is not None: # reference is ExpressionAbc and statement is not none
-        #             current_node: ir.ExpressionAbc = id
-        #                 # print(current_node.statement.declaration.parent)
-        #             if isinstance(current_node.statement.declaration.parent, ir.ContractDefinition):
-        #                 print(" - ", current_node.statement.declaration.parent.name)
-        #             # else:
-        #                 # print("the function is not in the contract ... skip")
-        #         else:
-        #             current_node: ir.SolidityAbc = id
-        #             while current_node is not None:
-        #                 if isinstance(current_node, ir.ContractDefinition):
-        #                     contract_def:ir.ContractDefinition = current_node
-        #                     print(" - ", contract_def.name)
-        #                     break
-        #                 current_node = current_node.parent
-
-
-        #     identifier_paths : List[ir.IdentifierPathPart] = [id for id in node.references if isinstance(id, ir.IdentifierPathPart)]
-        #     for pp in identifier_paths:
-        #         current_node: ir.SolidityAbc = pp.underlying_node # always it is not ExpressionAbc
-        #         while current_node is not None:
-        #             if isinstance(current_node, ir.ContractDefinition):
-        #                 contract_def:ir.ContractDefinition = current_node
-        #                 print(" - ", contract_def.name)
-        #                 break
-        #             current_node = current_node.parent            
-
-
-# ---------------------------------------
-
-
-        for name in self._names:
-            print(name)
-            
-        from rich.tree import Tree
-
-        edges: Set[Tuple[str, str]] = set()
-        nodes: Set[Tuple[str, str, str]] = set()
-        # contract_id, contract_name, URL(contract_source)
-
-        for contract in self._contracts:
-            node_tuple = (f"{contract.parent.source_unit_name}_{contract.name}", contract.name, self.generate_link(contract))
-            nodes.add(node_tuple)
-
-
-        for node in self._contracts:
-            node_id = f"{node.parent.source_unit_name}_{node.name}"
-
-
-            classified_references = defaultdict(list)
-
-            for reference in node.references:
-                if isinstance(reference, ir.Identifier):
-                    classified_references['Identifier'].append(reference)
-                elif isinstance(reference, ir.IdentifierPathPart):
-                    classified_references['IdentifierPathPart'].append(reference)
-                elif isinstance(reference, ir.MemberAccess):
-                    classified_references['MemberAccess'].append(reference)
-
-            identifiers: List[ir.Identifier] = classified_references['Identifier']
-            identifier_path_parts: List[ir.IdentifierPathPart] = classified_references['IdentifierPathPart']
-            member_accesses: List[ir.MemberAccess] = classified_references['MemberAccess']
-            # print(len(member_accesses))
-
-            for id in identifiers:
-                if isinstance(id, ir.ExpressionAbc) and id.statement is not None: # reference is ExpressionAbc and statement is not none
-                    current_node: ir.ExpressionAbc = id
-                    if isinstance(current_node.statement.declaration.parent, ir.ContractDefinition): 
-                        refer_contract:  ir.ContractDefinition = current_node.statement.declaration.parent
-                        edge_id = (f"{refer_contract.source_unit.source_unit_name}_{refer_contract.name}", node_id)
-                        if edge_id not in edges:
-                            edges.add(edge_id)
-                else:
-                    current_node: ir.SolidityAbc = id
-                    refer_contract = self.find_ContractDefinition(current_node)
-                    if refer_contract is not None:
-                        edge_id = (f"{refer_contract.source_unit.source_unit_name}_{refer_contract.name}", node_id)
-                        edges.add(edge_id)
-
-
-            for pp in identifier_path_parts:
-                current_node: ir.SolidityAbc = pp.underlying_node # always it is not ExpressionAbc
-                refer_contract = self.find_ContractDefinition(current_node)
-                if refer_contract is not None:
-                    edge_id = (f"{refer_contract.source_unit.source_unit_name}_{refer_contract.name}", node_id)
-                    edges.add(edge_id)
-
-            # for ma in member_accesses:
-            #     if isinstance(ma, ir.ExpressionAbc) and ma.statement is not None:
-            #         current_node: ir.ExpressionAbc = ma
-            #         if isinstance(current_node.statement.declaration.parent, ir.ContractDefinition):
-            #             refer_contract:  ir.ContractDefinition = current_node.statement.declaration.parent
-            #             edge_id = (f"{refer_contract.source_unit.source_unit_name}_{refer_contract.name}", node_id)
-            #             if edge_id not in edges:
-            #                 edges.add(edge_id)
-            #     else:
-            #         current_node: ir.SolidityAbc = ma
-            #         refer_contract = self.find_ContractDefinition(current_node)
-            #         if refer_contract is not None:
-            #             edge_id = (f"{refer_contract.source_unit.source_unit_name}_{refer_contract.name}", node_id)
-            #             edges.add(edge_id) 
-
-        # table.add_column("Referenced By", justify="left")
-                    
-
-        print(" referring tree")
-      
-        for node in nodes:
-            referring_tree = Tree(
-                f"[link={node[2]}]{node[1]}[/link]"
+        profiler = self._profiler
+        profiler.end("visit")
+
+        with profiler.phase("reference graph"):
+            session = refresh_printer_session(
+                self, self._contracts, self._inherit, self._cache, self._collector, self._top is not None
             )
-            for from_, to in edges:
-                if node[0] == from_:
-                    for to_node in nodes:
-                        if to_node[0] == to:
-                            referring_tree.add(f"[link={to_node[2]}]{to_node[1]}[/link]")
-            
-            print(referring_tree)
-
-        print("")
-        print(" referrer tree")
-        for node in nodes:
-            referrer_tree = Tree(
-                f"[link={node[2]}]{node[1]}[/link]"
+            graph = session.graph
+        if self._cache:
+            save_import_graph(self, session.import_graph)
+        with profiler.phase("filter"):
+            if len(self._names) == 0:
+                # every bit set
+                named = -1
+                selected = list(range(len(graph)))
+            else:
+                named, unmatched = NameIndex(graph).select_all(self._names)
+                for selector in unmatched:
+                    self.logger.warning(f"No contract matches {selector}")
+                selected = list(iter_bits(named))
+            total = len(selected)
+            end = None if self._limit is None else self._offset + self._limit
+            selected = selected[self._offset : end]
+
+        if self._top is not None:
+            with profiler.phase("output"):
+                self._print_coupled(graph, graph.coupled_pairs(self._top, mask=named))
+            profiler.count_graph(session.builder, graph)
+            profiler.finish("contract-cross-reference profile", self._profile_json)
+            return
+
+        with profiler.phase("adjacency"):
+            referring, referrers = graph.adjacency(
+                ReferenceKind.IDENTIFIER | ReferenceKind.IDENTIFIER_PATH_PART
             )
-            for from_, to in edges:
-                if node[0] == to:
-                    for to_node in nodes:
-                        if to_node[0] == from_:
-                            referrer_tree.add(f"[link={to_node[2]}]{to_node[1]}[/link]")
-            
-            print(referrer_tree)
-        
+        if self._transitive:
+            with profiler.phase("reachability index"):
+                referring = transitive_adjacency(referring, self._depth, selected)
+                referrers = transitive_adjacency(referrers, self._depth, selected)
+
+        with profiler.phase("output"):
+            # links are only generated for the contracts that are printed
+            shown = set(selected)
+            for node in selected:
+                shown.update(referring[node])
+                shown.update(referrers[node])
+            nodes: Dict[int, Tuple[str, str]] = {
+                node: (graph.contracts[node].name, self.generate_link(graph.contracts[node])) for node in shown
+            }
+
+            if self._plain:
+                write = sys.stdout.write
+                write("referring tree\n")
+                for line in plain_lines(nodes, referring, selected):
+                    write(line)
+                write("\nreferrer tree\n")
+                for line in plain_lines(nodes, referrers, selected):
+                    write(line)
+                sys.stdout.flush()
+            else:
+                print(" referring tree")
+                for referring_tree in build_trees(nodes, referring, selected):
+                    print(referring_tree)
+
+                print("")
+                print(" referrer tree")
+                for referrer_tree in build_trees(nodes, referrers, selected):
+                    print(referrer_tree)
+
+            if end is not None and end < total:
+                click.echo(f"Showing {len(selected)} of {total} contracts, continue with --offset {end}", err=True)
+
+        profiler.count_graph(session.builder, graph)
+        profiler.finish("contract-cross-reference profile", self._profile_json)
+
+    def _print_coupled(self, graph: ReferenceGraph, pairs: List[Tuple[int, int, int]]) -> None:
+        """
+        Print the ranked contract pairs with the kinds of references between them and where the references are.
+        """
+        newlines: Dict[ir.SourceUnit, List[int]] = {}
+
+        def locations(source: int, target: int) -> str:
+            offsets = graph.edge_locations.get((source, target))
+            if offsets is None:
+                return ""
+            source_unit = graph.contracts[source].parent
+            if source_unit not in newlines:
+                newlines[source_unit] = [m.start() for m in re.finditer(b"\n", source_unit.file_source)]
+            lines = line_numbers(newlines[source_unit], offsets[::2])
+            return ", ".join(f"{source_unit.source_unit_name}:{line}" for line in sorted(set(lines)))
+
+        def label(node: int) -> str:
+            name = graph.names[node]
+            return name if self._plain else f"[link={self.generate_link(graph.contracts[node])}]{name}[/link]"
+
+        out = sys.stdout.write if self._plain else print
+        for a, b, references in pairs:
+            kinds = graph.edge_kinds.get((a, b), 0) | graph.edge_kinds.get((b, a), 0)
+            if self._plain:
+                out(f"{label(a)}\t{label(b)}\t{references}\t{','.join(edge_kind_names(kinds))}\n")
+            else:
+                out(f"{label(a)} <-> {label(b)}: {references} references ({', '.join(edge_kind_names(kinds))})")
+            for source, target in ((a, b), (b, a)):
+                if (source, target) not in graph.edge_counts:
+                    continue
+                count = graph.edge_counts[(source, target)]
+                if self._plain:
+                    out(f"\t{label(source)}\t{label(target)}\t{count}\t{locations(source, target)}\n")
+                else:
+                    out(f"  {label(source)} -> {label(target)}: {count} {locations(source, target)}")
+        if self._plain:
+            sys.stdout.flush()
 
     def visit_contract_definition(self, node:ir.ContractDefinition):
         self._contracts.append(node)
+
+    def visit_source_unit(self, node: ir.SourceUnit):
+        if self._collector is not None:
+            self._collector.visit_source_unit(node)
+
+    def visit_identifier(self, node: ir.Identifier):
+        if self._collector is not None:
+            self._collector.visit_identifier(node)
+
+    def visit_member_access(self, node: ir.MemberAccess):
+        if self._collector is not None:
+            self._collector.visit_member_access(node)
+
+    def visit_identifier_path(self, node: ir.IdentifierPath):
+        if self._collector is not None:
+            self._collector.visit_identifier_path(node)
+
+    def visit_user_defined_type_name(self, node: ir.UserDefinedTypeName):
+        if self._collector is not None:
+            self._collector.visit_user_defined_type_name(node)
     
     @printer.command(name="contract-cross-reference")
     @click.option(
@@ -187,7 +248,7 @@ class ContractCrossReferencePrinter(Printer):
         "names",
         type=SolidityName("contract", case_sensitive=False),
         multiple=True,
-        help="Contract names",
+        help="Contracts to show: a name, a glob (Token*), a regex (re:^Pool\\d+$) or source_unit_name:Contract.",
     )
 
     @click.option(
@@ -196,14 +257,90 @@ class ContractCrossReferencePrinter(Printer):
         default=False,
         help="Include inheritance in cross-reference graph.",
     )
+    @click.option(
+        "--transitive",
+        is_flag=True,
+        default=False,
+        help="Show all contracts referring to / referenced by a contract transitively instead of direct ones only.",
+    )
+    @click.option(
+        "--depth",
+        type=click.IntRange(min=1),
+        default=None,
+        help="Follow references transitively up to the given number of hops, implies --transitive.",
+    )
+    @click.option(
+        "--plain",
+        is_flag=True,
+        default=False,
+        help="Stream tab separated lines without rich formatting, much faster for large projects.",
+    )
+    @click.option(
+        "--limit",
+        type=click.IntRange(min=1),
+        default=None,
+        help="Show at most the given number of contracts.",
+    )
+    @click.option(
+        "--offset",
+        type=click.IntRange(min=0),
+        default=0,
+        help="Skip the given number of contracts, for paging with --limit.",
+    )
+    @click.option(
+        "--top",
+        type=click.IntRange(min=1),
+        default=None,
+        help="Rank the given number of most coupled contract pairs by references between them instead of printing trees.",
+    )
+    @click.option(
+        "--cache/--no-cache",
+        default=True,
+        help="Reuse per-file reference analysis cached in .wake/ for files whose imports did not change.",
+    )
+    @click.option(
+        "--profile",
+        is_flag=True,
+        default=False,
+        help="Print time spent in each phase, analysis counters and peak memory usage.",
+    )
+    @click.option(
+        "--profile-json",
+        type=click.Path(dir_okay=False, writable=True),
+        default=None,
+        help="Write the profile as JSON to the given file, implies --profile.",
+    )
     def cli(
         self,
         names: Tuple[str, ...],
-        inherit
+        inherit,
+        transitive: bool,
+        depth: int | None,
+        plain: bool,
+        limit: int | None,
+        offset: int,
+        top: int | None,
+        cache: bool,
+        profile: bool,
+        profile_json: str | None,
     ) -> None:
         """
         print contract reference relationship.
         """
         self._names = set(names)
         self._inherit = inherit
+        self._transitive = transitive or depth is not None
+        self._depth = depth
+        self._plain = plain
+        self._limit = limit
+        self._offset = offset
+        self._top = top
+        self._cache = cache
+        # record edges of files that are not cached while wake visits the IR instead of walking them again in print()
+        # reference locations are only needed to show where coupled contracts refer to each other
+        self._collector = printer_visit_builder(self, inherit, cache, locations=top is not None)
+        self._profile_json = Path(profile_json) if profile_json is not None else None
+        self._profiler = Profiler(profile or profile_json is not None)
+        # wake visits the IR between cli() and print()
+        self._profiler.begin("visit")
 
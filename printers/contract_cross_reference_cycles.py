@@ -0,0 +1,220 @@
+from __future__ import annotations
+
+from pathlib import Path
+from typing import List, Tuple
+
+import rich_click as click
+from rich import print
+from rich.tree import Tree
+
+import wake.ir as ir
+from wake.printers import Printer, printer
+
+from .cycles import Condensation
+from .dot import DotWriter
+from .profiling import Profiler
+from .reference_graph import (
+    CONTRACT_KINDS,
+    EDGE_KINDS,
+    ReferenceGraph,
+    ReferenceGraphBuilder,
+    ReferenceKind,
+    edge_kind_names,
+)
+from .reference_graph_session import printer_visit_builder, refresh_printer_session, save_import_graph
+
+
+class ContractCrossReferenceCyclesPrinter(Printer):
+    _inherit: bool
+    _kinds: Tuple[str, ...]
+    _edge_kinds: ReferenceKind
+    _dag: bool
+    _out: Path
+    _force: bool
+    _cache: bool
+    _contracts: List[ir.ContractDefinition]
+    _collector: ReferenceGraphBuilder | None
+    _profiler: Profiler
+    _profile_json: Path | None
+
+    def __init__(self):
+        self._contracts = []
+        self._collector = None
+
+    def _label(self, graph: ReferenceGraph, node: int) -> str:
+        return f"[link={self.generate_link(graph.contracts[node])}]{graph.names[node]}[/link]"
+
+    def print(self) -> None:
+        profiler = self._profiler
+        profiler.end("visit")
+
+        with profiler.phase("reference graph"):
+            session = refresh_printer_session(self, self._contracts, self._inherit, self._cache, self._collector)
+            graph = session.graph
+        if self._cache:
+            save_import_graph(self, session.import_graph)
+        with profiler.phase("strongly connected components"):
+            condensation = Condensation(graph, self._edge_kinds, graph.node_mask(self._kinds))
+            cycles = condensation.cycles()
+
+        with profiler.phase("output"):
+            if len(cycles) == 0:
+                print("No reference cycles found")
+            for i, component in enumerate(cycles, start=1):
+                witness = condensation.witness(component)
+                members = condensation.components[component]
+                tree = Tree(
+                    f"Cycle {i} of {len(members)} contracts: "
+                    + " -> ".join(self._label(graph, node) for node in witness)
+                )
+                for source, target in condensation.internal_edges(component):
+                    edge = (source, target)
+                    kinds = ", ".join(edge_kind_names(graph.edge_kinds[edge]))
+                    tree.add(
+                        f"{self._label(graph, source)} -> {self._label(graph, target)}: "
+                        f"{graph.edge_counts[edge]} references ({kinds}) in {graph.source_unit_names[source]}"
+                    )
+                print(tree)
+
+            if self._dag:
+                self._print_dag(graph, condensation)
+
+        profiler.count_graph(session.builder, graph)
+        profiler.count("components", len(condensation.components))
+        profiler.count("cycles", len(cycles))
+        profiler.finish("contract-cross-reference-cycles profile", self._profile_json)
+
+    def _print_dag(self, graph: ReferenceGraph, condensation: Condensation) -> None:
+        """
+        Write the condensed graph, one node per strongly connected component with edges labeled with the number
+        of references between the components.
+        """
+        p = self._out / "contract-cross-reference-condensed.dot"
+        with DotWriter(p, "TB", "Condensed contract cross reference", force=self._force) as g:
+            for component, members in enumerate(condensation.components):
+                if len(members) == 1:
+                    contract = graph.contracts[members[0]]
+                    g.node(f"scc{component}", contract.name, self.generate_link(contract))
+                else:
+                    g.node(f"scc{component}", "\\n".join(graph.names[node] for node in members), None, filled=True)
+            for component, successors in enumerate(condensation.successors):
+                for successor, references in sorted(successors.items()):
+                    g.edge(f"scc{component}", f"scc{successor}", label=str(references))
+
+    def visit_contract_definition(self, node: ir.ContractDefinition):
+        self._contracts.append(node)
+
+    def visit_source_unit(self, node: ir.SourceUnit):
+        if self._collector is not None:
+            self._collector.visit_source_unit(node)
+
+    def visit_identifier(self, node: ir.Identifier):
+        if self._collector is not None:
+            self._collector.visit_identifier(node)
+
+    def visit_member_access(self, node: ir.MemberAccess):
+        if self._collector is not None:
+            self._collector.visit_member_access(node)
+
+    def visit_identifier_path(self, node: ir.IdentifierPath):
+        if self._collector is not None:
+            self._collector.visit_identifier_path(node)
+
+    def visit_user_defined_type_name(self, node: ir.UserDefinedTypeName):
+        if self._collector is not None:
+            self._collector.visit_user_defined_type_name(node)
+
+    @printer.command(name="contract-cross-reference-cycles")
+    @click.option(
+        "--inherit",
+        is_flag=True,
+        default=False,
+        help="Include references in inheritance specifiers.",
+    )
+    @click.option(
+        "--kind",
+        "kinds",
+        type=click.Choice(CONTRACT_KINDS),
+        multiple=True,
+        default=list(CONTRACT_KINDS),
+        help="Kinds of contracts to search for cycles, references to other contracts are dropped.",
+    )
+    @click.option(
+        "--edge-kind",
+        "edge_kinds",
+        type=click.Choice(list(EDGE_KINDS)),
+        multiple=True,
+        help="Only follow references of the given kinds, all kinds by default.",
+    )
+    @click.option(
+        "--dag",
+        is_flag=True,
+        default=False,
+        help="Also write the graph of strongly connected components to contract-cross-reference-condensed.dot.",
+    )
+    @click.option(
+        "-o",
+        "--out",
+        is_flag=False,
+        default=".wake/contract-cross-reference-graphs",
+        type=click.Path(file_okay=False, dir_okay=True, writable=True),
+        help="Output directory for --dag",
+    )
+    @click.option(
+        "--force",
+        "-f",
+        is_flag=True,
+        default=False,
+        help="Rewrite the --dag file even when its content did not change.",
+    )
+    @click.option(
+        "--cache/--no-cache",
+        default=True,
+        help="Reuse per-file reference analysis cached in .wake/ for files whose imports did not change.",
+    )
+    @click.option(
+        "--profile",
+        is_flag=True,
+        default=False,
+        help="Print time spent in each phase, analysis counters and peak memory usage.",
+    )
+    @click.option(
+        "--profile-json",
+        type=click.Path(dir_okay=False, writable=True),
+        default=None,
+        help="Write the profile as JSON to the given file, implies --profile.",
+    )
+    def cli(
+        self,
+        inherit: bool,
+        kinds: Tuple[str, ...],
+        edge_kinds: Tuple[str, ...],
+        dag: bool,
+        out: str,
+        force: bool,
+        cache: bool,
+        profile: bool,
+        profile_json: str | None,
+    ) -> None:
+        """
+        Report cycles of contracts referring to each other.
+        """
+        self._inherit = inherit
+        self._kinds = kinds
+        self._edge_kinds = ReferenceKind.ALL
+        if len(edge_kinds) != 0:
+            self._edge_kinds = ReferenceKind(0)
+            for edge_kind in edge_kinds:
+                self._edge_kinds |= EDGE_KINDS[edge_kind]
+        self._dag = dag
+        self._out = Path(out).resolve()
+        if dag:
+            self._out.mkdir(parents=True, exist_ok=True)
+        self._force = force
+        self._cache = cache
+        # record edges of files that are not cached while wake visits the IR instead of walking them again in print()
+        self._collector = printer_visit_builder(self, inherit, cache)
+        self._profile_json = Path(profile_json) if profile_json is not None else None
+        self._profiler = Profiler(profile or profile_json is not None)
+        # wake visits the IR between cli() and print()
+        self._profiler.begin("visit")
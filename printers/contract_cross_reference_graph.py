@@ -1,18 +1,42 @@
 from __future__ import annotations
 
-from collections import deque, defaultdict
-from pathlib import Path
-from typing import List, Set, Tuple, Dict
+import sys
+from functools import partial
+from pathlib import Path, PurePosixPath
+from typing import Callable, Dict, Iterable, Iterator, List, Set, Tuple
 
-import networkx as nx
 import rich_click as click
-from rich import print
 
 import wake.ir as ir
-import wake.ir.types as types
 from wake.cli import SolidityName
 from wake.printers import Printer, printer
-from wake.ir.enums import ContractKind
+
+from .dot import DotGraph, DotNode, DotWriter, save_dots
+from .export import EXPORT_FORMATS, ExportGraph, ExportNode, export_graph, load_graph
+from .graph_algorithms import iter_bits
+from .graph_diff import DIFF_FORMATS, diff_graphs, diff_json, diff_text, write_diff_dot
+from .import_graph import ImportGraph
+from .lazy_reference_graph import LazyReferenceGraph
+from .name_index import NameIndex
+from .profiling import Profiler
+from .reachability import ReachabilityIndex
+from .reference_graph import (
+    CONTRACT_KINDS,
+    EDGE_KINDS,
+    InheritedReferenceGraph,
+    ReferenceGraph,
+    ReferenceGraphBuilder,
+    ReferenceKind,
+)
+from .reference_graph_session import (
+    ReferenceGraphSession,
+    lazy_printer_graph,
+    printer_visit_builder,
+    referenced_contracts,
+    refresh_printer_session,
+    save_import_graph,
+)
+from .render import LAYOUT_ENGINES, RENDER_FORMATS, Renderer
 
 class ContractCrossReferenceGraphPrinter(Printer):
     _names: Set[str]
@@ -24,238 +48,461 @@ class ContractCrossReferenceGraphPrinter(Printer):
     _single_file: bool
     _referrer: bool
     _referring: bool
+    _cache: bool
+    _kinds: Tuple[str, ...]
+    _edge_kinds: ReferenceKind
+    _jobs: int
+    _format: str
+    _render: str | None
+    _engine: str
+    _transitive: bool
+    _depth: int | None
+    _lazy_mode: bool
+    _name_index: NameIndex
+    _named: int
+    _cluster_by: str | None
+    _collapse: bool
+    _changed_files: Tuple[str, ...]
+    _write_import_graph: bool
+    _diff_base: Path | None
+    _diff_format: str
+    _profiler: Profiler
+    _profile_json: Path | None
 
     _contracts: List[ir.ContractDefinition]
-    _refering_edges: Dict[ir.ContractDefinition, Set[ir.ContractDefinition]]
-    _refered_edges: Dict[ir.ContractDefinition, Set[ir.ContractDefinition]]
+    _collector: ReferenceGraphBuilder | None
+    _graph: ReferenceGraph
+    _session: ReferenceGraphSession
+    _inherited: InheritedReferenceGraph
+    _reachability: Tuple[ReachabilityIndex, ReachabilityIndex]
+    _lazy: LazyReferenceGraph | None
 
     
     def __init__(self):
         self._contracts = []
-        self._refering_edges = {}
-        self._refered_edges = {}
-
-    def find_ContractDefinition(self, node: ir.SolidityAbc) -> ir.ContractDefinition | None: 
-        while node is not None:
-            if isinstance(node, ir.InheritanceSpecifier) and not self._inherit:
-                return None                          
-            if isinstance(node, ir.ContractDefinition):
-                return node
-            if isinstance(node, ir.SourceUnit):
-                return None
-            node = node.parent
-
-    def create_edge(self, source: ir.ContractDefinition, target: ir.ContractDefinition):
-        self._refering_edges[target].add(source)
-        self._refered_edges[source].add(target)
-
-    def create_edges(self, source: ir.ContractDefinition, targets: List[ir.ContractDefinition]):
-        for target in targets:
-            self.create_edge(source, target)
+        self._collector = None
 
     def node_name(self, contract: ir.ContractDefinition) -> str:
         return f"{contract.parent.source_unit_name}_{contract.name}"
 
-    def print(self) -> None: 
-        import graphviz as gv
-        for contract in self._contracts:
-
-            self._refered_edges[contract] = set()
-            self._refering_edges[contract] = set()
-
-        for contract in self._contracts:
-            children: List[ir.ContractDefinition] = []
-            children.append(contract)
-                
-            classified_references = defaultdict(list)
-            for reference in contract.references:
-                if isinstance(reference, ir.Identifier):
-                    classified_references['Identifier'].append(reference)
-                elif isinstance(reference, ir.IdentifierPathPart):
-                    classified_references['IdentifierPathPart'].append(reference)
-                elif isinstance(reference, ir.MemberAccess):
-                    classified_references['MemberAccess'].append(reference)
-
-            identifiers: List[ir.Identifier] = classified_references['Identifier']
-            identifier_path_parts: List[ir.IdentifierPathPart] = classified_references['IdentifierPathPart']
-            member_accesses: List[ir.MemberAccess] = classified_references['MemberAccess']
-
-            for id in identifiers:
-                if isinstance(id, ir.ExpressionAbc) and id.statement is not None: # reference is ExpressionAbc and statement is not none
-                    current_node: ir.ExpressionAbc = id
-                    if isinstance(current_node.statement.declaration.parent, ir.ContractDefinition): 
-                        refer_contract: ir.ContractDefinition = current_node.statement.declaration.parent
-                        self.create_edges(refer_contract, children)
-                else:
-                    current_node: ir.SolidityAbc = id
-                    refer_contract = self.find_ContractDefinition(current_node)
-                    if refer_contract is not None:
-                        self.create_edges(refer_contract, children)
-
-
-            for pp in identifier_path_parts:
-                current_node: ir.SolidityAbc = pp.underlying_node # always it is not ExpressionAbc
-                refer_contract = self.find_ContractDefinition(current_node)
-                if refer_contract is not None:
-                    self.create_edges(refer_contract, children)
-
-            for ma in member_accesses:
-                if isinstance(ma, ir.ExpressionAbc) and ma.statement is not None:
-                    current_node: ir.ExpressionAbc = ma
-                    if isinstance(current_node.statement.declaration.parent, ir.ContractDefinition):
-                        refer_contract:  ir.ContractDefinition = current_node.statement.declaration.parent
-                        self.create_edges(refer_contract, children)
+    def print(self) -> None:
+        profiler = self._profiler
+        profiler.end("visit")
+        if len(self._changed_files) != 0:
+            self._print_changed()
+            return
+
+        self._lazy = None
+        if len(self._names) != 0 and self._lazy_mode:
+            # only analyse what the named contracts need
+            builder = ReferenceGraphBuilder(self._inherit)
+            with profiler.phase("index contracts"):
+                self._lazy = lazy_printer_graph(
+                    self, self._contracts, self._inherit, self._cache, builder, self._edge_kinds
+                )
+            self._graph = self._lazy.graph
+            try:
+                dot_paths = self._print_graph()
+            finally:
+                profiler.end("output")
+                self._lazy.save()
+            profiler.count("source units analysed", len(self._lazy.analysed))
+            import_graph = self._lazy.import_graph
+        else:
+            with profiler.phase("reference graph"):
+                self._session = refresh_printer_session(
+                    self, self._contracts, self._inherit, self._cache, self._collector
+                )
+            self._graph = self._session.graph
+            builder = self._session.builder
+            # the session keeps the propagation of the complete graph up to date across builds
+            unfiltered = self._edge_kinds == ReferenceKind.ALL
+            with profiler.phase("inheritance propagation"):
+                if unfiltered:
+                    self._inherited = self._session.inherited
                 else:
-                    current_node: ir.SolidityAbc = ma
-                    refer_contract = self.find_ContractDefinition(current_node)
-                    if refer_contract is not None:
-                        self.create_edges(refer_contract, children)
+                    self._inherited = InheritedReferenceGraph(self._graph.filtered(self._edge_kinds))
+            if self._transitive:
+                with profiler.phase("reachability index"):
+                    if unfiltered:
+                        self._reachability = self._session.reachability
+                    else:
+                        self._reachability = (
+                            ReachabilityIndex(self._inherited.referring),
+                            ReachabilityIndex(self._inherited.referrers),
+                        )
+            dot_paths = self._print_graph()
+            profiler.end("output")
+            import_graph = self._session.import_graph
+
+        if self._write_import_graph:
+            with profiler.phase("import graph"):
+                dot_paths.append(self._print_import_graph(import_graph))
+        if self._cache:
+            save_import_graph(self, import_graph)
+
+        if self._render is not None:
+            with profiler.phase("render"):
+                self._render_dots(dot_paths)
+
+        profiler.count_graph(builder, self._graph)
+        profiler.finish("contract-cross-reference-graph profile", self._profile_json)
+
+    def _print_changed(self) -> None:
+        """
+        Print the contracts whose cross references can change with `--changed-files`, see
+        [affected_contracts][printers.import_graph.ImportGraph.affected_contracts]. Only the source units importing
+        the changed files are analysed, for the contracts they refer to now and referred to in the cached analysis.
+        """
+        with self._profiler.phase("affected contracts"):
+            import_graph = ImportGraph.from_source_units(dict.fromkeys(contract.parent for contract in self._contracts))
+            referenced = partial(referenced_contracts, self, self._contracts, self._inherit, self._cache)
+            affected, unknown = import_graph.affected_contracts(self._changed_files, referenced)
+        for file in unknown:
+            self.logger.warning(f"{file} is not part of the build, skipping")
+        sys.stdout.write("".join(f"{key}\n" for key in affected))
+        if self._cache:
+            save_import_graph(self, import_graph)
+        self._profiler.count("source units", len(import_graph))
+        self._profiler.count("affected contracts", len(affected))
+        self._profiler.finish("contract-cross-reference-graph profile", self._profile_json)
+
+    def _print_import_graph(self, import_graph: ImportGraph) -> Path:
+        """
+        Write the file-level import graph, an edge points from the importing to the imported source unit.
+        """
+        p = self._out / "import-graph.dot"
+        with DotWriter(p, self._direction, "Source unit imports", force=self._force) as g:
+            for node, source_unit_name in enumerate(import_graph.source_unit_names):
+                source_unit = import_graph.source_units[node]
+                g.node(source_unit_name, source_unit_name, self.generate_link(source_unit) if self._links else None)
+            for node, imported in enumerate(import_graph.imports):
+                for target in imported:
+                    g.edge(import_graph.source_unit_names[node], import_graph.source_unit_names[target])
+        return p
+
+    def _print_graph(self) -> List[Path]:
+        """
+        Write the graph files and return the `.dot` files of this run. Files whose content did not change are
+        left untouched unless `--force` is given.
+        """
+        contracts = self._graph.contracts
+
+        # filter stage: one pass over node kinds, edges to filtered out contracts are masked away per row
+        self._profiler.begin("filter")
+        keep = self._graph.node_mask(self._kinds)
+        nodes = list(iter_bits(keep))
+        self._name_index = NameIndex(self._graph)
+        named, unmatched = self._name_index.select_all(self._names)
+        for selector in unmatched:
+            self.logger.warning(f"No contract matches {selector}")
+        self._named = named & keep
+        self._profiler.end("filter")
+        # ended by print() as there are multiple exits
+        self._profiler.begin("output")
+
+        def referrers(node: int) -> Iterator[int]:
+            return iter_bits(self._referrers_mask(node) & keep)
+
+        def referring(node: int) -> Iterator[int]:
+            return iter_bits(self._referring_mask(node) & keep)
+
+        if self._format != "dot" or self._diff_base is not None:
+            export = self._export_graph(keep)
+            if self._format != "dot":
+                export_graph(export, self._out / f"contract-cross-reference-graph.{self._format}", self._format)
+            if self._diff_base is not None:
+                return self._print_diff(export)
+            return []
+
+        if self._single_file:
+            p = self._out / "contract-cross-reference-graph.dot"
 
+        if self._single_file and (self._cluster_by is not None or self._collapse):
+            self._print_clustered(p, nodes, referrers, referring)
 
-    
-# topsort contracts about inheritance
-        if(True):
-            sorted_contracts:List[ir.ContractDefinition] = []
-            in_degree:Dict[ir.ContractDefinition, int] = {}
-            for contract in self._contracts:
-                in_degree[contract] = len(contract.base_contracts) 
-                ## conferm the number of base_contracts is the number of base contracts.
-                ## since type of base_contracts is List[ir.InheritanceSpecifier] thus to reach base contract, 
-                ## we need to traverse SolidityAbc tree to parent.
-
-            que: deque[ir.ContractDefinition] = deque()
-            for contract in self._contracts:
-                if in_degree[contract] == 0:
-                    que.append(contract)
-
-            while len(que) > 0:
-                current_contract = que.popleft()
-                sorted_contracts.append(current_contract)
-                for child_contract in current_contract.child_contracts:
-                    in_degree[child_contract] -= 1
-                    if in_degree[child_contract] == 0:
-                        que.append(child_contract)
-
-            # if len(sorted_contracts) != len(self._contracts):
-            #     raise Exception("Cyclic inheritance")
-            
-            for contract in sorted_contracts:
-                for child_contract in contract.child_contracts:
-                    if isinstance(child_contract, ir.ContractDefinition):
-                        for refering_contract in self._refering_edges[contract]:
-                            self._refering_edges[child_contract].add(refering_contract)
-                            self._refered_edges[refering_contract].add(child_contract)
-
-                        for refered_contract in self._refered_edges[contract]:
-                            self._refered_edges[child_contract].add(refered_contract)
-                            self._refering_edges[refered_contract].add(child_contract)
-
-
-        if(True):
-            ignore_contracts: Set[ir.ContractDefinition] = set()
-            for contract in self._contracts:
-                if contract.kind != ContractKind.CONTRACT or contract.abstract:
-                    ignore_contracts.add(contract)
-            
-            for contract in ignore_contracts:   
-                self._refering_edges.pop(contract)
-                self._refered_edges.pop(contract)
-                self._contracts.remove(contract)
-
-            for contract in self._contracts:
-                refering_contracts_copy = set(self._refering_edges[contract])
-                for refering_contract in refering_contracts_copy:
-                    if refering_contract in ignore_contracts:
-                        self._refering_edges[contract].remove(refering_contract)
-
-                refered_contracts_copy = set(self._refered_edges[contract])
-                for refered_contract in refered_contracts_copy:
-                    if refered_contract in ignore_contracts:
-                        self._refered_edges[contract].remove(refered_contract)
-
-        if self._single_file and len(self._names) == 0:
-            g = gv.Digraph("Contract cross reference")
-            g.attr(rankdir=self._direction)
-            g.attr("node", shape="box")
-            
-            for contract in self._contracts:
-                g.node(self.node_name(contract), contract.name, URL=self.generate_link(contract))
-
-            for contract in self._contracts:
-                for refering_edge in self._refering_edges[contract]:
-                    g.edge(self.node_name(refering_edge), self.node_name(contract))
+        elif self._single_file and len(self._names) == 0:
+            node_names = {node: self.node_name(contracts[node]) for node in nodes}
+            with DotWriter(p, self._direction, force=self._force) as g:
+                for node in nodes:
+                    contract = contracts[node]
+                    g.node(node_names[node], contract.name, self.generate_link(contract))
 
-            p = self._out / "contract-cross-reference-graph.dot"
-            if not self._force and p.exists():
-                self.logger.warning(f"File {p} already exists, skipping")
-                return
-            g.save(p)
+                for node in nodes:
+                    for refering_edge in referrers(node):
+                        g.edge(node_names[refering_edge], node_names[node])
 
         elif not self._single_file : #  and len(self._names) != 0 
-            for contract in self._contracts:
-                added_contracts: Set[ir.ContractDefinition] = set()
-                if contract.name not in self._names:
+            links: Dict[int, str] = {}
+
+            def dot_node(node: int, filled: bool = False) -> DotNode:
+                contract = contracts[node]
+                if node not in links:
+                    links[node] = self.generate_link(contract)
+                return DotNode(self.node_name(contract), contract.name, links[node], filled)
+
+            dot_graphs: Dict[Path, DotGraph] = {}
+            for node in iter_bits(self._named):
+                contract = contracts[node]
+                if self._name_index.is_ambiguous(contract.name):
+                    # contracts with the same name in different files get their own files
+                    file_name = self.node_name(contract).replace("/", "_")
+                else:
+                    file_name = contract.name
+                p = self._out / f"contract-cross-reference-graph-{file_name}.dot"
+                if p in dot_graphs:
+                    self.logger.warning(f"File {p} is written for another contract, skipping")
                     continue
-                g = gv.Digraph("Contract cross reference")
-                g.attr(rankdir=self._direction)
-                g.attr("node", shape="box")
 
-                style="filled"
-                g.node(self.node_name(contract), contract.name, URL=self.generate_link(contract), style=style)
+                added_contracts: Set[int] = {node}
+                dot_nodes = [dot_node(node, filled=True)]
+                dot_edges: List[Tuple[str, str]] = []
                 if self._referrer: # referrer of given contract thus show contracts are refering to given contract
-                    for refering_contract in self._refering_edges[contract]:
-                        if refering_contract not in added_contracts:
-                            g.node(self.node_name(refering_contract), refering_contract.name, URL=self.generate_link(refering_contract))
-                            added_contracts.add(refering_contract)
-                        g.edge(self.node_name(refering_contract), self.node_name(contract))
+                    for refering_node in referrers(node):
+                        if refering_node not in added_contracts:
+                            dot_nodes.append(dot_node(refering_node))
+                            added_contracts.add(refering_node)
+                        dot_edges.append((self.node_name(contracts[refering_node]), self.node_name(contract)))
                 if self._referring: # referring of given contract i.e. show contracts are refered by given contract
-                    for refered_contract in self._refered_edges[contract]:
-                        if refered_contract not in added_contracts:
-                            g.node(self.node_name(refered_contract), refered_contract.name, URL=self.generate_link(refered_contract))
-                            added_contracts.add(refered_contract)
-                        if not self._referring or contract != refered_contract:  # for self reference, there will two same edge
-                            g.edge(self.node_name(contract), self.node_name(refered_contract))
-                p = self._out / f"contract-cross-reference-graph-{contract.name}.dot"
-                if not self._force and p.exists():
-                    self.logger.warning(f"File {p} already exists, skipping")
-                    continue
-                g.save(p)
+                    for refered_node in referring(node):
+                        if refered_node not in added_contracts:
+                            dot_nodes.append(dot_node(refered_node))
+                            added_contracts.add(refered_node)
+                        if not self._referring or node != refered_node:  # for self reference, there will two same edge
+                            dot_edges.append((self.node_name(contract), self.node_name(contracts[refered_node])))
+                dot_graphs[p] = DotGraph(p, self._direction, dot_nodes, dot_edges)
+
+            written = save_dots(list(dot_graphs.values()), self._jobs, self._force)
+            self._profiler.count("dot files unchanged", len(dot_graphs) - written)
+            return list(dot_graphs)
 
         else: # single file and there is names
-            g = gv.Digraph("Contract cross reference")
-            g.attr(rankdir=self._direction)
-            g.attr("node", shape="box")
-            added_contracts: Set[ir.ContractDefinition] = set()
-            added_edges = set()
-            for contract in self._contracts:
-                if contract.name in self._names: # only for names distingish by the name of contract
-                    g.node(self.node_name(contract), contract.name, URL=self.generate_link(contract), style="filled")
-                    added_contracts.add(contract)
-            for contract in self._contracts:
-                if contract.name in self._names: # only for names distingish by the name of contract
-                   
+            with DotWriter(p, self._direction, force=self._force) as g:
+                added_contracts: Set[int] = set()
+                named_nodes = list(iter_bits(self._named))
+                for node in named_nodes:
+                    contract = contracts[node]
+                    g.node(self.node_name(contract), contract.name, self.generate_link(contract), filled=True)
+                    added_contracts.add(node)
+                for node in named_nodes:
+                    contract = contracts[node]
+
                     if self._referrer:
-                        for refering_contract in self._refering_edges[contract]:
-                            if refering_contract not in added_contracts:
-                                g.node(self.node_name(refering_contract), refering_contract.name, URL=self.generate_link(refering_contract))
-                                added_contracts.add(refering_contract)
+                        for refering_node in referrers(node):
+                            refering_contract = contracts[refering_node]
+                            if refering_node not in added_contracts:
+                                g.node(self.node_name(refering_contract), refering_contract.name, self.generate_link(refering_contract))
+                                added_contracts.add(refering_node)
                             g.edge(self.node_name(refering_contract), self.node_name(contract))
 
                     if self._referring:
-                        for refered_contract in self._refered_edges[contract]:
-                            if refered_contract not in added_contracts:
-                                g.node(self.node_name(refered_contract), refered_contract.name, URL=self.generate_link(refered_contract))
-                                added_contracts.add(refered_contract)
-                            if not self._referring or contract != refered_contract: # for self reference, there will two same edge
+                        for refered_node in referring(node):
+                            refered_contract = contracts[refered_node]
+                            if refered_node not in added_contracts:
+                                g.node(self.node_name(refered_contract), refered_contract.name, self.generate_link(refered_contract))
+                                added_contracts.add(refered_node)
+                            if not self._referring or node != refered_node: # for self reference, there will two same edge
                                 g.edge(self.node_name(contract), self.node_name(refered_contract))
-            p = self._out / "contract-cross-reference-graph.dot"
-            if not self._force and p.exists():
-                self.logger.warning(f"File {p} already exists, skipping")
-                return
-            g.save(p)
+
+        return [p]
+
+    def _cluster_key(self, node: int) -> str:
+        source_unit_name = self._graph.source_unit_names[node]
+        if self._cluster_by == "directory":
+            return str(PurePosixPath(source_unit_name).parent)
+        return source_unit_name
+
+    def _print_clustered(
+        self,
+        p: Path,
+        nodes: List[int],
+        referrers: Callable[[int], Iterator[int]],
+        referring: Callable[[int], Iterator[int]],
+    ) -> None:
+        """
+        Single-file graph with contracts grouped into clusters, or with every cluster collapsed into one node
+        and edges between clusters labeled with the number of contract references they stand for.
+        """
+        contracts = self._graph.contracts
+        filled: Set[int] = set()
+        if len(self._names) == 0:
+            selected = nodes
+            edges: Iterable[Tuple[int, int]] = ((refering, node) for node in nodes for refering in referrers(node))
+        else:
+            # same contracts and edges as the single-file graph with names
+            named_nodes = list(iter_bits(self._named))
+            filled.update(named_nodes)
+            added = dict.fromkeys(named_nodes)
+            edge_list: List[Tuple[int, int]] = []
+            for node in named_nodes:
+                if self._referrer:
+                    for refering_node in referrers(node):
+                        added.setdefault(refering_node)
+                        edge_list.append((refering_node, node))
+                if self._referring:
+                    for refered_node in referring(node):
+                        added.setdefault(refered_node)
+                        if node != refered_node:
+                            edge_list.append((node, refered_node))
+            selected = list(added)
+            edges = edge_list
+
+        clusters: Dict[str, List[int]] = {}
+        for node in selected:
+            clusters.setdefault(self._cluster_key(node), []).append(node)
+        cluster_keys = sorted(clusters)
+
+        with DotWriter(p, self._direction, force=self._force) as g:
+            if self._collapse:
+                keys = {node: key for key, members in clusters.items() for node in members}
+                for key in cluster_keys:
+                    members = clusters[key]
+                    count = f"{len(members)} contract" + ("s" if len(members) > 1 else "")
+                    g.node(key, f"{key}\\n{count}", None, filled=any(node in filled for node in members))
+                counts: Dict[Tuple[str, str], int] = {}
+                for source, target in edges:
+                    edge = (keys[source], keys[target])
+                    # references inside a cluster are summarized by the node itself
+                    if edge[0] != edge[1]:
+                        counts[edge] = counts.get(edge, 0) + 1
+                for (source_key, target_key), count in sorted(counts.items()):
+                    g.edge(source_key, target_key, label=str(count))
+            else:
+                for i, key in enumerate(cluster_keys):
+                    g.begin_cluster(str(i), key)
+                    for node in clusters[key]:
+                        contract = contracts[node]
+                        g.node(self.node_name(contract), contract.name, self.generate_link(contract), node in filled)
+                    g.end_cluster()
+                for source, target in edges:
+                    g.edge(self.node_name(contracts[source]), self.node_name(contracts[target]))
+
+    def _referring_mask(self, node: int) -> int:
+        if self._lazy is not None:
+            if self._transitive:
+                return self._lazy.reachable(node, False, self._depth)
+            return self._lazy.referring(node)
+        if self._transitive:
+            return self._reachability[0].reachable(node, self._depth)
+        return self._inherited.referring[node]
+
+    def _referrers_mask(self, node: int) -> int:
+        if self._lazy is not None:
+            if self._transitive:
+                return self._lazy.reachable(node, True, self._depth)
+            return self._lazy.referrers(node)
+        if self._transitive:
+            return self._reachability[1].reachable(node, self._depth)
+        return self._inherited.referrers[node]
+
+    def _render_dots(self, paths: List[Path]) -> None:
+        renderer = Renderer(
+            self.config.project_root_path / ".wake" / "contract-cross-reference-graph-renders",  # pyright: ignore reportGeneralTypeIssues
+            self._engine,
+            self._render,  # pyright: ignore reportGeneralTypeIssues
+            self._force,
+        )
+        try:
+            results = renderer.render_all(paths, self._jobs)
+        except ImportError:
+            self.logger.error("Rendering requires the graphviz package, install it with `pip install graphviz`")
+            return
+        except RuntimeError as e:
+            # graphviz.ExecutableNotFound when the Graphviz binaries are not installed
+            self.logger.error(f"Rendering failed: {e}")
+            return
+        failed = [result for result in results if result.error is not None]
+        for result in failed:
+            self.logger.error(f"Rendering {result.path} failed: {result.error}")
+        laid_out = sum(result.laid_out for result in results)
+        self._profiler.count("graphs laid out", laid_out)
+        self._profiler.count("graphs reused from render cache", len(results) - laid_out - len(failed))
+        self._profiler.count("graphs failed to render", len(failed))
+
+    def _export_graph(self, keep: int) -> ExportGraph:
+        """
+        Graph of contracts of the selected kinds as written by `--format` and compared by `--diff-base`. With `--name`,
+        only the named contracts and their referrers / referring contracts are exported.
+        """
+        named = self._named
+        if len(self._names) == 0:
+            selected = keep
+        else:
+            selected = named
+            for node in iter_bits(named):
+                if self._referrer:
+                    selected |= self._referrers_mask(node) & keep
+                if self._referring:
+                    selected |= self._referring_mask(node) & keep
+
+        nodes = list(iter_bits(selected))
+        local = {node: i for i, node in enumerate(nodes)}
+        export = ExportGraph([], [], [], [])
+        for node in nodes:
+            contract = self._graph.contracts[node]
+            export.nodes.append(
+                ExportNode(
+                    self._graph.keys[node],
+                    contract.name,
+                    self._graph.source_unit_names[node],
+                    self._graph.kinds[node],
+                    self.generate_link(contract) if self._links else "",
+                )
+            )
+            targets = self._referring_mask(node) & selected
+            if named:
+                # same edges as the single-file graph: from named contracts with --referring, into them with --referrer
+                allowed = named if self._referrer else 0
+                if self._referring and named >> node & 1:
+                    allowed = selected
+                targets &= allowed
+            row = list(iter_bits(targets))
+            export.referring.append([local[target] for target in row])
+            export.edge_kinds.append([int(self._graph.edge_kinds.get((node, target), 0)) for target in row])
+            export.edge_counts.append([self._graph.edge_counts.get((node, target), 0) for target in row])
+        return export
+
+    def _print_diff(self, head: ExportGraph) -> List[Path]:
+        """
+        Compare the graph of this build with the `--diff-base` snapshot. The text diff goes to standard output, JSON and
+        DOT diffs to the output directory. Returns the `.dot` files of this run.
+        """
+        assert self._diff_base is not None
+        diff = diff_graphs(load_graph(self._diff_base), head)
+        self._profiler.count("changed nodes", len(diff.added_nodes) + len(diff.removed_nodes))
+        self._profiler.count("changed edges", len(diff.added_edges) + len(diff.removed_edges))
+        if self._diff_format == "text":
+            sys.stdout.write(diff_text(diff))
+            return []
+        elif self._diff_format == "json":
+            (self._out / "contract-cross-reference-diff.json").write_text(diff_json(diff) + "\n")
+            return []
+        p = self._out / "contract-cross-reference-diff.dot"
+        write_diff_dot(diff, p, self._direction, self._force)
+        return [p]
 
     def visit_contract_definition(self, node:ir.ContractDefinition):
         self._contracts.append(node)
+
+    def visit_source_unit(self, node: ir.SourceUnit):
+        if self._collector is not None:
+            self._collector.visit_source_unit(node)
+
+    def visit_identifier(self, node: ir.Identifier):
+        if self._collector is not None:
+            self._collector.visit_identifier(node)
+
+    def visit_member_access(self, node: ir.MemberAccess):
+        if self._collector is not None:
+            self._collector.visit_member_access(node)
+
+    def visit_identifier_path(self, node: ir.IdentifierPath):
+        if self._collector is not None:
+            self._collector.visit_identifier_path(node)
+
+    def visit_user_defined_type_name(self, node: ir.UserDefinedTypeName):
+        if self._collector is not None:
+            self._collector.visit_user_defined_type_name(node)
     
     @printer.command(name="contract-cross-reference-graph")
     @click.option(
@@ -264,7 +511,7 @@ class ContractCrossReferenceGraphPrinter(Printer):
         "names",
         type=SolidityName("contract", case_sensitive=False),
         multiple=True,
-        help="Contract names",
+        help="Contracts to show: a name, a glob (Token*), a regex (re:^Pool\\d+$) or source_unit_name:Contract.",
     )
 
     @click.option(
@@ -272,7 +519,7 @@ class ContractCrossReferenceGraphPrinter(Printer):
         "-f",
         is_flag=True,
         default=False,
-        help="Overwrite existing files",
+        help="Rewrite files and lay out rendered graphs again even when their content did not change.",
     )
     @click.option(
         "-o",
@@ -315,6 +562,117 @@ class ContractCrossReferenceGraphPrinter(Printer):
         default=True,
         help="Generate contracts that are referenced by the contract.",
     )
+    @click.option(
+        "--kind",
+        "kinds",
+        type=click.Choice(CONTRACT_KINDS),
+        multiple=True,
+        default=["contract"],
+        help="Kinds of contracts to keep in the graph, edges to other contracts are dropped.",
+    )
+    @click.option(
+        "--edge-kind",
+        "edge_kinds",
+        type=click.Choice(list(EDGE_KINDS)),
+        multiple=True,
+        help="Only follow references of the given kinds, all kinds by default.",
+    )
+    @click.option(
+        "--transitive",
+        is_flag=True,
+        default=False,
+        help="Show all contracts referring to / referenced by a contract transitively instead of direct ones only.",
+    )
+    @click.option(
+        "--depth",
+        type=click.IntRange(min=1),
+        default=None,
+        help="Follow references transitively up to the given number of hops, implies --transitive.",
+    )
+    @click.option(
+        "--lazy/--no-lazy",
+        "lazy",
+        default=True,
+        help="With --name, analyse only the files needed for the named contracts instead of the whole project.",
+    )
+    @click.option(
+        "--cluster-by",
+        type=click.Choice(["source-unit", "directory"]),
+        default=None,
+        help="Group contracts into clusters by source unit or directory, single-file graphs only.",
+    )
+    @click.option(
+        "--collapse",
+        is_flag=True,
+        default=False,
+        help="Draw every cluster as one node with edges counting the references between clusters, implies --cluster-by source-unit, single-file graphs only.",
+    )
+    @click.option(
+        "--format",
+        "format",
+        type=click.Choice(("dot",) + EXPORT_FORMATS),
+        default="dot",
+        help="Output format, jsonl, graphml and csr (binary adjacency) write a single file regardless of --multiple-files.",
+    )
+    @click.option(
+        "--render",
+        type=click.Choice(RENDER_FORMATS),
+        default=None,
+        help="Also render every .dot file to an image next to it, graphs that did not change are taken from a cache.",
+    )
+    @click.option(
+        "--engine",
+        type=click.Choice(LAYOUT_ENGINES),
+        default="dot",
+        help="Graphviz layout engine used by --render.",
+    )
+    @click.option(
+        "--jobs",
+        "-j",
+        type=click.IntRange(min=1),
+        default=1,
+        help="Number of worker processes saving per-contract graphs with --multiple-files and of parallel --render layouts.",
+    )
+    @click.option(
+        "--import-graph",
+        is_flag=True,
+        default=False,
+        help="Also write the source unit import graph to import-graph.dot.",
+    )
+    @click.option(
+        "--changed-files",
+        multiple=True,
+        help="Only print the contracts whose cross references can change when the given files change, by source unit name or path.",
+    )
+    @click.option(
+        "--diff-base",
+        type=click.Path(exists=True, dir_okay=False),
+        default=None,
+        help="Compare the graph with a snapshot saved by an earlier run with --format jsonl, graphml or csr instead of writing it.",
+    )
+    @click.option(
+        "--diff-format",
+        type=click.Choice(DIFF_FORMATS),
+        default="text",
+        help="Output of --diff-base, text goes to standard output, json and dot to contract-cross-reference-diff.* files.",
+    )
+    @click.option(
+        "--cache/--no-cache",
+        default=True,
+        help="Reuse per-file reference analysis cached in .wake/ for files whose imports did not change.",
+    )
+    @click.option(
+        "--profile",
+        is_flag=True,
+        default=False,
+        help="Print time spent in each phase, analysis counters and peak memory usage.",
+    )
+    @click.option(
+        "--profile-json",
+        type=click.Path(dir_okay=False, writable=True),
+        default=None,
+        help="Write the profile as JSON to the given file, implies --profile.",
+    )
 
     
     def cli(
@@ -328,10 +686,34 @@ class ContractCrossReferenceGraphPrinter(Printer):
         single_file: bool,
         referrer: bool,
         referring: bool,
+        kinds: Tuple[str, ...],
+        edge_kinds: Tuple[str, ...],
+        transitive: bool,
+        depth: int | None,
+        lazy: bool,
+        cluster_by: str | None,
+        collapse: bool,
+        format: str,
+        render: str | None,
+        engine: str,
+        jobs: int,
+        import_graph: bool,
+        changed_files: Tuple[str, ...],
+        diff_base: str | None,
+        diff_format: str,
+        cache: bool,
+        profile: bool,
+        profile_json: str | None,
     ) -> None:
         """
         Generate contract cross reference graph.
         """
+        writes_dot = format == "dot" or (diff_base is not None and diff_format == "dot")
+        if render is not None and not writes_dot:
+            raise click.UsageError(f"--render needs .dot files to render, --format {format} writes none")
+        if (cluster_by is not None or collapse) and not single_file:
+            raise click.UsageError("--cluster-by and --collapse only apply to --single-file graphs")
+
         self._names = names
         self._force = force
         self._out = Path(out).resolve()
@@ -342,3 +724,31 @@ class ContractCrossReferenceGraphPrinter(Printer):
         self._single_file = single_file
         self._referrer = referrer
         self._referring = referring
+        self._kinds = kinds
+        self._edge_kinds = ReferenceKind.ALL
+        if len(edge_kinds) != 0:
+            self._edge_kinds = ReferenceKind(0)
+            for edge_kind in edge_kinds:
+                self._edge_kinds |= EDGE_KINDS[edge_kind]
+        self._transitive = transitive or depth is not None
+        self._depth = depth
+        self._lazy_mode = lazy
+        self._cluster_by = "source-unit" if collapse and cluster_by is None else cluster_by
+        self._collapse = collapse
+        self._changed_files = changed_files
+        self._write_import_graph = import_graph
+        self._diff_base = Path(diff_base) if diff_base is not None else None
+        self._diff_format = diff_format
+        # record edges of files that are not cached while wake visits the IR instead of walking them again in print(),
+        # a lazy run analyses only the source units it needs on demand and --changed-files only the importers of the files
+        if (len(names) == 0 or not lazy) and len(changed_files) == 0:
+            self._collector = printer_visit_builder(self, inherit, cache)
+        self._format = format
+        self._render = render
+        self._engine = engine
+        self._jobs = jobs
+        self._cache = cache
+        self._profile_json = Path(profile_json) if profile_json is not None else None
+        self._profiler = Profiler(profile or profile_json is not None)
+        # wake visits the IR between cli() and print()
+        self._profiler.begin("visit")
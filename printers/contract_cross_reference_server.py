@@ -0,0 +1,163 @@
+from __future__ import annotations
+
+from pathlib import Path
+from typing import List, Tuple
+
+import rich_click as click
+
+import wake.ir as ir
+from wake.printers import Printer, printer
+
+from .profiling import Profiler
+from .query_client import DEFAULT_SOCKET
+from .query_server import get_server
+from .reference_graph import EDGE_KINDS, InheritedReferenceGraph, ReferenceGraphBuilder, ReferenceKind
+from .reference_graph_session import printer_visit_builder, refresh_printer_session, save_import_graph
+
+
+def _watching() -> bool:
+    """
+    Whether the printer runs under `wake print --watch`, which calls it again in the same process for every build.
+    """
+    ctx = click.get_current_context(silent=True)
+    while ctx is not None:
+        if ctx.command.name == "print":
+            return bool(ctx.params.get("watch", False))
+        ctx = ctx.parent
+    return False
+
+
+class ContractCrossReferenceServerPrinter(Printer):
+    _socket: Path
+    _inherit: bool
+    _edge_kinds: ReferenceKind
+    _cache: bool
+    _watch: bool
+    _contracts: List[ir.ContractDefinition]
+    _collector: ReferenceGraphBuilder | None
+    _profiler: Profiler
+    _profile_json: Path | None
+
+    def __init__(self):
+        self._contracts = []
+        self._collector = None
+
+    def print(self) -> None:
+        profiler = self._profiler
+        profiler.end("visit")
+
+        with profiler.phase("reference graph"):
+            # the session outlives this printer instance, later builds only analyse the files that changed
+            session = refresh_printer_session(self, self._contracts, self._inherit, self._cache, self._collector)
+        if self._cache:
+            save_import_graph(self, session.import_graph)
+        with profiler.phase("publish"):
+            # the session graph is updated in place by the next build, the server gets a copy of its own
+            server = get_server(self._socket)
+            graph = session.graph.filtered(self._edge_kinds)
+            # answer from the same inheritance propagated references contract-cross-reference-graph prints
+            if self._edge_kinds == ReferenceKind.ALL:
+                inherited = session.inherited
+            else:
+                inherited = InheritedReferenceGraph(graph)
+            snapshot = server.publish(graph, inherited)
+
+        profiler.count_graph(session.builder, session.graph)
+        profiler.count("generation", snapshot.generation)
+        profiler.finish("contract-cross-reference-server profile", self._profile_json)
+
+        self.logger.info(f"Serving {len(snapshot.graph)} contracts on {self._socket}, generation {snapshot.generation}")
+        if not self._watch:
+            # nothing will publish a newer graph, keep serving this one until interrupted
+            self.logger.warning("Run with wake print --watch to refresh the graph when sources change")
+            server.serve_forever()
+
+    def visit_contract_definition(self, node: ir.ContractDefinition):
+        self._contracts.append(node)
+
+    def visit_source_unit(self, node: ir.SourceUnit):
+        if self._collector is not None:
+            self._collector.visit_source_unit(node)
+
+    def visit_identifier(self, node: ir.Identifier):
+        if self._collector is not None:
+            self._collector.visit_identifier(node)
+
+    def visit_member_access(self, node: ir.MemberAccess):
+        if self._collector is not None:
+            self._collector.visit_member_access(node)
+
+    def visit_identifier_path(self, node: ir.IdentifierPath):
+        if self._collector is not None:
+            self._collector.visit_identifier_path(node)
+
+    def visit_user_defined_type_name(self, node: ir.UserDefinedTypeName):
+        if self._collector is not None:
+            self._collector.visit_user_defined_type_name(node)
+
+    @printer.command(name="contract-cross-reference-server")
+    @click.option(
+        "--socket",
+        "socket_path",
+        type=click.Path(dir_okay=False),
+        default=DEFAULT_SOCKET,
+        help="Unix socket to answer queries on, see printers/query_client.py.",
+    )
+    @click.option(
+        "--inherit",
+        is_flag=True,
+        default=False,
+        help="Include references in inheritance specifiers.",
+    )
+    @click.option(
+        "--edge-kind",
+        "edge_kinds",
+        type=click.Choice(list(EDGE_KINDS)),
+        multiple=True,
+        help="Only follow references of the given kinds, all kinds by default.",
+    )
+    @click.option(
+        "--cache/--no-cache",
+        default=True,
+        help="Reuse per-file reference analysis cached in .wake/ for files whose imports did not change.",
+    )
+    @click.option(
+        "--profile",
+        is_flag=True,
+        default=False,
+        help="Print time spent in each phase, analysis counters and peak memory usage for every build.",
+    )
+    @click.option(
+        "--profile-json",
+        type=click.Path(dir_okay=False, writable=True),
+        default=None,
+        help="Write the profile of the last build as JSON to the given file, implies --profile.",
+    )
+    def cli(
+        self,
+        socket_path: str,
+        inherit: bool,
+        edge_kinds: Tuple[str, ...],
+        cache: bool,
+        profile: bool,
+        profile_json: str | None,
+    ) -> None:
+        """
+        Answer referrer, referring, transitive and path queries over a Unix socket from a graph kept in memory.
+        References are propagated along inheritance as in contract-cross-reference-graph.
+        """
+        self._socket = Path(socket_path).resolve()
+        self._inherit = inherit
+        self._edge_kinds = ReferenceKind.ALL
+        if len(edge_kinds) != 0:
+            self._edge_kinds = ReferenceKind(0)
+            for edge_kind in edge_kinds:
+                self._edge_kinds |= EDGE_KINDS[edge_kind]
+        self._cache = cache
+        self._watch = _watching()
+        # record edges of files that are not cached while wake visits the IR instead of walking them again in print()
+        self._collector = printer_visit_builder(self, inherit, cache)
+        self._profile_json = Path(profile_json) if profile_json is not None else None
+        self._profiler = Profiler(profile or profile_json is not None)
+        # wake visits the IR between cli() and print()
+        self._profiler.begin("visit")
@@ -0,0 +1,96 @@
+from __future__ import annotations
+
+from typing import Dict, List, Tuple
+
+from .graph_algorithms import strongly_connected_components
+from .reference_graph import ReferenceGraph, ReferenceKind
+
+
+class Condensation:
+    """
+    Strongly connected components of a [ReferenceGraph][printers.reference_graph.ReferenceGraph] and the DAG of
+    references between them, in time linear in contracts plus edges.
+
+    Only edges created from at least one reference of the given `kinds` between nodes in the `mask` bitset are
+    followed. Components are in reverse topological order with sorted members, and `successors[c]` maps each component
+    referred to from component `c` to the number of references behind the edges between them.
+    """
+
+    components: List[List[int]]
+    component_of: Dict[int, int]
+    successors: List[Dict[int, int]]
+    _graph: ReferenceGraph
+    _referring: List[List[int]]
+
+    def __init__(self, graph: ReferenceGraph, kinds: ReferenceKind = ReferenceKind.ALL, mask: int = -1):
+        self._graph = graph
+        self._referring = [
+            sorted(
+                target
+                for target in graph.referring[source]
+                if mask >> target & 1 and graph.edge_kinds[(source, target)] & kinds
+            )
+            if mask >> source & 1
+            else []
+            for source in range(len(graph))
+        ]
+
+        self.components = []
+        self.component_of = {}
+        for component in strongly_connected_components(self._referring):
+            if not mask >> component[0] & 1:
+                continue
+            for member in component:
+                self.component_of[member] = len(self.components)
+            self.components.append(sorted(component))
+
+        self.successors = [{} for _ in self.components]
+        for source, targets in enumerate(self._referring):
+            for target in targets:
+                source_component = self.component_of[source]
+                target_component = self.component_of[target]
+                if source_component != target_component:
+                    successors = self.successors[source_component]
+                    successors[target_component] = (
+                        successors.get(target_component, 0) + graph.edge_counts[(source, target)]
+                    )
+
+    def cycles(self) -> List[int]:
+        """
+        Components of more than one contract, contracts referring to themselves are not cycles.
+        """
+        return [component for component, members in enumerate(self.components) if len(members) > 1]
+
+    def internal_edges(self, component: int) -> List[Tuple[int, int]]:
+        """
+        Edges `(source, target)` between different members of `component`.
+        """
+        return [
+            (source, target)
+            for source in self.components[component]
+            for target in self._referring[source]
+            if target != source and self.component_of[target] == component
+        ]
+
+    def witness(self, component: int) -> List[int]:
+        """
+        Shortest cycle through the first member of `component`, starting and ending with it.
+        """
+        start = self.components[component][0]
+        previous = {start: start}
+        frontier = [start]
+        while frontier:
+            next_frontier = []
+            for node in frontier:
+                for target in self._referring[node]:
+                    if target == start and node != start:
+                        path = []
+                        while node != start:
+                            path.append(node)
+                            node = previous[node]
+                        return [start] + path[::-1] + [start]
+                    if target not in previous and self.component_of[target] == component:
+                        previous[target] = node
+                        next_frontier.append(target)
+            frontier = next_frontier
+        return [start]
@@ -0,0 +1,149 @@
+from __future__ import annotations
+
+import filecmp
+import re
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from pathlib import Path
+from typing import IO, Dict, List, NamedTuple, Sequence, Tuple
+
+# same quoting rules as the graphviz package, so the written files do not change when switching writers
+_ID = re.compile(r"([a-zA-Z_][a-zA-Z0-9_]*|-?(\.[0-9]+|[0-9]+(\.[0-9]*)?))$")
+_KEYWORDS = {"node", "edge", "graph", "digraph", "subgraph", "strict"}
+_QUOTE = re.compile(r'(?P<bs>(?:\\\\)*)\\?(?P<quote>")')
+
+
+def quote(identifier: str) -> str:
+    if _ID.match(identifier) and identifier.lower() not in _KEYWORDS:
+        return identifier
+    return '"' + _QUOTE.sub(r"\g<bs>\\\g<quote>", identifier) + '"'
+
+
+class DotWriter:
+    """
+    Streaming writer of a directed graph in the DOT language. Nodes and edges go straight to a buffered file
+    instead of being collected in a `graphviz.Digraph` first, keeping memory flat for graphs of any size.
+
+    The graph is written next to `path` first and only replaces it when the content differs (or with `force`),
+    so unchanged files keep their modification time and `changed` tells whether anything was written.
+    """
+
+    changed: bool
+    _path: Path
+    _temporary: Path
+    _force: bool
+    _file: IO[str]
+    _quoted: Dict[str, str]
+    _indent: str
+
+    def __init__(self, path: Path, rankdir: str, name: str = "Contract cross reference", force: bool = False):
+        self.changed = False
+        self._path = path
+        self._temporary = path.with_name(path.name + ".tmp")
+        self._force = force
+        self._file = open(self._temporary, "w", encoding="utf-8", buffering=1 << 16)
+        # node ids repeat across edges, quote each of them once
+        self._quoted = {}
+        self._indent = "\t"
+        self._file.write(f"digraph {quote(name)} {{\n\trankdir={quote(rankdir)}\n\tnode [shape=box]\n")
+
+    def _id(self, id: str) -> str:
+        quoted = self._quoted.get(id)
+        if quoted is None:
+            quoted = self._quoted[id] = quote(id)
+        return quoted
+
+    def node(self, id: str, label: str, url: str | None, filled: bool = False, color: str | None = None) -> None:
+        url_attr = f" URL={quote(url)}" if url is not None else ""
+        style = " style=filled" if filled else ""
+        color_attr = f" color={quote(color)} fontcolor={quote(color)}" if color is not None else ""
+        self._file.write(f"{self._indent}{self._id(id)} [label={quote(label)}{url_attr}{style}{color_attr}]\n")
+
+    def edge(
+        self, from_: str, to: str, label: str | None = None, color: str | None = None, style: str | None = None
+    ) -> None:
+        attrs = []
+        if label is not None:
+            attrs.append(f"label={quote(label)}")
+        if color is not None:
+            attrs.append(f"color={quote(color)}")
+        if style is not None:
+            attrs.append(f"style={quote(style)}")
+        attrs_text = f" [{' '.join(attrs)}]" if attrs else ""
+        self._file.write(f"{self._indent}{self._id(from_)} -> {self._id(to)}{attrs_text}\n")
+
+    def begin_cluster(self, name: str, label: str) -> None:
+        """
+        Start a subgraph drawn as a box around its nodes, nodes written until `end_cluster` belong to it.
+        """
+        self._file.write(f"{self._indent}subgraph {quote('cluster_' + name)} {{\n")
+        self._indent += "\t"
+        self._file.write(f"{self._indent}label={quote(label)}\n")
+
+    def end_cluster(self) -> None:
+        self._indent = self._indent[:-1]
+        self._file.write(f"{self._indent}}}\n")
+
+    def close(self) -> None:
+        if not self._file.closed:
+            self._file.write("}\n")
+            self._file.close()
+            if not self._force and self._path.exists() and filecmp.cmp(self._temporary, self._path, shallow=False):
+                self._temporary.unlink()
+            else:
+                self._temporary.replace(self._path)
+                self.changed = True
+
+    def __enter__(self) -> DotWriter:
+        return self
+
+    def __exit__(self, exc_type, *args) -> None:
+        if exc_type is None:
+            self.close()
+        else:
+            # keep the previous file instead of replacing it with a partial graph
+            self._file.close()
+            self._temporary.unlink(missing_ok=True)
+
+
+class DotNode(NamedTuple):
+    id: str
+    label: str
+    url: str
+    filled: bool
+
+
+class DotGraph(NamedTuple):
+    """
+    Picklable description of one `.dot` file, independent of the IR so that it can be saved in a worker process.
+    """
+
+    path: Path
+    rankdir: str
+    nodes: List[DotNode]
+    edges: List[Tuple[str, str]]
+
+
+def save_dot(graph: DotGraph, force: bool = False) -> bool:
+    """
+    Save `graph` unless the file already has the same content, return whether the file was written.
+    """
+    with DotWriter(graph.path, graph.rankdir, force=force) as writer:
+        for node in graph.nodes:
+            writer.node(*node)
+        for from_, to in graph.edges:
+            writer.edge(from_, to)
+    return writer.changed
+
+
+def save_dots(graphs: Sequence[DotGraph], jobs: int, force: bool = False) -> int:
+    """
+    Save `graphs`, sharded across `jobs` worker processes, and return the number of files written. File contents
+    only depend on the graph descriptions, so the output is the same for any number of jobs.
+    """
+    if jobs <= 1 or len(graphs) <= 1:
+        return sum(save_dot(graph, force) for graph in graphs)
+
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        # consuming the results re-raises worker exceptions
+        return sum(executor.map(partial(save_dot, force=force), graphs, chunksize=max(1, len(graphs) // (jobs * 4))))
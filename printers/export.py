@@ -0,0 +1,215 @@
+from __future__ import annotations
+
+import json
+import struct
+import sys
+from array import array
+from pathlib import Path
+from typing import List, NamedTuple, Tuple
+
+EXPORT_FORMATS = ("jsonl", "graphml", "csr")
+
+CSR_MAGIC = b"CCRG"
+CSR_VERSION = 2
+# magic, version, node count, edge count, byte length of the node metadata
+_CSR_HEADER = struct.Struct("<4sIIII")
+
+
+class ExportNode(NamedTuple):
+    key: str
+    name: str
+    source_unit_name: str
+    kind: str
+    link: str
+
+
+class ExportGraph(NamedTuple):
+    """
+    Graph with nodes numbered `0..len(nodes) - 1`. `referring[i]` holds the sorted targets of the edges from node `i`
+    and `edge_kinds[i]` and `edge_counts[i]` the matching [ReferenceKind][printers.reference_graph.ReferenceKind]
+    values and numbers of references, `0` for edges only created by inheritance.
+    """
+
+    nodes: List[ExportNode]
+    referring: List[List[int]]
+    edge_kinds: List[List[int]]
+    edge_counts: List[List[int]]
+
+
+def export_graph(graph: ExportGraph, path: Path, format: str) -> None:
+    if format == "jsonl":
+        write_jsonl(graph, path)
+    elif format == "graphml":
+        write_graphml(graph, path)
+    elif format == "csr":
+        write_csr(graph, path)
+    else:
+        raise ValueError(f"Unknown export format: {format}")
+
+
+def load_graph(path: Path) -> ExportGraph:
+    """
+    Load a graph exported in any of the [EXPORT_FORMATS][printers.export.EXPORT_FORMATS], the format is given by the
+    file suffix.
+    """
+    format = path.suffix[1:]
+    if format == "jsonl":
+        return read_jsonl(path)
+    elif format == "graphml":
+        return read_graphml(path)
+    elif format == "csr":
+        nodes, offsets, targets, counts, kinds = read_csr(path)
+        return ExportGraph(
+            nodes,
+            [list(targets[offsets[i] : offsets[i + 1]]) for i in range(len(nodes))],
+            [list(kinds[offsets[i] : offsets[i + 1]]) for i in range(len(nodes))],
+            [list(counts[offsets[i] : offsets[i + 1]]) for i in range(len(nodes))],
+        )
+    raise ValueError(f"Unknown export format: {path.suffix}")
+
+
+def write_jsonl(graph: ExportGraph, path: Path) -> None:
+    """
+    One JSON object per line, first all nodes and then all edges, so readers can stream the file.
+    """
+    with path.open("w", encoding="utf-8", buffering=1 << 16) as f:
+        dumps = json.JSONEncoder(separators=(",", ":")).encode
+        for i, node in enumerate(graph.nodes):
+            f.write(
+                dumps(
+                    {
+                        "type": "node",
+                        "id": i,
+                        "key": node.key,
+                        "name": node.name,
+                        "source_unit": node.source_unit_name,
+                        "kind": node.kind,
+                        "link": node.link,
+                    }
+                )
+            )
+            f.write("\n")
+        for source, (targets, kinds, counts) in enumerate(zip(graph.referring, graph.edge_kinds, graph.edge_counts)):
+            for target, kind, count in zip(targets, kinds, counts):
+                f.write(f'{{"type":"edge","source":{source},"target":{target},"kind":{kind},"references":{count}}}\n')
+
+
+def read_jsonl(path: Path) -> ExportGraph:
+    graph = ExportGraph([], [], [], [])
+    with path.open(encoding="utf-8") as f:
+        for line in f:
+            record = json.loads(line)
+            if record["type"] == "node":
+                graph.nodes.append(
+                    ExportNode(
+                        record["key"], record["name"], record["source_unit"], record["kind"], record["link"]
+                    )
+                )
+                graph.referring.append([])
+                graph.edge_kinds.append([])
+                graph.edge_counts.append([])
+            else:
+                source = record["source"]
+                graph.referring[source].append(record["target"])
+                graph.edge_kinds[source].append(record["kind"])
+                graph.edge_counts[source].append(record["references"])
+    return graph
+
+
+def write_graphml(graph: ExportGraph, path: Path) -> None:
+    import networkx as nx
+
+    g = nx.DiGraph()
+    for i, node in enumerate(graph.nodes):
+        g.add_node(
+            i,
+            key=node.key,
+            name=node.name,
+            source_unit=node.source_unit_name,
+            kind=node.kind,
+            link=node.link,
+        )
+    for source, (targets, kinds, counts) in enumerate(zip(graph.referring, graph.edge_kinds, graph.edge_counts)):
+        for target, kind, count in zip(targets, kinds, counts):
+            g.add_edge(source, target, kind=kind, references=count)
+    nx.write_graphml(g, path)
+
+
+def read_graphml(path: Path) -> ExportGraph:
+    import networkx as nx
+
+    g = nx.read_graphml(path, node_type=int)
+    nodes = sorted(g.nodes)
+    graph = ExportGraph([], [], [], [])
+    for node in nodes:
+        data = g.nodes[node]
+        graph.nodes.append(
+            ExportNode(data["key"], data["name"], data["source_unit"], data["kind"], data.get("link", ""))
+        )
+        targets = sorted(g.successors(node))
+        graph.referring.append(targets)
+        graph.edge_kinds.append([g.edges[node, target]["kind"] for target in targets])
+        graph.edge_counts.append([g.edges[node, target]["references"] for target in targets])
+    return graph
+
+
+def _little_endian(a: array) -> bytes:
+    if sys.byteorder != "little":
+        a = array(a.typecode, a)
+        a.byteswap()
+    return a.tobytes()
+
+
+def write_csr(graph: ExportGraph, path: Path) -> None:
+    """
+    Compressed sparse row layout, all integers little-endian:
+
+    - header: magic `CCRG`, u32 version, u32 node count `n`, u32 edge count `m`, u32 metadata length,
+    - node metadata: UTF-8 JSON list of `[key, name, source_unit, kind, link]`,
+    - `n + 1` u32 offsets into the edge arrays, the edges of node `i` are `offsets[i]..offsets[i + 1]`,
+    - `m` u32 edge targets,
+    - `m` u32 numbers of references per edge,
+    - `m` u8 edge kinds.
+    """
+    offsets = array("I", [0])
+    targets = array("I")
+    counts = array("I")
+    kinds = array("B")
+    for node_targets, node_kinds, node_counts in zip(graph.referring, graph.edge_kinds, graph.edge_counts):
+        targets.extend(node_targets)
+        counts.extend(node_counts)
+        kinds.extend(node_kinds)
+        offsets.append(len(targets))
+    metadata = json.dumps([list(node) for node in graph.nodes], separators=(",", ":")).encode("utf-8")
+
+    with path.open("wb") as f:
+        f.write(_CSR_HEADER.pack(CSR_MAGIC, CSR_VERSION, len(graph.nodes), len(targets), len(metadata)))
+        f.write(metadata)
+        f.write(_little_endian(offsets))
+        f.write(_little_endian(targets))
+        f.write(_little_endian(counts))
+        f.write(kinds.tobytes())
+
+
+def read_csr(path: Path) -> Tuple[List[ExportNode], array, array, array, array]:
+    """
+    Load a file written by [write_csr][printers.export.write_csr], returning nodes, offsets, targets, numbers of
+    references and edge kinds.
+    """
+    data = path.read_bytes()
+    magic, version, n, m, metadata_length = _CSR_HEADER.unpack_from(data)
+    if magic != CSR_MAGIC or version != CSR_VERSION:
+        raise ValueError(f"{path} is not a version {CSR_VERSION} contract cross reference CSR file")
+    position = _CSR_HEADER.size
+    nodes = [ExportNode(*node) for node in json.loads(data[position : position + metadata_length])]
+    position += metadata_length
+
+    arrays: List[array] = []
+    for typecode, length in (("I", n + 1), ("I", m), ("I", m), ("B", m)):
+        a = array(typecode)
+        a.frombytes(data[position : position + length * a.itemsize])
+        if sys.byteorder != "little":
+            a.byteswap()
+        position += length * a.itemsize
+        arrays.append(a)
+    return nodes, arrays[0], arrays[1], arrays[2], arrays[3]
@@ -0,0 +1,66 @@
+from __future__ import annotations
+
+from typing import Iterable, Iterator, List, Sequence
+
+
+def strongly_connected_components(successors: Sequence[Iterable[int]]) -> List[List[int]]:
+    """
+    Iterative Tarjan's algorithm over nodes `0..len(successors) - 1`, safe for graphs of any depth.
+
+    Components are returned in reverse topological order: every component comes after all components reachable from it.
+    """
+    n = len(successors)
+    index = [-1] * n
+    low = [0] * n
+    on_stack = [False] * n
+    stack: List[int] = []
+    components: List[List[int]] = []
+    counter = 0
+
+    for root in range(n):
+        if index[root] != -1:
+            continue
+        index[root] = low[root] = counter
+        counter += 1
+        stack.append(root)
+        on_stack[root] = True
+        work = [(root, iter(successors[root]))]
+
+        while work:
+            node, children = work[-1]
+            for child in children:
+                if index[child] == -1:
+                    index[child] = low[child] = counter
+                    counter += 1
+                    stack.append(child)
+                    on_stack[child] = True
+                    work.append((child, iter(successors[child])))
+                    break
+                if on_stack[child] and index[child] < low[node]:
+                    low[node] = index[child]
+            else:
+                work.pop()
+                if work and low[node] < low[work[-1][0]]:
+                    low[work[-1][0]] = low[node]
+                if low[node] == index[node]:
+                    component = []
+                    while True:
+                        member = stack.pop()
+                        on_stack[member] = False
+                        component.append(member)
+                        if member == node:
+                            break
+                    components.append(component)
+    return components
+
+
+def iter_bits(mask: int) -> Iterator[int]:
+    """
+    Yield the indices of set bits of a bitset in ascending order.
+    """
+    # scanning the binary string runs in C and stays linear in the bitset width, unlike repeated shifts and masks
+    bits = bin(mask)[:1:-1]
+    index = bits.find("1")
+    while index != -1:
+        yield index
+        index = bits.find("1", index + 1)
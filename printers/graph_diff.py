@@ -0,0 +1,186 @@
+"""
+Difference between two exported contract cross reference graphs, for example of the base branch and of HEAD.
+
+Nodes are matched by their stable `source_unit_name:Contract` keys and edges by the keys of their endpoints, so the
+diff is a handful of set operations regardless of how the node ids of the two snapshots were numbered. CI can keep the
+base snapshot written by `--format jsonl` / `csr` / `graphml` and diff it against HEAD with `--diff-base`, or compare
+two saved snapshots without compiling anything:
+
+    python -m printers.graph_diff base.csr head.csr --format json
+"""
+from __future__ import annotations
+
+import json
+import sys
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Set, Tuple
+
+import rich_click as click
+
+from .dot import DotWriter
+from .export import ExportGraph, ExportNode, load_graph
+from .reference_graph import edge_kind_names
+
+DIFF_FORMATS = ("text", "json", "dot")
+
+ADDED_COLOR = "darkgreen"
+REMOVED_COLOR = "red"
+
+EdgeKey = Tuple[str, str]
+
+
+class DiffEdge(NamedTuple):
+    source: str
+    target: str
+    kind: int
+    references: int
+
+
+class GraphDiff(NamedTuple):
+    """
+    Nodes and edges only present in the head graph (added) or only in the base graph (removed), sorted by key.
+    """
+
+    added_nodes: List[ExportNode]
+    removed_nodes: List[ExportNode]
+    added_edges: List[DiffEdge]
+    removed_edges: List[DiffEdge]
+    # endpoints of changed edges that are in both graphs, needed to draw the edges
+    unchanged_nodes: List[ExportNode]
+
+    def __bool__(self) -> bool:
+        return bool(self.added_nodes or self.removed_nodes or self.added_edges or self.removed_edges)
+
+
+def _edges(graph: ExportGraph) -> Dict[EdgeKey, DiffEdge]:
+    keys = [node.key for node in graph.nodes]
+    return {
+        (keys[source], keys[target]): DiffEdge(keys[source], keys[target], kind, count)
+        for source, (targets, kinds, counts) in enumerate(zip(graph.referring, graph.edge_kinds, graph.edge_counts))
+        for target, kind, count in zip(targets, kinds, counts)
+    }
+
+
+def diff_graphs(base: ExportGraph, head: ExportGraph) -> GraphDiff:
+    base_nodes = {node.key: node for node in base.nodes}
+    head_nodes = {node.key: node for node in head.nodes}
+    base_edges = _edges(base)
+    head_edges = _edges(head)
+
+    added_edges = [head_edges[key] for key in sorted(head_edges.keys() - base_edges.keys())]
+    removed_edges = [base_edges[key] for key in sorted(base_edges.keys() - head_edges.keys())]
+    endpoints: Set[str] = set()
+    for edge in added_edges + removed_edges:
+        endpoints.add(edge.source)
+        endpoints.add(edge.target)
+
+    return GraphDiff(
+        [head_nodes[key] for key in sorted(head_nodes.keys() - base_nodes.keys())],
+        [base_nodes[key] for key in sorted(base_nodes.keys() - head_nodes.keys())],
+        added_edges,
+        removed_edges,
+        [head_nodes[key] for key in sorted(endpoints & head_nodes.keys() & base_nodes.keys())],
+    )
+
+
+def _kinds(kind: int) -> str:
+    if kind == 0:
+        # edges only created by --inherit have no references of their own
+        return "inherited"
+    return ", ".join(edge_kind_names(kind)) or f"kind {kind}"
+
+
+def diff_text(diff: GraphDiff) -> str:
+    """
+    One line per change, `+` for added and `-` for removed nodes and edges.
+    """
+    lines = [f"+ {node.key}" for node in diff.added_nodes]
+    lines += [f"- {node.key}" for node in diff.removed_nodes]
+    lines += [
+        f"+ {edge.source} -> {edge.target} ({edge.references} references: {_kinds(edge.kind)})"
+        for edge in diff.added_edges
+    ]
+    lines += [
+        f"- {edge.source} -> {edge.target} ({edge.references} references: {_kinds(edge.kind)})"
+        for edge in diff.removed_edges
+    ]
+    return "".join(f"{line}\n" for line in lines)
+
+
+def diff_json(diff: GraphDiff) -> str:
+    return json.dumps(
+        {
+            "added_nodes": [node._asdict() for node in diff.added_nodes],
+            "removed_nodes": [node._asdict() for node in diff.removed_nodes],
+            "added_edges": [edge._asdict() for edge in diff.added_edges],
+            "removed_edges": [edge._asdict() for edge in diff.removed_edges],
+        },
+        indent=2,
+    )
+
+
+def write_diff_dot(diff: GraphDiff, path: Path, rankdir: str = "TB", force: bool = False) -> bool:
+    """
+    Write the changed part of the graph, added nodes and edges are green and removed ones red with removed edges
+    dashed. Unchanged contracts are only drawn as endpoints of changed edges. Returns whether the file was written.
+    """
+    with DotWriter(path, rankdir, "Contract cross reference diff", force=force) as g:
+        for nodes, color in (
+            (diff.added_nodes, ADDED_COLOR),
+            (diff.removed_nodes, REMOVED_COLOR),
+            (diff.unchanged_nodes, None),
+        ):
+            for node in nodes:
+                g.node(node.key, node.name, node.link or None, color=color)
+        for edge in diff.added_edges:
+            g.edge(edge.source, edge.target, color=ADDED_COLOR)
+        for edge in diff.removed_edges:
+            g.edge(edge.source, edge.target, color=REMOVED_COLOR, style="dashed")
+    return g.changed
+
+
+@click.command(name="graph-diff")
+@click.argument("base", type=click.Path(exists=True, dir_okay=False))
+@click.argument("head", type=click.Path(exists=True, dir_okay=False))
+@click.option(
+    "--format",
+    "format",
+    type=click.Choice(DIFF_FORMATS),
+    default="text",
+    help="Output format, dot requires --out.",
+)
+@click.option(
+    "-o",
+    "--out",
+    type=click.Path(dir_okay=False, writable=True),
+    default=None,
+    help="Write the diff to the given file instead of standard output.",
+)
+@click.option(
+    "--exit-code",
+    is_flag=True,
+    default=False,
+    help="Exit with status 1 when the graphs differ.",
+)
+def main(base: str, head: str, format: str, out: str | None, exit_code: bool) -> None:
+    """
+    Print contracts and references added to or removed from the BASE graph in the HEAD graph. Both graphs are files
+    exported by contract-cross-reference-graph --format jsonl, graphml or csr, the format is given by the suffix.
+    """
+    diff = diff_graphs(load_graph(Path(base)), load_graph(Path(head)))
+    if format == "dot":
+        if out is None:
+            raise click.UsageError("--format dot requires --out")
+        write_diff_dot(diff, Path(out))
+    else:
+        data = diff_text(diff) if format == "text" else diff_json(diff) + "\n"
+        if out is None:
+            sys.stdout.write(data)
+        else:
+            Path(out).write_text(data)
+    if exit_code and diff:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
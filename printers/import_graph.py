@@ -0,0 +1,253 @@
+"""
+File-level import graph of a project, built from `ImportDirective.imported_source_unit`.
+
+A reference can only resolve differently when its own file or a file it (transitively) imports changed, so the
+reverse import closure of the changed files holds every contract whose references to other contracts can change.
+The contracts these referred to before or refer to after the change gain or lose referrers, and so do the contracts
+derived from them. A reference only resolves to a declaration its file (transitively) imports, so without reference
+analysis all contracts in the import closure of the affected files are taken as possible targets.
+
+Printers save the graph of the last build to `.wake/contract-cross-reference-import-graph.json` when caching is
+enabled, so the affected contracts can be listed without compiling the project. Imports added since that build are
+not known to the saved graph. The module does not depend on wake at runtime and is run as a script to keep the answer
+fast:
+
+    python printers/import_graph.py contracts/Token.sol contracts/Vault.sol
+"""
+from __future__ import annotations
+
+import json
+import sys
+from pathlib import Path
+from typing import TYPE_CHECKING, Callable, Dict, Iterable, List, Mapping, Set, Tuple
+
+import rich_click as click
+
+if TYPE_CHECKING:
+    import wake.ir as ir
+
+IMPORT_GRAPH_VERSION = 2
+IMPORT_GRAPH_FILE = "contract-cross-reference-import-graph.json"
+
+
+class ImportGraph:
+    """
+    Source units of a project as integer nodes in source unit name order. `imports[i]` holds the source units imported
+    by source unit `i` and `importers[i]` the source units importing it, both sorted. `derived` maps the key of
+    a contract to the keys of all contracts (transitively) deriving from it. `source_units` is empty for a graph
+    loaded from a file.
+    """
+
+    source_unit_names: List[str]
+    files: List[str]
+    contracts: List[List[str]]
+    derived: Dict[str, List[str]]
+    imports: List[List[int]]
+    importers: List[List[int]]
+    index: Dict[str, int]
+    file_index: Dict[str, int]
+    source_units: List[ir.SourceUnit]
+
+    def __init__(
+        self,
+        source_unit_names: List[str],
+        files: List[str],
+        contracts: List[List[str]],
+        imports: List[List[int]],
+        derived: Dict[str, List[str]],
+    ):
+        self.source_unit_names = source_unit_names
+        self.files = files
+        self.contracts = contracts
+        self.derived = derived
+        self.imports = imports
+        self.importers = [[] for _ in source_unit_names]
+        for source, imported in enumerate(imports):
+            for target in imported:
+                self.importers[target].append(source)
+        self.index = {name: i for i, name in enumerate(source_unit_names)}
+        self.file_index = {file: i for i, file in enumerate(files)}
+        self.source_units = []
+
+    def __len__(self) -> int:
+        return len(self.source_unit_names)
+
+    @classmethod
+    def from_source_units(cls, source_units: Iterable[ir.SourceUnit]) -> ImportGraph:
+        """
+        Import graph of `source_units` and all source units they (transitively) import, including source units
+        without contracts that only pass declarations through.
+        """
+        visited: Dict[str, ir.SourceUnit] = {}
+        stack = list(source_units)
+        while stack:
+            source_unit = stack.pop()
+            if source_unit.source_unit_name in visited:
+                continue
+            visited[source_unit.source_unit_name] = source_unit
+            stack.extend(directive.imported_source_unit for directive in source_unit.imports)
+
+        units = [visited[name] for name in sorted(visited)]
+        index = {source_unit.source_unit_name: i for i, source_unit in enumerate(units)}
+        derived: Dict[str, List[str]] = {}
+        for source_unit in units:
+            for contract in source_unit.contracts:
+                # linearized base contracts start with the contract itself
+                for base in contract.linearized_base_contracts[1:]:
+                    derived.setdefault(f"{base.parent.source_unit_name}:{base.name}", []).append(
+                        f"{source_unit.source_unit_name}:{contract.name}"
+                    )
+        graph = cls(
+            [source_unit.source_unit_name for source_unit in units],
+            [str(source_unit.file) for source_unit in units],
+            [[contract.name for contract in source_unit.contracts] for source_unit in units],
+            [
+                sorted({index[directive.imported_source_unit.source_unit_name] for directive in source_unit.imports})
+                for source_unit in units
+            ],
+            derived,
+        )
+        graph.source_units = units
+        return graph
+
+    def resolve(self, file: str) -> int | None:
+        """
+        Node of a source unit given by its source unit name or by a path to its file.
+        """
+        node = self.index.get(file)
+        if node is None:
+            node = self.file_index.get(str(Path(file).resolve()))
+        return node
+
+    def importer_closure(self, nodes: Iterable[int]) -> Set[int]:
+        """
+        `nodes` and all source units (transitively) importing any of them.
+        """
+        closure: Set[int] = set()
+        stack = list(nodes)
+        while stack:
+            node = stack.pop()
+            if node in closure:
+                continue
+            closure.add(node)
+            stack.extend(self.importers[node])
+        return closure
+
+    def import_closure(self, nodes: Iterable[int]) -> Set[int]:
+        """
+        `nodes` and all source units they (transitively) import.
+        """
+        closure: Set[int] = set()
+        stack = list(nodes)
+        while stack:
+            node = stack.pop()
+            if node in closure:
+                continue
+            closure.add(node)
+            stack.extend(self.imports[node])
+        return closure
+
+    def _keys(self, nodes: Iterable[int]) -> Set[str]:
+        return {f"{self.source_unit_names[node]}:{name}" for node in nodes for name in self.contracts[node]}
+
+    def affected_contracts(
+        self,
+        files: Iterable[str],
+        referenced: Callable[[List[str]], Mapping[str, Iterable[str]]] | None = None,
+    ) -> Tuple[List[str], List[str]]:
+        """
+        Keys (`source_unit_name:ContractName`) of contracts whose cross references can change when `files` change,
+        in source unit order, and the files that are not part of the graph.
+
+        These are the contracts of the reverse import closure of `files`, the contracts they referred to before or
+        refer to after the change and the contracts derived from those. `referenced` is given the source unit names
+        of the closure and returns the keys of the contracts referenced from a source unit in either version, for
+        the source units it can tell. Contracts declared in the import closure of the other source units are taken
+        as referenced.
+        """
+        nodes = []
+        unknown = []
+        for file in files:
+            node = self.resolve(file)
+            if node is None:
+                unknown.append(file)
+            else:
+                nodes.append(node)
+
+        affected_nodes = self.importer_closure(nodes)
+        names = [self.source_unit_names[node] for node in sorted(affected_nodes)]
+        known = referenced(names) if referenced is not None else {}
+        targets = self._keys(
+            self.import_closure(node for node in affected_nodes if self.source_unit_names[node] not in known)
+        )
+        for name in names:
+            targets.update(known.get(name, ()))
+
+        affected = self._keys(affected_nodes) | targets
+        for target in targets:
+            affected.update(self.derived.get(target, ()))
+        return [
+            key
+            for node, source_unit_name in enumerate(self.source_unit_names)
+            for key in (f"{source_unit_name}:{name}" for name in self.contracts[node])
+            if key in affected
+        ], unknown
+
+    def to_json(self) -> str:
+        return json.dumps(
+            {
+                "version": IMPORT_GRAPH_VERSION,
+                "source_units": self.source_unit_names,
+                "files": self.files,
+                "contracts": self.contracts,
+                "imports": self.imports,
+                "derived": self.derived,
+            },
+            separators=(",", ":"),
+        )
+
+    def save(self, path: Path) -> None:
+        """
+        Write the graph to `path` unless it already holds the same graph.
+        """
+        data = self.to_json()
+        try:
+            if path.read_text() == data:
+                return
+        except OSError:
+            pass
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(".tmp")
+        tmp.write_text(data)
+        tmp.replace(path)
+
+    @classmethod
+    def load(cls, path: Path) -> ImportGraph:
+        data = json.loads(path.read_text())
+        if data.get("version") != IMPORT_GRAPH_VERSION:
+            raise ValueError(f"{path} is not a version {IMPORT_GRAPH_VERSION} import graph")
+        return cls(data["source_units"], data["files"], data["contracts"], data["imports"], data["derived"])
+
+
+@click.command(name="import-graph")
+@click.argument("files", nargs=-1)
+@click.option(
+    "--graph",
+    "graph_path",
+    type=click.Path(exists=True, dir_okay=False),
+    default=f".wake/{IMPORT_GRAPH_FILE}",
+    help="Import graph saved by the contract cross reference printers.",
+)
+def main(files: Tuple[str, ...], graph_path: str) -> None:
+    """
+    Print the contracts whose cross references can change when FILES change, one per line. Without reference
+    analysis, every contract the affected files can refer to is printed as well.
+    """
+    affected, unknown = ImportGraph.load(Path(graph_path)).affected_contracts(files)
+    for file in unknown:
+        click.echo(f"{file} is not part of the saved import graph, skipping", err=True)
+    sys.stdout.write("".join(f"{key}\n" for key in affected))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Dict, Iterable, List, Mapping, Set
+
+import wake.ir as ir
+
+from .graph_algorithms import iter_bits
+from .import_graph import ImportGraph
+from .reference_graph import ReferenceGraph, ReferenceGraphBuilder, ReferenceKind
+
+if TYPE_CHECKING:
+    from .reference_graph_cache import ReferenceGraphCache
+
+
+class LazyReferenceGraph:
+    """
+    Demand-driven view of the [InheritedReferenceGraph][printers.reference_graph.InheritedReferenceGraph] for queries
+    about a few contracts. All contracts are indexed up front, which does not walk any AST, but source units are only
+    analysed once a query needs their edges.
+
+    A contract refers to `derived` of everything referred to by its linearized base contracts, so its referring
+    contracts only need the source units declaring those bases. A contract can only be referred to from a source unit
+    that (transitively) imports the declaration, so its referrers only need the source units importing the source
+    units of its linearized base contracts.
+
+    With `kinds`, only edges created from at least one reference of the given kinds are followed.
+    """
+
+    graph: ReferenceGraph
+    import_graph: ImportGraph
+    _builder: ReferenceGraphBuilder
+    _cache: ReferenceGraphCache | None
+    _kinds: ReferenceKind
+    _bases: List[List[int]]
+    _derived_masks: List[int]
+    _source_units: Set[ir.SourceUnit]
+    _analysed: Set[ir.SourceUnit]
+    _importers_analysed: Set[int]
+    _referring: Dict[int, int]
+    _referrers: Dict[int, int]
+
+    def __init__(
+        self,
+        contracts: Iterable[ir.ContractDefinition],
+        builder: ReferenceGraphBuilder,
+        cache: ReferenceGraphCache | None = None,
+        content_hashes: Mapping[str, bytes] | None = None,
+        kinds: ReferenceKind = ReferenceKind.ALL,
+    ):
+        self.graph = ReferenceGraph()
+        for contract in contracts:
+            self.graph.add_node(contract)
+        self._builder = builder
+        self._cache = cache
+        self._kinds = kinds
+
+        graph = self.graph
+        # linearized base contracts start with the contract itself
+        self._bases = [
+            [graph.index[base] for base in contract.linearized_base_contracts if base in graph.index]
+            for contract in graph.contracts
+        ]
+        self._derived_masks = [0] * len(graph)
+        for contract, bases in enumerate(self._bases):
+            for base in bases:
+                self._derived_masks[base] |= 1 << contract
+
+        source_units = list(dict.fromkeys(contract.parent for contract in graph.contracts))
+        self._source_units = set(source_units)
+        if cache is not None:
+            cache.prepare(source_units, content_hashes)
+
+        self.import_graph = ImportGraph.from_source_units(source_units)
+
+        self._analysed = set()
+        self._importers_analysed = set()
+        self._referring = {}
+        self._referrers = {}
+
+    @property
+    def analysed(self) -> Set[ir.SourceUnit]:
+        return self._analysed
+
+    def _analyse(self, source_unit: ir.SourceUnit) -> None:
+        # edges always start in a contract of the analysed source unit, other source units cannot add edges
+        if source_unit in self._analysed or source_unit not in self._source_units:
+            return
+        self._analysed.add(source_unit)
+        self.graph.add_unit_edges(self._builder.unit_edges(source_unit, self._cache))
+
+    def _analyse_importers(self, source_unit: ir.SourceUnit) -> None:
+        imports = self.import_graph
+        stack = [imports.index[source_unit.source_unit_name]]
+        while stack:
+            current = stack.pop()
+            if current in self._importers_analysed:
+                continue
+            self._importers_analysed.add(current)
+            self._analyse(imports.source_units[current])
+            stack.extend(imports.importers[current])
+
+    def referring(self, node: int) -> int:
+        """
+        Bitset of contracts referred to by `node`, including references inherited from and to base contracts.
+        """
+        mask = self._referring.get(node)
+        if mask is None:
+            graph = self.graph
+            for base in self._bases[node]:
+                self._analyse(graph.contracts[base].parent)
+            mask = 0
+            for base in self._bases[node]:
+                for target in graph.referring[base]:
+                    if graph.edge_kinds[(base, target)] & self._kinds:
+                        mask |= self._derived_masks[target]
+            self._referring[node] = mask
+        return mask
+
+    def referrers(self, node: int) -> int:
+        """
+        Bitset of contracts referring to `node`, including references inherited from and to base contracts.
+        """
+        mask = self._referrers.get(node)
+        if mask is None:
+            graph = self.graph
+            for base in self._bases[node]:
+                self._analyse_importers(graph.contracts[base].parent)
+            mask = 0
+            for base in self._bases[node]:
+                for source in graph.referrers[base]:
+                    if graph.edge_kinds[(source, base)] & self._kinds:
+                        mask |= self._derived_masks[source]
+            self._referrers[node] = mask
+        return mask
+
+    def reachable(self, node: int, referrers: bool, depth: int | None = None) -> int:
+        """
+        Bitset of contracts reachable from `node` in the referrers or referring direction, through at least one and,
+        with `depth`, at most `depth` edges. Only the source units on the way are analysed.
+        """
+        step = self.referrers if referrers else self.referring
+        reached = 0
+        frontier = 1 << node
+        hops = 0
+        while frontier != 0 and (depth is None or hops < depth):
+            hops += 1
+            successors = 0
+            for current in iter_bits(frontier):
+                successors |= step(current)
+            frontier = successors & ~reached
+            reached |= frontier
+        return reached
+
+    def save(self) -> None:
+        if self._cache is not None:
+            self._cache.save()
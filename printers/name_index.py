@@ -0,0 +1,77 @@
+from __future__ import annotations
+
+import re
+from fnmatch import fnmatchcase
+from typing import Dict, Iterable, List, Tuple
+
+from .reference_graph import ReferenceGraph
+
+_GLOB_CHARACTERS = re.compile(r"[*?\[]")
+
+
+def _matcher(pattern: str):
+    if _GLOB_CHARACTERS.search(pattern):
+        return lambda value: fnmatchcase(value, pattern)
+    return pattern.__eq__
+
+
+class NameIndex:
+    """
+    Index of graph nodes by contract name, resolving `--name` selectors:
+
+    - `Token` selects all contracts named `Token`,
+    - `Token*`, `*Vault`, `I[A-Z]*` select contracts with names matching a glob,
+    - `re:^(Pool|Vault)V\\d$` selects contracts with names fully matching a regular expression,
+    - `contracts/tokens/Token.sol:Token` selects one contract by its source unit name, both parts may be globs.
+    """
+
+    _graph: ReferenceGraph
+    _nodes: Dict[str, List[int]]
+
+    def __init__(self, graph: ReferenceGraph):
+        self._graph = graph
+        self._nodes = {}
+        for node, name in enumerate(graph.names):
+            self._nodes.setdefault(name, []).append(node)
+
+    def is_ambiguous(self, name: str) -> bool:
+        return len(self._nodes.get(name, [])) > 1
+
+    def select(self, selector: str) -> int:
+        """
+        Bitset of the nodes matching `selector`.
+        """
+        path_matcher = None
+        if selector.startswith("re:"):
+            pattern = re.compile(selector[3:])
+            names = [name for name in self._nodes if pattern.fullmatch(name)]
+        else:
+            path, _, name = selector.rpartition(":")
+            if path:
+                path_matcher = _matcher(path)
+            if _GLOB_CHARACTERS.search(name):
+                names = [candidate for candidate in self._nodes if fnmatchcase(candidate, name)]
+            else:
+                # exact names, the common case, are a single lookup
+                names = [name] if name in self._nodes else []
+
+        mask = 0
+        source_unit_names = self._graph.source_unit_names
+        for name in names:
+            for node in self._nodes[name]:
+                if path_matcher is None or path_matcher(source_unit_names[node]):
+                    mask |= 1 << node
+        return mask
+
+    def select_all(self, selectors: Iterable[str]) -> Tuple[int, List[str]]:
+        """
+        Bitset of the nodes matching any of `selectors` and the selectors that did not match anything.
+        """
+        mask = 0
+        unmatched = []
+        for selector in selectors:
+            selected = self.select(selector)
+            if selected == 0:
+                unmatched.append(selector)
+            mask |= selected
+        return mask, unmatched
@@ -0,0 +1,112 @@
+from __future__ import annotations
+
+import json
+import sys
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import TYPE_CHECKING, Dict, Iterator
+
+from rich import print
+from rich.table import Table
+
+if TYPE_CHECKING:
+    from .reference_graph import ReferenceGraph, ReferenceGraphBuilder
+
+
+def peak_rss() -> int | None:
+    """
+    Peak resident set size of the process in bytes, None where it cannot be determined.
+    """
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # reported in bytes on macOS and in kilobytes elsewhere
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+class Profiler:
+    """
+    Wall time per phase and named counters of one printer run. All methods are no-ops when disabled.
+    """
+
+    enabled: bool
+    phases: Dict[str, float]
+    counters: Dict[str, int]
+    _started: Dict[str, float]
+
+    def __init__(self, enabled: bool):
+        self.enabled = enabled
+        self.phases = {}
+        self.counters = {}
+        self._started = {}
+
+    def begin(self, name: str) -> None:
+        if self.enabled:
+            self._started[name] = time.perf_counter()
+
+    def end(self, name: str) -> None:
+        if self.enabled and name in self._started:
+            elapsed = time.perf_counter() - self._started.pop(name)
+            self.phases[name] = self.phases.get(name, 0.0) + elapsed
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        self.begin(name)
+        try:
+            yield
+        finally:
+            self.end(name)
+
+    def count(self, name: str, value: int) -> None:
+        if self.enabled:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def count_graph(self, builder: ReferenceGraphBuilder, graph: ReferenceGraph) -> None:
+        self.count("contracts", len(graph))
+        self.count("source units walked", builder.source_units_walked)
+        self.count("references resolved", builder.references_resolved)
+        self.count("parent walk steps", builder.parent_walk_steps)
+        self.count("edges recorded", builder.edges_recorded)
+        self.count("edges deduplicated", builder.edges_deduplicated)
+        self.count("edges in graph", len(graph.edge_kinds))
+
+    def report(self) -> Dict:
+        return {
+            "phases": {name: round(seconds, 6) for name, seconds in self.phases.items()},
+            "counters": dict(self.counters),
+            "peak_rss": peak_rss(),
+        }
+
+    def table(self, title: str) -> Table:
+        table = Table(title=title)
+        table.add_column("Phase / counter")
+        table.add_column("Value", justify="right")
+        total = sum(self.phases.values())
+        for name, seconds in self.phases.items():
+            share = f" ({seconds / total:.0%})" if total > 0 else ""
+            table.add_row(name, f"{seconds * 1000:,.1f} ms{share}")
+        table.add_section()
+        for name, value in self.counters.items():
+            table.add_row(name, f"{value:,}")
+        rss = peak_rss()
+        if rss is not None:
+            table.add_section()
+            table.add_row("peak RSS", f"{rss / 2 ** 20:,.1f} MiB")
+        return table
+
+    def dump(self, path: Path) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(self.report(), indent=2))
+
+    def finish(self, title: str, json_path: Path | None) -> None:
+        """
+        Print the profile table and optionally write the JSON report.
+        """
+        if not self.enabled:
+            return
+        print(self.table(title))
+        if json_path is not None:
+            self.dump(json_path)
@@ -0,0 +1,119 @@
+"""
+Client of the contract cross reference query server started by `wake print --watch contract-cross-reference-server`.
+The module does not depend on wake and is run as a script so that a query costs a socket round trip instead of a
+build:
+
+    python printers/query_client.py referrers Token
+    python printers/query_client.py referring Vault --transitive --depth 2
+    python printers/query_client.py path Vault Token
+"""
+from __future__ import annotations
+
+import json
+import socket
+import sys
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator
+
+import rich_click as click
+
+DEFAULT_SOCKET = ".wake/contract-cross-reference.sock"
+
+
+class QueryClient:
+    """
+    Connection to a query server, one request at a time.
+    """
+
+    _socket: socket.socket
+    _file: Any
+    _next_id: int
+
+    def __init__(self, path: Path, timeout: float | None = 30.0):
+        self._socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self._socket.settimeout(timeout)
+        self._socket.connect(str(path))
+        self._file = self._socket.makefile("rwb")
+        self._next_id = 0
+
+    def __enter__(self) -> QueryClient:
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self._file.close()
+        self._socket.close()
+
+    def request(self, query: str, **params: Any) -> Dict[str, Any]:
+        """
+        Send one query and return the whole response, with `result` or `error` and the graph `generation`.
+        """
+        self._next_id += 1
+        self._file.write(json.dumps({"id": self._next_id, "query": query, **params}).encode() + b"\n")
+        self._file.flush()
+        line = self._file.readline()
+        if not line:
+            raise ConnectionError("The query server closed the connection")
+        return json.loads(line)
+
+
+def _lines(response: Dict[str, Any]) -> Iterator[str]:
+    result = response["result"]
+    if result is None:
+        return
+    for item in result:
+        yield item["key"] if isinstance(item, dict) else item
+
+
+@click.command(name="query")
+@click.argument("query", type=click.Choice(["referrers", "referring", "path", "contracts", "status"]))
+@click.argument("contracts", nargs=-1)
+@click.option("--transitive", is_flag=True, default=False, help="Follow references transitively.")
+@click.option("--depth", type=click.IntRange(min=1), default=None, help="Follow up to the given number of hops.")
+@click.option("--json", "as_json", is_flag=True, default=False, help="Print the raw JSON response.")
+@click.option(
+    "--socket",
+    "socket_path",
+    type=click.Path(dir_okay=False),
+    default=DEFAULT_SOCKET,
+    help="Socket of the query server.",
+)
+def main(
+    query: str, contracts: Iterable[str], transitive: bool, depth: int | None, as_json: bool, socket_path: str
+) -> None:
+    """
+    Ask the query server about CONTRACTS, given as with --name. path takes a source and a target contract.
+    """
+    contracts = list(contracts)
+    params: Dict[str, Any] = {}
+    if query == "path":
+        if len(contracts) != 2:
+            raise click.UsageError("path takes a source and a target contract")
+        params = {"from": contracts[0], "to": contracts[1]}
+    elif query in ("referrers", "referring"):
+        if len(contracts) != 1:
+            raise click.UsageError(f"{query} takes one contract")
+        params = {"contract": contracts[0], "transitive": transitive, "depth": depth}
+    elif query == "contracts" and len(contracts) != 0:
+        params = {"contract": contracts[0]}
+
+    try:
+        with QueryClient(Path(socket_path)) as client:
+            response = client.request(query, **params)
+    except OSError as e:
+        raise click.ClickException(f"Cannot reach the query server at {socket_path}: {e}")
+
+    if as_json:
+        sys.stdout.write(json.dumps(response) + "\n")
+    elif "error" in response:
+        raise click.ClickException(response["error"])
+    elif query == "status":
+        sys.stdout.write("".join(f"{name}: {value}\n" for name, value in response["result"].items()))
+    else:
+        sys.stdout.write("".join(f"{line}\n" for line in _lines(response)))
+
+
+if __name__ == "__main__":
+    main()
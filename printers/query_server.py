@@ -0,0 +1,324 @@
+"""
+Unix socket server answering cross reference queries from a graph kept in memory.
+
+The protocol is one JSON object per line in both directions. Every request names a `query` and may carry an `id` that
+is echoed in the response:
+
+    {"id": 1, "query": "referrers", "contract": "Token"}
+    {"id": 2, "query": "referring", "contract": "src/Vault.sol:Vault", "transitive": true, "depth": 3}
+    {"id": 3, "query": "path", "from": "Vault", "to": "Token*"}
+    {"id": 4, "query": "contracts", "contract": "I*"}
+    {"id": 5, "query": "status"}
+
+Contracts are selected as with `--name`. Responses hold `result` or `error` and the `generation` of the graph that
+answered the query. The server runs its own event loop in a background thread, so clients are served from the last
+published graph while the next build is compiled and analysed. Queries are answered in a thread pool so that a
+transitive or path query over a large graph does not hold up the other clients.
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+import re
+import socket
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, List
+
+from .graph_algorithms import iter_bits
+from .name_index import NameIndex
+from .reachability import ReachabilityIndex
+from .reference_graph import InheritedReferenceGraph, ReferenceGraph
+
+
+class QueryError(Exception):
+    pass
+
+
+class GraphSnapshot:
+    """
+    Read-only view of a [ReferenceGraph][printers.reference_graph.ReferenceGraph] that is not changed by later builds.
+    Queries follow the references propagated along inheritance by `inherited`, as printed by
+    contract-cross-reference-graph. Transitive closures are computed on the first transitive query.
+    """
+
+    graph: ReferenceGraph
+    generation: int
+    created: float
+    names: NameIndex
+    _referring: List[int]
+    _referrers: List[int]
+    _reachability: Dict[bool, ReachabilityIndex]
+    _reachability_lock: threading.Lock
+
+    def __init__(self, graph: ReferenceGraph, inherited: InheritedReferenceGraph, generation: int):
+        self.graph = graph
+        self.generation = generation
+        self.created = time.time()
+        self.names = NameIndex(graph)
+        # the rows of a session's inherited graph are updated in place by the next build
+        self._referring = list(inherited.referring)
+        self._referrers = list(inherited.referrers)
+        self._reachability = {}
+        self._reachability_lock = threading.Lock()
+
+    def rows(self, referrers: bool) -> List[int]:
+        return self._referrers if referrers else self._referring
+
+    def reachable(self, node: int, referrers: bool, depth: int | None) -> int:
+        index = self._reachability.get(referrers)
+        if index is None:
+            # concurrent queries on a new snapshot build the index once
+            with self._reachability_lock:
+                index = self._reachability.get(referrers)
+                if index is None:
+                    index = self._reachability[referrers] = ReachabilityIndex(self.rows(referrers))
+        return index.reachable(node, depth)
+
+    def select(self, selector: Any) -> int:
+        if not isinstance(selector, str):
+            raise QueryError("Expected a contract name, glob, re: pattern or source_unit_name:Contract")
+        mask = self.names.select(selector)
+        if mask == 0:
+            raise QueryError(f"No contract matches {selector}")
+        return mask
+
+    def describe(self, mask: int) -> List[Dict[str, str]]:
+        graph = self.graph
+        return [
+            {
+                "key": graph.keys[node],
+                "name": graph.names[node],
+                "source_unit": graph.source_unit_names[node],
+                "kind": graph.kinds[node],
+            }
+            for node in iter_bits(mask)
+        ]
+
+    def path(self, sources: int, targets: int) -> List[int] | None:
+        """
+        Shortest chain of references from any node in `sources` to any node in `targets`, None if there is none.
+        """
+        previous: Dict[int, int] = {}
+        frontier = list(iter_bits(sources))
+        visited = sources
+        for node in frontier:
+            if targets >> node & 1:
+                return [node]
+        while frontier:
+            next_frontier = []
+            for node in frontier:
+                for target in iter_bits(self._referring[node] & ~visited):
+                    visited |= 1 << target
+                    previous[target] = node
+                    if targets >> target & 1:
+                        path = [target]
+                        while path[-1] in previous:
+                            path.append(previous[path[-1]])
+                        return path[::-1]
+                    next_frontier.append(target)
+            frontier = next_frontier
+        return None
+
+
+def _depth(request: Dict[str, Any]) -> int | None:
+    depth = request.get("depth")
+    if depth is not None and (not isinstance(depth, int) or depth < 1):
+        raise QueryError("depth must be a positive integer")
+    return depth
+
+
+def answer(snapshot: GraphSnapshot, request: Dict[str, Any]) -> Any:
+    """
+    Result of one query, raising [QueryError][printers.query_server.QueryError] for invalid requests.
+    """
+    query = request.get("query")
+    if query == "status":
+        return {
+            "contracts": len(snapshot.graph),
+            "edges": len(snapshot.graph.edge_kinds),
+            "created": snapshot.created,
+        }
+    elif query == "contracts":
+        selector = request.get("contract")
+        mask = snapshot.select(selector) if selector is not None else (1 << len(snapshot.graph)) - 1
+        return snapshot.describe(mask)
+    elif query in ("referrers", "referring"):
+        referrers = query == "referrers"
+        selected = snapshot.select(request.get("contract"))
+        depth = _depth(request)
+        result = 0
+        for node in iter_bits(selected):
+            if request.get("transitive", False) or depth is not None:
+                result |= snapshot.reachable(node, referrers, depth)
+            else:
+                result |= snapshot.rows(referrers)[node]
+        return snapshot.describe(result)
+    elif query == "path":
+        path = snapshot.path(snapshot.select(request.get("from")), snapshot.select(request.get("to")))
+        return None if path is None else [snapshot.graph.keys[node] for node in path]
+    raise QueryError(f"Unknown query: {query}")
+
+
+class QueryServer:
+    """
+    Server listening on a Unix socket at `path`. [publish][printers.query_server.QueryServer.publish] replaces the
+    graph clients are answered from, queries already being answered finish on the graph they started with.
+    """
+
+    path: Path
+    _snapshot: GraphSnapshot | None
+    _loop: asyncio.AbstractEventLoop | None
+    _thread: threading.Thread | None
+    _server: asyncio.AbstractServer | None
+    _executor: ThreadPoolExecutor | None
+
+    def __init__(self, path: Path):
+        self.path = path
+        self._snapshot = None
+        self._loop = None
+        self._thread = None
+        self._server = None
+        self._executor = None
+
+    @property
+    def generation(self) -> int:
+        return self._snapshot.generation if self._snapshot is not None else 0
+
+    def publish(self, graph: ReferenceGraph, inherited: InheritedReferenceGraph) -> GraphSnapshot:
+        """
+        Serve `graph` with the references propagated by `inherited` from now on. The graph must not be modified
+        afterwards, the rows of `inherited` are copied.
+        """
+        snapshot = GraphSnapshot(graph, inherited, self.generation + 1)
+        # a single reference assignment, the server thread sees either the old or the new snapshot
+        self._snapshot = snapshot
+        return snapshot
+
+    def _remove_stale_socket(self) -> None:
+        if not self.path.exists():
+            return
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as s:
+            try:
+                s.connect(str(self.path))
+            except OSError:
+                # left behind by a server that did not shut down cleanly
+                self.path.unlink()
+                return
+        raise RuntimeError(f"Another server is already listening on {self.path}")
+
+    def start(self) -> None:
+        """
+        Start listening in a background thread, returning once the socket accepts connections.
+        """
+        if self._thread is not None:
+            return
+        self._remove_stale_socket()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        started = threading.Event()
+        errors: List[BaseException] = []
+        self._executor = ThreadPoolExecutor(thread_name_prefix=f"query {self.path.name}")
+
+        def run() -> None:
+            loop = asyncio.new_event_loop()
+            self._loop = loop
+            try:
+                self._server = loop.run_until_complete(asyncio.start_unix_server(self._client, str(self.path)))
+            except BaseException as e:
+                errors.append(e)
+                started.set()
+                loop.close()
+                return
+            started.set()
+            try:
+                loop.run_forever()
+            finally:
+                self._server.close()
+                loop.run_until_complete(self._server.wait_closed())
+                loop.close()
+
+        self._thread = threading.Thread(target=run, name=f"query server {self.path}", daemon=True)
+        self._thread.start()
+        started.wait()
+        if errors:
+            self._thread = None
+            self._executor.shutdown()
+            self._executor = None
+            raise errors[0]
+
+    def stop(self) -> None:
+        if self._thread is None:
+            return
+        assert self._loop is not None
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._thread = None
+        assert self._executor is not None
+        self._executor.shutdown(cancel_futures=True)
+        self._executor = None
+        self.path.unlink(missing_ok=True)
+
+    def serve_forever(self) -> None:
+        """
+        Block until the server is stopped from another thread or interrupted.
+        """
+        try:
+            while self._thread is not None and self._thread.is_alive():
+                self._thread.join(0.5)
+        finally:
+            self.stop()
+
+    def _respond(self, line: bytes) -> Dict[str, Any]:
+        snapshot = self._snapshot
+        response: Dict[str, Any] = {}
+        try:
+            request = json.loads(line)
+            if not isinstance(request, dict):
+                raise QueryError("Expected a JSON object")
+            if "id" in request:
+                response["id"] = request["id"]
+            if snapshot is None:
+                raise QueryError("The graph is not built yet")
+            response["generation"] = snapshot.generation
+            response["result"] = answer(snapshot, request)
+        except (QueryError, ValueError, re.error) as e:
+            response["error"] = str(e)
+        except Exception as e:
+            # a request the checks above missed must not close the connection
+            response["error"] = f"{type(e).__name__}: {e}"
+        return response
+
+    async def _client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        loop = asyncio.get_running_loop()
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                if line.strip():
+                    # off the event loop, other connections are read and answered meanwhile
+                    response = await loop.run_in_executor(self._executor, self._respond, line)
+                    writer.write(json.dumps(response, separators=(",", ":")).encode() + b"\n")
+                    await writer.drain()
+        except (ConnectionError, asyncio.LimitOverrunError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+
+_servers: Dict[Path, QueryServer] = {}
+
+
+def get_server(path: Path) -> QueryServer:
+    """
+    Running server listening at `path`, started on first use and kept for the lifetime of the process so that
+    `wake print --watch` publishes every build to the same server.
+    """
+    server = _servers.get(path)
+    if server is None:
+        server = QueryServer(path)
+        server.start()
+        _servers[path] = server
+    return server
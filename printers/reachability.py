@@ -0,0 +1,67 @@
+from __future__ import annotations
+
+from typing import List, Sequence
+
+from .graph_algorithms import iter_bits, strongly_connected_components
+
+
+class ReachabilityIndex:
+    """
+    Transitive closure of a graph given as bitset rows, where `rows[node]` holds the direct successors of `node`.
+
+    The graph is condensed into strongly connected components first. Their closures are computed once in reverse
+    topological order, each as the union of its own rows and the closures of its successor components. All nodes of
+    a component share one closure, so an unbounded query is a single lookup.
+    """
+
+    _rows: Sequence[int]
+    _component: List[int]
+    _closures: List[int]
+
+    def __init__(self, rows: Sequence[int]):
+        self._rows = rows
+        self._component = [0] * len(rows)
+        self._closures = []
+
+        # successors are consumed exactly once by the SCC search, so the bitsets need not be expanded into lists
+        for component, members in enumerate(strongly_connected_components([iter_bits(row) for row in rows])):
+            member_mask = 0
+            out = 0
+            for member in members:
+                self._component[member] = component
+                member_mask |= 1 << member
+                out |= rows[member]
+
+            # members of a cycle reach each other, a single node only reaches itself through a self reference
+            closure = out | member_mask if len(members) > 1 else out
+            successor_components = {self._component[node] for node in iter_bits(out & ~member_mask)}
+            for successor in successor_components:
+                closure |= self._closures[successor]
+            self._closures.append(closure)
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def reachable(self, node: int, depth: int | None = None) -> int:
+        """
+        Bitset of nodes reachable from `node` through at least one and, with `depth`, at most `depth` edges.
+        `node` itself is included only when it lies on a cycle within that distance.
+        """
+        closure = self._closures[self._component[node]]
+        if depth is None:
+            return closure
+
+        # breadth-first search over whole frontiers, stopping once the closure is exhausted
+        reached = 0
+        frontier = 1 << node
+        for _ in range(depth):
+            successors = 0
+            for current in iter_bits(frontier):
+                successors |= self._rows[current]
+            frontier = successors & ~reached
+            if frontier == 0:
+                break
+            reached |= frontier
+            if reached == closure:
+                break
+        return reached
@@ -0,0 +1,594 @@
+from __future__ import annotations
+
+import enum
+import heapq
+from array import array
+from typing import TYPE_CHECKING, Dict, Iterable, List, Mapping, Sequence, Set, Tuple
+
+import wake.ir as ir
+from wake.ir.enums import ContractKind, FunctionCallKind
+
+from .graph_algorithms import iter_bits, strongly_connected_components
+
+if TYPE_CHECKING:
+    from .reference_graph_cache import ReferenceGraphCache
+
+
+class ReferenceKind(enum.IntFlag):
+    """
+    Kind of IR reference an edge was created from. An edge keeps the union of the kinds of all references behind it.
+
+    Every reference has one syntactic kind, the IR node it was found in, and one semantic kind, what the referenced
+    contract is used for.
+    """
+
+    IDENTIFIER = 1
+    IDENTIFIER_PATH_PART = 2
+    MEMBER_ACCESS = 4
+    # contract A is B
+    INHERITANCE = 8
+    # variable, parameter and return types, `new B()`, `type(B)`, `B.f.selector`
+    TYPE_USE = 16
+    # B(addr).f()
+    EXTERNAL_CALL = 32
+    # B(addr) without calling a function on the result
+    CAST = 64
+    # L.f(x), using L for T
+    LIBRARY_USE = 128
+
+    SYNTACTIC = IDENTIFIER | IDENTIFIER_PATH_PART | MEMBER_ACCESS
+    SEMANTIC = INHERITANCE | TYPE_USE | EXTERNAL_CALL | CAST | LIBRARY_USE
+    ALL = SYNTACTIC | SEMANTIC
+
+
+# semantic edge kinds by their command line names
+EDGE_KINDS = {
+    "inheritance": ReferenceKind.INHERITANCE,
+    "type-use": ReferenceKind.TYPE_USE,
+    "external-call": ReferenceKind.EXTERNAL_CALL,
+    "cast": ReferenceKind.CAST,
+    "library-use": ReferenceKind.LIBRARY_USE,
+}
+
+
+def edge_kind_names(kind: int) -> List[str]:
+    return [name for name, flag in EDGE_KINDS.items() if kind & flag]
+
+
+def reference_usage(node: ir.IrAbc, target_contract: ir.ContractDefinition) -> ReferenceKind:
+    """
+    Semantic kind of a reference `node` to `target_contract`.
+    """
+    if target_contract.kind == ContractKind.LIBRARY:
+        return ReferenceKind.LIBRARY_USE
+    parent = node.parent
+    if isinstance(parent, ir.InheritanceSpecifier):
+        return ReferenceKind.INHERITANCE
+    if (
+        isinstance(parent, ir.FunctionCall)
+        and parent.kind == FunctionCallKind.TYPE_CONVERSION
+        and parent.expression is node
+    ):
+        access = parent.parent
+        if isinstance(access, ir.MemberAccess):
+            # B(addr).f{value: 1}() calls the options node
+            callee = access.parent if isinstance(access.parent, ir.FunctionCallOptions) else access
+            call = callee.parent
+            if isinstance(call, ir.FunctionCall) and call.expression is callee:
+                return ReferenceKind.EXTERNAL_CALL
+        return ReferenceKind.CAST
+    return ReferenceKind.TYPE_USE
+
+
+# kinds a node can be filtered by, abstract contracts are not of the contract kind
+CONTRACT_KINDS = ("contract", "abstract", "interface", "library")
+
+
+def contract_kind(contract: ir.ContractDefinition) -> str:
+    if contract.kind == ContractKind.CONTRACT and contract.abstract:
+        return "abstract"
+    return contract.kind.value
+
+
+# (source contract key, target contract key, ReferenceKind, number of references, flat (start, end) byte offsets of
+# the references in the source unit or an empty list) created by the references located in one source unit
+UnitEdges = List[Tuple[str, str, int, int, List[int]]]
+
+
+def contract_key(contract: ir.ContractDefinition) -> str:
+    """
+    Stable id of a contract that survives recompilation, in the `source_unit_name:ContractName` form.
+    """
+    return f"{contract.parent.source_unit_name}:{contract.name}"
+
+
+class ReferenceGraph:
+    """
+    Contract cross-reference graph with integer-indexed nodes.
+
+    An edge `(source, target)` means that contract `source` refers to contract `target`. Every edge keeps the union of
+    the kinds of the references behind it and their number. Byte offsets of the references are only kept when the
+    builder recorded them, all of them lie in the source unit of `source`.
+    """
+
+    contracts: List[ir.ContractDefinition]
+    keys: List[str]
+    names: List[str]
+    source_unit_names: List[str]
+    kinds: List[str]
+    index: Dict[ir.ContractDefinition, int]
+    key_index: Dict[str, int]
+    referring: List[Set[int]]
+    referrers: List[Set[int]]
+    edge_kinds: Dict[Tuple[int, int], ReferenceKind]
+    edge_counts: Dict[Tuple[int, int], int]
+    # flat (start, end) byte offsets
+    edge_locations: Dict[Tuple[int, int], array]
+
+    def __init__(self):
+        self.contracts = []
+        self.keys = []
+        self.names = []
+        self.source_unit_names = []
+        self.kinds = []
+        self.index = {}
+        self.key_index = {}
+        self.referring = []
+        self.referrers = []
+        self.edge_kinds = {}
+        self.edge_counts = {}
+        self.edge_locations = {}
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def add_node(self, contract: ir.ContractDefinition) -> int:
+        node = self.index.get(contract)
+        if node is None:
+            node = len(self.keys)
+            key = contract_key(contract)
+            self.index[contract] = node
+            self.key_index[key] = node
+            self.contracts.append(contract)
+            self.keys.append(key)
+            self.names.append(contract.name)
+            self.source_unit_names.append(contract.parent.source_unit_name)
+            self.kinds.append(contract_kind(contract))
+            self.referring.append(set())
+            self.referrers.append(set())
+        return node
+
+    def add_edge(
+        self, source: int, target: int, kind: ReferenceKind, count: int = 1, locations: Sequence[int] = ()
+    ) -> None:
+        edge = (source, target)
+        if edge in self.edge_kinds:
+            self.edge_kinds[edge] |= kind
+            self.edge_counts[edge] += count
+        else:
+            self.edge_kinds[edge] = kind
+            self.edge_counts[edge] = count
+            self.referring[source].add(target)
+            self.referrers[target].add(source)
+        if locations:
+            self.edge_locations.setdefault(edge, array("I")).extend(locations)
+
+    def add_unit_edges(self, edges: UnitEdges) -> None:
+        # edges to or from contracts that are not nodes of the graph are dropped
+        for source_key, target_key, kind, count, locations in edges:
+            source = self.key_index.get(source_key)
+            target = self.key_index.get(target_key)
+            if source is not None and target is not None:
+                self.add_edge(source, target, ReferenceKind(kind), count, locations)
+
+    def node_mask(self, kinds: Iterable[str]) -> int:
+        """
+        Bitset of nodes of the given kinds (see `CONTRACT_KINDS`).
+        """
+        kinds = set(kinds)
+        bits = "".join("1" if kind in kinds else "0" for kind in reversed(self.kinds))
+        return int(bits, 2) if bits else 0
+
+    def remove_edges_from(self, source: int) -> None:
+        for target in self.referring[source]:
+            self.referrers[target].discard(source)
+            del self.edge_kinds[(source, target)]
+            del self.edge_counts[(source, target)]
+            self.edge_locations.pop((source, target), None)
+        self.referring[source] = set()
+
+    def rebind(self, contracts: List[ir.ContractDefinition]) -> None:
+        """
+        Point the nodes to the IR of a new build. `contracts` must have the same keys in the same order as the nodes,
+        their kinds are taken from the new build as `contract A` may have become `abstract contract A` or an interface.
+        """
+        self.contracts = list(contracts)
+        self.index = {contract: node for node, contract in enumerate(self.contracts)}
+        self.kinds = [contract_kind(contract) for contract in self.contracts]
+
+    def adjacency(
+        self, kinds: ReferenceKind = ReferenceKind.ALL
+    ) -> Tuple[List[List[int]], List[List[int]]]:
+        """
+        Build sorted forward (referring) and reverse (referrer) adjacency lists, keeping only edges created from
+        at least one reference of the given kinds.
+        """
+        referring: List[List[int]] = [[] for _ in self.keys]
+        referrers: List[List[int]] = [[] for _ in self.keys]
+        for (source, target), edge_kinds in self.edge_kinds.items():
+            if edge_kinds & kinds:
+                referring[source].append(target)
+                referrers[target].append(source)
+        for adjacent in referring:
+            adjacent.sort()
+        for adjacent in referrers:
+            adjacent.sort()
+        return referring, referrers
+
+    def filtered(self, kinds: ReferenceKind) -> ReferenceGraph:
+        """
+        Graph with the same nodes, keeping only edges created from at least one reference of the given kinds.
+        """
+        graph = ReferenceGraph()
+        for contract in self.contracts:
+            graph.add_node(contract)
+        for edge, edge_kinds in self.edge_kinds.items():
+            if edge_kinds & kinds:
+                graph.add_edge(*edge, edge_kinds, self.edge_counts[edge], self.edge_locations.get(edge, ()))
+        return graph
+
+    def coupled_pairs(
+        self, limit: int, kinds: ReferenceKind = ReferenceKind.ALL, mask: int = -1
+    ) -> List[Tuple[int, int, int]]:
+        """
+        Up to `limit` pairs of distinct contracts with the most references between them in either direction,
+        as `(a, b, references)` with `a < b`, counting the edges created from at least one reference of the given
+        kinds. Only pairs with at least one contract in the `mask` bitset are ranked. The most coupled pairs come
+        first, ties in node order.
+        """
+        totals: Dict[Tuple[int, int], int] = {}
+        for (source, target), edge_kinds in self.edge_kinds.items():
+            if source != target and edge_kinds & kinds and (mask >> source | mask >> target) & 1:
+                pair = (source, target) if source < target else (target, source)
+                totals[pair] = totals.get(pair, 0) + self.edge_counts[(source, target)]
+        top = heapq.nlargest(limit, totals.items(), key=lambda item: (item[1], -item[0][0], -item[0][1]))
+        return [(a, b, references) for (a, b), references in top]
+
+
+class ReferenceGraphBuilder:
+    """
+    Builds a [ReferenceGraph][printers.reference_graph.ReferenceGraph] in a single pass over the source units of its contracts.
+
+    Printers forward their `visit_*` calls to the builder so that edges are recorded while wake is already walking
+    the IR; only source units that were not visited (or are not cached) are walked again by the builder itself.
+
+    With `inherit` disabled, references inside an `InheritanceSpecifier` (`contract A is B`) do not create edges.
+    With `locations`, the byte offsets of all references behind an edge are recorded as well. With a prepared `cache`,
+    visited source units whose edges are cached and up to date are not recorded.
+    """
+
+    _inherit: bool
+    _locations: bool
+    _cache: ReferenceGraphCache | None
+    _enclosing_contracts: Dict[ir.IrAbc, ir.ContractDefinition | None]
+    # [kind, count, flat locations] per edge
+    _collected: Dict[ir.SourceUnit, Dict[Tuple[ir.ContractDefinition, ir.ContractDefinition], list]]
+    # counters reported by --profile
+    references_resolved: int
+    parent_walk_steps: int
+    edges_recorded: int
+    edges_deduplicated: int
+    source_units_walked: int
+
+    def __init__(self, inherit: bool, locations: bool = False, cache: ReferenceGraphCache | None = None):
+        self._inherit = inherit
+        self._locations = locations
+        self._cache = cache
+        self._enclosing_contracts = {}
+        self._collected = {}
+        self.references_resolved = 0
+        self.parent_walk_steps = 0
+        self.edges_recorded = 0
+        self.edges_deduplicated = 0
+        self.source_units_walked = 0
+
+    def find_contract_definition(self, node: ir.IrAbc) -> ir.ContractDefinition | None:
+        # every node on the walked path shares the same enclosing contract, so cache them all;
+        # the cache is per builder and self._inherit is fixed per builder, so the InheritanceSpecifier rule is preserved
+        path: List[ir.IrAbc] = []
+        contract = None
+        while node is not None:
+            if node in self._enclosing_contracts:
+                contract = self._enclosing_contracts[node]
+                break
+            path.append(node)
+            if isinstance(node, ir.InheritanceSpecifier) and not self._inherit:
+                break
+            if isinstance(node, ir.ContractDefinition):
+                contract = node
+                break
+            if isinstance(node, ir.SourceUnit):
+                break
+            node = node.parent
+        self.parent_walk_steps += len(path)
+        for visited in path:
+            self._enclosing_contracts[visited] = contract
+        return contract
+
+    def referring_contract(self, expression: ir.ExpressionAbc) -> ir.ContractDefinition | None:
+        statement = expression.statement
+        if statement is not None:
+            # free functions have a source unit as parent
+            parent = statement.declaration.parent
+            return parent if isinstance(parent, ir.ContractDefinition) else None
+        return self.find_contract_definition(expression)
+
+    def visit_source_unit(self, node: ir.SourceUnit) -> None:
+        # cached edges are reused by build() and update(), resolving the references again would be wasted
+        if self._cache is not None and self._cache.get(node) is not None:
+            return
+        # edges of a source unit are only complete if all of its nodes were visited after this call
+        self._collected[node] = {}
+
+    def _recording(self, node: ir.IrAbc) -> bool:
+        return node.source_unit in self._collected
+
+    def _add(
+        self,
+        node: ir.IrAbc,
+        source_contract: ir.ContractDefinition | None,
+        target_contract: ir.ContractDefinition,
+        kind: ReferenceKind,
+    ) -> None:
+        self.references_resolved += 1
+        if source_contract is None:
+            return
+        edges = self._collected.get(node.source_unit)
+        if edges is None:
+            return
+        kind |= reference_usage(node, target_contract)
+        edge = (source_contract, target_contract)
+        entry = edges.get(edge)
+        if entry is None:
+            edges[edge] = entry = [kind, 0, []]
+            self.edges_recorded += 1
+        else:
+            entry[0] |= kind
+            self.edges_deduplicated += 1
+        entry[1] += 1
+        if self._locations:
+            entry[2].extend(node.byte_location)
+
+    def visit_identifier(self, node: ir.Identifier) -> None:
+        target_contract = node.referenced_declaration
+        if isinstance(target_contract, ir.ContractDefinition) and self._recording(node):
+            self._add(node, self.referring_contract(node), target_contract, ReferenceKind.IDENTIFIER)
+
+    def visit_member_access(self, node: ir.MemberAccess) -> None:
+        target_contract = node.referenced_declaration
+        if isinstance(target_contract, ir.ContractDefinition) and self._recording(node):
+            self._add(node, self.referring_contract(node), target_contract, ReferenceKind.MEMBER_ACCESS)
+
+    def _visit_identifier_path_parts(self, node: ir.IdentifierPath | ir.UserDefinedTypeName) -> None:
+        if not self._recording(node):
+            return
+        for part in node.identifier_path_parts:
+            target_contract = part.referenced_declaration
+            if isinstance(target_contract, ir.ContractDefinition):
+                self._add(node, self.find_contract_definition(node), target_contract, ReferenceKind.IDENTIFIER_PATH_PART)
+
+    def visit_identifier_path(self, node: ir.IdentifierPath) -> None:
+        self._visit_identifier_path_parts(node)
+
+    def visit_user_defined_type_name(self, node: ir.UserDefinedTypeName) -> None:
+        # since 0.8.0 a user defined type name shares its parts with its identifier path node
+        if node.path_node is None:
+            self._visit_identifier_path_parts(node)
+
+    def collected_edges(self, source_unit: ir.SourceUnit) -> UnitEdges | None:
+        """
+        Edges recorded by the `visit_*` methods while `source_unit` was visited, None if it was not visited.
+        """
+        edges = self._collected.pop(source_unit, None)
+        if edges is None:
+            return None
+        keys: Dict[ir.ContractDefinition, str] = {}
+        for contracts in edges:
+            for contract in contracts:
+                if contract not in keys:
+                    keys[contract] = contract_key(contract)
+        return [
+            (keys[source], keys[target], kind, count, locations)
+            for (source, target), (kind, count, locations) in edges.items()
+        ]
+
+    def analyse_source_unit(self, source_unit: ir.SourceUnit) -> UnitEdges:
+        """
+        Collect contract-to-contract edges created by the references located in `source_unit`.
+        The result only depends on the source unit and the declarations it resolves to, so it can be cached.
+        """
+        self.source_units_walked += 1
+        self._collected[source_unit] = {}
+        for node in source_unit:
+            if isinstance(node, ir.Identifier):
+                self.visit_identifier(node)
+            elif isinstance(node, ir.MemberAccess):
+                self.visit_member_access(node)
+            elif isinstance(node, ir.IdentifierPath):
+                self.visit_identifier_path(node)
+            elif isinstance(node, ir.UserDefinedTypeName):
+                self.visit_user_defined_type_name(node)
+        edges = self.collected_edges(source_unit)
+        assert edges is not None
+        return edges
+
+    def _fresh_edges(self, source_unit: ir.SourceUnit) -> UnitEdges:
+        # reuse edges recorded while wake visited the source unit, walk it only if it was not visited
+        edges = self.collected_edges(source_unit)
+        if edges is None:
+            edges = self.analyse_source_unit(source_unit)
+        return edges
+
+    def build(
+        self,
+        contracts: Iterable[ir.ContractDefinition],
+        cache: ReferenceGraphCache | None = None,
+        content_hashes: Mapping[str, bytes] | None = None,
+    ) -> ReferenceGraph:
+        graph = ReferenceGraph()
+        for contract in contracts:
+            graph.add_node(contract)
+
+        # an edge always starts in the source unit of the reference, so only source units of the nodes are analysed
+        source_units = list(dict.fromkeys(contract.parent for contract in graph.contracts))
+        if cache is not None:
+            cache.prepare(source_units, content_hashes)
+
+        for source_unit in source_units:
+            graph.add_unit_edges(self.unit_edges(source_unit, cache))
+        return graph
+
+    def unit_edges(self, source_unit: ir.SourceUnit, cache: ReferenceGraphCache | None = None) -> UnitEdges:
+        """
+        Edges of `source_unit` from `cache` if up to date, otherwise analysed and stored in `cache`.
+        The cache must be prepared for the source unit.
+        """
+        edges = cache.get(source_unit) if cache is not None else None
+        if edges is None:
+            edges = self._fresh_edges(source_unit)
+            if cache is not None:
+                cache.set(source_unit, edges)
+        return edges
+
+    def update(
+        self,
+        graph: ReferenceGraph,
+        cache: ReferenceGraphCache,
+        content_hashes: Mapping[str, bytes] | None = None,
+    ) -> Set[int]:
+        """
+        Re-analyse the source units of `graph` that are not up to date in `cache`, replacing their old edges.
+        The graph must already be rebound to the current build.
+
+        Returns:
+            Nodes whose referring edges were replaced.
+        """
+        source_units = list(dict.fromkeys(contract.parent for contract in graph.contracts))
+        cache.prepare(source_units, content_hashes)
+
+        changed: Set[int] = set()
+        for source_unit in source_units:
+            if cache.get(source_unit) is not None:
+                continue
+            edges = self._fresh_edges(source_unit)
+            cache.set(source_unit, edges)
+
+            # edges of a source unit always start in one of its contracts
+            sources = [graph.index[contract] for contract in source_unit.contracts if contract in graph.index]
+            for source in sources:
+                graph.remove_edges_from(source)
+            graph.add_unit_edges(edges)
+            changed.update(sources)
+        return changed
+
+
+class CyclicInheritanceError(Exception):
+    """
+    Raised when contracts inherit from each other in a cycle.
+    """
+
+
+class InheritedReferenceGraph:
+    """
+    Reference graph with references propagated along inheritance: a contract refers to everything its base contracts
+    refer to, and a contract referring to a base contract refers to all contracts derived from it as well.
+
+    Rows are bitsets over node ids. With `lin` the linearized base contracts and `derived` its inverse, a contract
+    refers to `derived` of everything referred to by its `lin`, and symmetrically for referrers. Each row is computed
+    once as a union of precomputed rows instead of copying sets down the inheritance tree.
+    """
+
+    _graph: ReferenceGraph
+    bases: List[List[int]]
+    derived: List[List[int]]
+    referring: List[int]
+    referrers: List[int]
+    _derived_masks: List[int]
+    _direct_referring: List[int]
+    _expanded_referring: List[int]
+    _expanded_referrers: List[int]
+
+    def __init__(self, graph: ReferenceGraph):
+        self._graph = graph
+        n = len(graph)
+        # linearized base contracts start with the contract itself
+        self.bases = [
+            [graph.index[base] for base in contract.linearized_base_contracts if base in graph.index]
+            for contract in graph.contracts
+        ]
+        self._check_cycles()
+
+        self.derived = [[] for _ in range(n)]
+        self._derived_masks = [0] * n
+        for contract, bases in enumerate(self.bases):
+            for base in bases:
+                self.derived[base].append(contract)
+                self._derived_masks[base] |= 1 << contract
+
+        self.referring = [0] * n
+        self.referrers = [0] * n
+        self._direct_referring = [0] * n
+        self._expanded_referring = [0] * n
+        self._expanded_referrers = [0] * n
+        self.update(range(n))
+
+    def _check_cycles(self) -> None:
+        cycles = [
+            component
+            for component in strongly_connected_components([bases[1:] for bases in self.bases])
+            if len(component) > 1 or component[0] in self.bases[component[0]][1:]
+        ]
+        if cycles:
+            raise CyclicInheritanceError(
+                "Cyclic inheritance between contracts: "
+                + "; ".join(", ".join(sorted(self._graph.keys[c] for c in cycle)) for cycle in cycles)
+            )
+
+    def _expand(self, nodes: Iterable[int]) -> int:
+        mask = 0
+        for node in nodes:
+            mask |= self._derived_masks[node]
+        return mask
+
+    def update(self, changed: Iterable[int]) -> None:
+        """
+        Re-propagate after referring edges of `changed` nodes were replaced, touching only the contracts derived from
+        the changed nodes and from the targets of their old and new edges.
+        """
+        graph = self._graph
+        affected_referring = 0
+        changed_targets: Set[int] = set()
+        for source in changed:
+            direct = 0
+            for target in graph.referring[source]:
+                direct |= 1 << target
+            changed_targets.update(iter_bits(direct ^ self._direct_referring[source]))
+            self._direct_referring[source] = direct
+            self._expanded_referring[source] = self._expand(graph.referring[source])
+            affected_referring |= self._derived_masks[source]
+
+        affected_referrers = 0
+        for target in changed_targets:
+            self._expanded_referrers[target] = self._expand(graph.referrers[target])
+            affected_referrers |= self._derived_masks[target]
+
+        for contract in iter_bits(affected_referring):
+            mask = 0
+            for base in self.bases[contract]:
+                mask |= self._expanded_referring[base]
+            self.referring[contract] = mask
+        for contract in iter_bits(affected_referrers):
+            mask = 0
+            for base in self.bases[contract]:
+                mask |= self._expanded_referrers[base]
+            self.referrers[contract] = mask
@@ -0,0 +1,167 @@
+from __future__ import annotations
+
+import hashlib
+import json
+from pathlib import Path
+from typing import Dict, List, Mapping, Set, Tuple
+
+import wake.ir as ir
+
+from .graph_algorithms import strongly_connected_components
+from .reference_graph import UnitEdges
+
+CACHE_VERSION = 2
+
+
+class ReferenceGraphCache:
+    """
+    Cache of per-source-unit reference graph edges, kept in memory and optionally persisted to `path`.
+
+    An entry is keyed by a hash of the source unit content, the content of all source units it (transitively) imports
+    and the analysis settings. Editing a file therefore invalidates the file itself and every file importing it,
+    which are exactly the source units whose references may resolve differently.
+    """
+
+    _path: Path | None
+    _settings: str
+    _entries: Dict[str, Tuple[str, UnitEdges]]
+    # closure hashes by source unit name, only of the last prepared build so that earlier IR is not kept alive
+    _hashes: Dict[str, str]
+    # source units prepared since the last save, entries of other source units are dropped when saving
+    _touched: Set[str]
+    _dirty: bool
+
+    def __init__(self, path: Path | None, settings: str):
+        self._path = path
+        self._settings = settings
+        self._entries = {}
+        self._hashes = {}
+        self._touched = set()
+        self._dirty = False
+
+        if path is None:
+            return
+        try:
+            data = json.loads(path.read_text())
+        except (OSError, ValueError):
+            return
+        if data.get("version") != CACHE_VERSION or data.get("settings") != settings:
+            return
+
+        keys: List[str] = data["keys"]
+        for source_unit_name, (unit_hash, flat_edges) in data["units"].items():
+            # source, target, kind, count, number of location offsets, location offsets
+            edges: UnitEdges = []
+            i = 0
+            while i < len(flat_edges):
+                end = i + 5 + flat_edges[i + 4]
+                edges.append(
+                    (keys[flat_edges[i]], keys[flat_edges[i + 1]], flat_edges[i + 2], flat_edges[i + 3], flat_edges[i + 5 : end])
+                )
+                i = end
+            self._entries[source_unit_name] = (unit_hash, edges)
+
+    @property
+    def settings(self) -> str:
+        return self._settings
+
+    def prepare(
+        self, source_units: List[ir.SourceUnit], content_hashes: Mapping[str, bytes] | None = None
+    ) -> None:
+        """
+        Compute the hashes of `source_units` including their import closures, linear in the size of the import graph.
+        Content hashes already computed by the compiler may be passed in `content_hashes` keyed by source unit name.
+        Hashes of previously prepared source units are forgotten.
+        """
+        self._hashes = {}
+        if content_hashes is None:
+            content_hashes = {}
+
+        units: List[ir.SourceUnit] = []
+        index: Dict[ir.SourceUnit, int] = {}
+        imports: List[List[ir.SourceUnit]] = []
+        stack = list(source_units)
+        while stack:
+            source_unit = stack.pop()
+            if source_unit in index:
+                continue
+            index[source_unit] = len(units)
+            units.append(source_unit)
+            imports.append([directive.imported_source_unit for directive in source_unit.imports])
+            stack.extend(imports[-1])
+        successors = [[index[imported] for imported in imported_units] for imported_units in imports]
+
+        # import cycles are allowed in Solidity, all files of a cycle share one closure hash
+        component_hashes: List[str] = [""] * len(units)
+        for component in strongly_connected_components(successors):
+            members = set(component)
+            h = hashlib.blake2b(self._settings.encode("utf-8"), digest_size=32)
+            for source_unit in sorted((units[member] for member in component), key=lambda u: u.source_unit_name):
+                h.update(source_unit.source_unit_name.encode("utf-8"))
+                content_hash = content_hashes.get(source_unit.source_unit_name)
+                if content_hash is None:
+                    content_hash = hashlib.blake2b(source_unit.file_source, digest_size=32).digest()
+                h.update(content_hash)
+            for dependency in sorted(
+                {component_hashes[s] for member in component for s in successors[member] if s not in members}
+            ):
+                h.update(dependency.encode("utf-8"))
+            digest = h.hexdigest()
+            for member in component:
+                component_hashes[member] = digest
+
+        for source_unit in source_units:
+            self._hashes[source_unit.source_unit_name] = component_hashes[index[source_unit]]
+        self._touched.update(self._hashes)
+
+    def get(self, source_unit: ir.SourceUnit) -> UnitEdges | None:
+        entry = self._entries.get(source_unit.source_unit_name)
+        if entry is None or entry[0] != self._hashes.get(source_unit.source_unit_name):
+            return None
+        return entry[1]
+
+    def last_edges(self, source_unit_name: str) -> UnitEdges | None:
+        """
+        Edges of the source unit as last analysed, whether or not they are up to date.
+        """
+        entry = self._entries.get(source_unit_name)
+        return entry[1] if entry is not None else None
+
+    def set(self, source_unit: ir.SourceUnit, edges: UnitEdges) -> None:
+        self._entries[source_unit.source_unit_name] = (self._hashes[source_unit.source_unit_name], edges)
+        self._dirty = True
+
+    def save(self) -> None:
+        """
+        Write the entries of the source units prepared since the last save, forgetting deleted or renamed files.
+        """
+        if self._touched:
+            stale = self._entries.keys() - self._touched
+            for source_unit_name in stale:
+                del self._entries[source_unit_name]
+            self._dirty |= len(stale) != 0
+            self._touched = set()
+        if self._path is None or not self._dirty:
+            return
+
+        keys: Dict[str, int] = {}
+        units = {}
+        for source_unit_name, (unit_hash, edges) in self._entries.items():
+            flat_edges = []
+            for source, target, kind, count, locations in edges:
+                flat_edges.append(keys.setdefault(source, len(keys)))
+                flat_edges.append(keys.setdefault(target, len(keys)))
+                flat_edges += (kind, count, len(locations))
+                flat_edges += locations
+            units[source_unit_name] = [unit_hash, flat_edges]
+
+        self._path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self._path.with_suffix(".tmp")
+        tmp.write_text(
+            json.dumps(
+                {"version": CACHE_VERSION, "settings": self._settings, "keys": list(keys), "units": units},
+                separators=(",", ":"),
+            )
+        )
+        tmp.replace(self._path)
+        self._dirty = False
@@ -0,0 +1,315 @@
+from __future__ import annotations
+
+import hashlib
+from pathlib import Path
+from typing import Dict, Iterable, List, Mapping, Set, Tuple
+
+import wake.ir as ir
+from wake.printers import Printer
+
+from .import_graph import IMPORT_GRAPH_FILE, ImportGraph
+from .lazy_reference_graph import LazyReferenceGraph
+from .reachability import ReachabilityIndex
+from .reference_graph import (
+    InheritedReferenceGraph,
+    ReferenceGraph,
+    ReferenceGraphBuilder,
+    ReferenceKind,
+    contract_key,
+)
+from .reference_graph_cache import ReferenceGraphCache
+
+
+class ReferenceGraphSession:
+    """
+    Reference graph kept up to date across builds of one project in a long-running process (`wake print --watch`, LSP).
+
+    Printers are instantiated again for every build, so the graph lives here. A refresh re-analyses only source units
+    whose content or imports changed, retracts their old edges, applies the new ones and re-propagates inheritance
+    across the contracts derived from the changed ones. Adding, removing or re-parenting contracts triggers a full rebuild.
+    """
+
+    _inherit: bool
+    _locations: bool
+    _cache: ReferenceGraphCache
+    _build: object | None
+    _structure: List[Tuple[str, Tuple[str, ...]]] | None
+    _graph: ReferenceGraph | None
+    _inherited: InheritedReferenceGraph | None
+    _reachability: Tuple[ReachabilityIndex, ReachabilityIndex] | None
+    _import_graph: ImportGraph | None
+    _visited_build: object | None
+    _builder: ReferenceGraphBuilder | None
+
+    def __init__(self, inherit: bool, cache: ReferenceGraphCache, locations: bool = False):
+        self._inherit = inherit
+        self._locations = locations
+        self._cache = cache
+        self._build = None
+        self._structure = None
+        self._graph = None
+        self._inherited = None
+        self._reachability = None
+        self._import_graph = None
+        self._visited_build = None
+        self._builder = None
+
+    @property
+    def settings(self) -> str:
+        return self._cache.settings
+
+    @property
+    def cache(self) -> ReferenceGraphCache:
+        return self._cache
+
+    @property
+    def builder(self) -> ReferenceGraphBuilder:
+        """
+        Builder of the last refresh, holding the analysis counters reported by `--profile`.
+        """
+        assert self._builder is not None, "Session was not refreshed"
+        return self._builder
+
+    def visit_builder(
+        self,
+        build: object,
+        source_units: Iterable[ir.SourceUnit],
+        content_hashes: Mapping[str, bytes] | None = None,
+    ) -> ReferenceGraphBuilder | None:
+        """
+        Builder to forward the `visit_*` calls of a printer to while wake visits `build`. Only source units whose
+        edges are not cached are recorded. Printers sharing the session visit the same build, only the first one
+        gets a builder and the others None, the next refresh of `build` uses the recorded edges.
+        """
+        if build is self._visited_build:
+            return None
+        self._visited_build = build
+        # edges always start in a contract, the cache only holds source units declaring one
+        self._cache.prepare([source_unit for source_unit in source_units if source_unit.contracts], content_hashes)
+        self._builder = ReferenceGraphBuilder(self._inherit, self._locations, self._cache)
+        return self._builder
+
+    def referenced_contracts(
+        self,
+        contracts: List[ir.ContractDefinition],
+        source_unit_names: Iterable[str],
+        content_hashes: Mapping[str, bytes] | None = None,
+    ) -> Dict[str, Set[str]]:
+        """
+        Keys of the contracts referenced from each of `source_unit_names` in the build of `contracts` or in the last
+        analysis cached for it. Source units declaring contracts without a cached analysis are left out, their
+        earlier references are not known.
+        """
+        source_units = {contract.parent.source_unit_name: contract.parent for contract in contracts}
+        referenced: Dict[str, Set[str]] = {}
+        for source_unit_name in source_unit_names:
+            if source_unit_name not in source_units:
+                # edges always start in a contract
+                referenced[source_unit_name] = set()
+                continue
+            # read before the entry is replaced by the analysis of the current build
+            edges = self._cache.last_edges(source_unit_name)
+            if edges is not None:
+                referenced[source_unit_name] = {target for _, target, _, _, _ in edges}
+
+        # all source units are prepared so that saving keeps the cached analysis of the unaffected ones
+        self._cache.prepare(list(source_units.values()), content_hashes)
+        builder = ReferenceGraphBuilder(self._inherit, self._locations)
+        for source_unit_name, targets in referenced.items():
+            source_unit = source_units.get(source_unit_name)
+            if source_unit is not None:
+                targets.update(target for _, target, _, _, _ in builder.unit_edges(source_unit, self._cache))
+        self._cache.save()
+        return referenced
+
+    @property
+    def graph(self) -> ReferenceGraph:
+        assert self._graph is not None, "Session was not refreshed"
+        return self._graph
+
+    @property
+    def inherited(self) -> InheritedReferenceGraph:
+        if self._inherited is None:
+            self._inherited = InheritedReferenceGraph(self.graph)
+        return self._inherited
+
+    @property
+    def reachability(self) -> Tuple[ReachabilityIndex, ReachabilityIndex]:
+        """
+        Transitive referring and referrers indexes over the inherited graph, built on first use after a refresh.
+        """
+        if self._reachability is None:
+            inherited = self.inherited
+            self._reachability = (ReachabilityIndex(inherited.referring), ReachabilityIndex(inherited.referrers))
+        return self._reachability
+
+    @property
+    def import_graph(self) -> ImportGraph:
+        """
+        Import graph of the source units of the contracts in the graph, built on first use after a refresh.
+        """
+        if self._import_graph is None:
+            self._import_graph = ImportGraph.from_source_units(
+                dict.fromkeys(contract.parent for contract in self.graph.contracts)
+            )
+        return self._import_graph
+
+    def refresh(
+        self,
+        build: object,
+        contracts: List[ir.ContractDefinition],
+        content_hashes: Mapping[str, bytes] | None = None,
+        builder: ReferenceGraphBuilder | None = None,
+    ) -> ReferenceGraph:
+        """
+        Bring the graph up to date with `build`. A `builder` that recorded edges while the build was visited
+        avoids walking the source units again, by default the one handed out by
+        [visit_builder][printers.reference_graph_session.ReferenceGraphSession.visit_builder] for `build`.
+        """
+        # printers running on the same build share the graph
+        if self._graph is not None and build is self._build and self._graph.contracts == contracts:
+            return self._graph
+
+        structure = [
+            (contract_key(contract), tuple(contract_key(base) for base in contract.linearized_base_contracts))
+            for contract in contracts
+        ]
+        if builder is None:
+            if build is self._visited_build and self._builder is not None:
+                builder = self._builder
+            else:
+                builder = ReferenceGraphBuilder(self._inherit, self._locations)
+        self._builder = builder
+        if self._graph is None or structure != self._structure:
+            self._graph = builder.build(contracts, self._cache, content_hashes)
+            self._inherited = None
+        else:
+            self._graph.rebind(contracts)
+            changed = builder.update(self._graph, self._cache, content_hashes)
+            if self._inherited is not None:
+                self._inherited.update(changed)
+
+        self._reachability = None
+        self._import_graph = None
+        self._build = build
+        self._structure = structure
+        self._cache.save()
+        return self._graph
+
+
+_sessions: Dict[Tuple[Path, bool, bool, bool], ReferenceGraphSession] = {}
+
+
+def cache_path(project_root: Path, inherit: bool, locations: bool) -> Path:
+    """
+    Persistent cache of the analysis options. Printers running with different options keep separate files instead of
+    evicting each other's analysis, compiler settings changing under the same options still replace the file.
+    """
+    digest = hashlib.blake2b(f"inherit={inherit};locations={locations}".encode(), digest_size=4).hexdigest()
+    return project_root / ".wake" / f"contract-cross-reference-graph-cache-{digest}.json"
+
+
+def get_session(
+    project_root: Path, inherit: bool, settings: str, persist: bool, locations: bool = False
+) -> ReferenceGraphSession:
+    """
+    Return the session of a project, starting a new one when analysis settings changed.
+    With `persist`, per-file analysis is also cached in `.wake/` across processes.
+    """
+    key = (project_root, inherit, persist, locations)
+    session = _sessions.get(key)
+    if session is None or session.settings != settings:
+        path = cache_path(project_root, inherit, locations) if persist else None
+        session = ReferenceGraphSession(inherit, ReferenceGraphCache(path, settings), locations)
+        _sessions[key] = session
+    return session
+
+
+def drop_sessions(project_root: Path) -> None:
+    """
+    Forget the sessions of a project, releasing its graphs. Per-file analysis persisted in `.wake/` is kept.
+    """
+    for key in [key for key in _sessions if key[0] == project_root]:
+        del _sessions[key]
+
+
+def _printer_session(
+    printer: Printer, inherit: bool, persist: bool, locations: bool = False
+) -> Tuple[ReferenceGraphSession, Dict[str, bytes]]:
+    build_info = printer.build_info  # pyright: ignore reportGeneralTypeIssues
+    # cached edges only carry reference locations when they were recorded
+    settings = f"inherit={inherit};locations={locations};" + build_info.model_dump_json(include={"settings", "wake_version"})
+    content_hashes = {
+        source_unit_name: bytes(info.blake2b_hash) for source_unit_name, info in build_info.source_units_info.items()
+    }
+    session = get_session(printer.config.project_root_path, inherit, settings, persist, locations)  # pyright: ignore reportGeneralTypeIssues
+    return session, content_hashes
+
+
+def printer_visit_builder(
+    printer: Printer, inherit: bool, persist: bool, locations: bool = False
+) -> ReferenceGraphBuilder | None:
+    """
+    Builder for a printer to forward its `visit_*` calls to, called from `cli()` before wake visits the build.
+    None if another printer with the same options already records the build, see
+    [visit_builder][printers.reference_graph_session.ReferenceGraphSession.visit_builder].
+    """
+    session, content_hashes = _printer_session(printer, inherit, persist, locations)
+    build = printer.build  # pyright: ignore reportGeneralTypeIssues
+    return session.visit_builder(build, build.source_units.values(), content_hashes)
+
+
+def refresh_printer_session(
+    printer: Printer,
+    contracts: List[ir.ContractDefinition],
+    inherit: bool,
+    persist: bool,
+    builder: ReferenceGraphBuilder | None = None,
+    locations: bool = False,
+) -> ReferenceGraphSession:
+    """
+    Refresh the session of the project a printer runs on with the contracts it visited,
+    using the edges `builder` recorded during the visit. `locations` must match the builder.
+    """
+    session, content_hashes = _printer_session(printer, inherit, persist, locations)
+    session.refresh(printer.build, contracts, content_hashes, builder)  # pyright: ignore reportGeneralTypeIssues
+    return session
+
+
+def referenced_contracts(
+    printer: Printer,
+    contracts: List[ir.ContractDefinition],
+    inherit: bool,
+    persist: bool,
+    source_unit_names: Iterable[str],
+) -> Dict[str, Set[str]]:
+    """
+    Contracts referenced from `source_unit_names` by the contracts a printer visited, see
+    [referenced_contracts][printers.reference_graph_session.ReferenceGraphSession.referenced_contracts].
+    """
+    session, content_hashes = _printer_session(printer, inherit, persist)
+    return session.referenced_contracts(contracts, source_unit_names, content_hashes)
+
+
+def lazy_printer_graph(
+    printer: Printer,
+    contracts: List[ir.ContractDefinition],
+    inherit: bool,
+    persist: bool,
+    builder: ReferenceGraphBuilder | None = None,
+    kinds: ReferenceKind = ReferenceKind.ALL,
+) -> LazyReferenceGraph:
+    """
+    Demand-driven graph of the contracts a printer visited, sharing the per-file analysis cache of the project session.
+    """
+    session, content_hashes = _printer_session(printer, inherit, persist)
+    if builder is None:
+        builder = ReferenceGraphBuilder(inherit)
+    return LazyReferenceGraph(contracts, builder, session.cache, content_hashes, kinds)
+
+
+def save_import_graph(printer: Printer, import_graph: ImportGraph) -> None:
+    """
+    Save the import graph of the last build to `.wake/` for answering `--changed-files` without compiling.
+    """
+    import_graph.save(printer.config.project_root_path / ".wake" / IMPORT_GRAPH_FILE)  # pyright: ignore reportGeneralTypeIssues
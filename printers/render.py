@@ -0,0 +1,111 @@
+from __future__ import annotations
+
+import filecmp
+import hashlib
+import shutil
+import subprocess
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, List, NamedTuple, Sequence
+
+RENDER_FORMATS = ("svg", "png")
+LAYOUT_ENGINES = ("dot", "neato", "fdp", "sfdp", "circo", "twopi")
+
+
+def render_key(dot: bytes, engine: str, format: str) -> str:
+    """
+    Cache key of a rendered artifact, the layout only depends on the DOT content, the engine and the output format.
+    """
+    h = hashlib.blake2b(digest_size=16)
+    h.update(f"{engine}\0{format}\0".encode())
+    h.update(dot)
+    return h.hexdigest()
+
+
+def graphviz_layout(source: Path, target: Path, engine: str, format: str) -> None:
+    # graphviz is an optional dependency only needed for rendering
+    import graphviz
+
+    graphviz.render(engine, format, str(source), outfile=str(target), quiet=True)
+
+
+class RenderResult(NamedTuple):
+    path: Path
+    # False when the artifact was reused from the cache
+    laid_out: bool
+    # output of the layout engine when it failed, the image was not written
+    error: str | None = None
+
+
+class Renderer:
+    """
+    Renders `.dot` files to images next to them. Artifacts are stored in `cache_dir` under the hash of the DOT content,
+    the layout engine and the format, so graphs that did not change are copied from the cache instead of being laid
+    out again, and images that are already up to date are not touched at all.
+    """
+
+    cache_dir: Path
+    engine: str
+    format: str
+    force: bool
+    _layout: Callable[[Path, Path, str, str], None]
+
+    def __init__(
+        self,
+        cache_dir: Path,
+        engine: str = "dot",
+        format: str = "svg",
+        force: bool = False,
+        layout: Callable[[Path, Path, str, str], None] = graphviz_layout,
+    ):
+        if format not in RENDER_FORMATS:
+            raise ValueError(f"Unknown render format: {format}")
+        self.cache_dir = cache_dir
+        self.engine = engine
+        self.format = format
+        self.force = force
+        self._layout = layout
+
+    def render(self, source: Path) -> RenderResult:
+        target = source.with_suffix(f".{self.format}")
+        cached = self.cache_dir / f"{render_key(source.read_bytes(), self.engine, self.format)}.{self.format}"
+
+        laid_out = False
+        if self.force or not cached.exists():
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            # rendered aside and moved into place so that an interrupted layout never leaves a truncated entry,
+            # under a unique name as concurrent renders of identical graphs share the cache entry
+            with tempfile.NamedTemporaryFile(
+                dir=self.cache_dir, prefix=f"{cached.stem}.", suffix=f".tmp.{self.format}", delete=False
+            ) as f:
+                temporary = Path(f.name)
+            try:
+                self._layout(source, temporary, self.engine, self.format)
+                temporary.replace(cached)
+            finally:
+                temporary.unlink(missing_ok=True)
+            laid_out = True
+
+        if laid_out or not target.exists() or not filecmp.cmp(cached, target, shallow=False):
+            shutil.copyfile(cached, target)
+        return RenderResult(target, laid_out)
+
+    def _render_or_fail(self, source: Path) -> RenderResult:
+        try:
+            return self.render(source)
+        except subprocess.CalledProcessError as e:
+            # graphviz.CalledProcessError when the layout engine rejects the graph or crashes
+            stderr = e.stderr.decode(errors="replace") if isinstance(e.stderr, bytes) else e.stderr
+            return RenderResult(source.with_suffix(f".{self.format}"), False, (stderr or str(e)).strip())
+
+    def render_all(self, sources: Sequence[Path], jobs: int) -> List[RenderResult]:
+        """
+        Render `sources` with up to `jobs` layouts running at once. Layout runs in graphviz subprocesses,
+        so worker threads are enough to keep them busy. A file the layout engine fails on is skipped with the error
+        in its result.
+        """
+        if jobs <= 1 or len(sources) <= 1:
+            return [self._render_or_fail(source) for source in sources]
+        with ThreadPoolExecutor(max_workers=jobs) as executor:
+            return list(executor.map(self._render_or_fail, sources))
@@ -0,0 +1,96 @@
+"""
+Duck-typed stand-ins for the wake IR nodes the printers read, shared by the tests.
+"""
+import random
+from pathlib import Path
+from typing import Dict, Iterable, List, Sequence
+
+from wake.ir.enums import ContractKind
+
+from printers.reference_graph import ReferenceGraph, ReferenceKind
+
+
+class ImportDirective:
+    def __init__(self, imported_source_unit: "SourceUnit"):
+        self.imported_source_unit = imported_source_unit
+
+
+class SourceUnit:
+    def __init__(
+        self,
+        source_unit_name: str,
+        file_source: bytes = b"",
+        imports: Iterable["SourceUnit"] = (),
+        root: Path = Path("/project"),
+    ):
+        self.source_unit_name = source_unit_name
+        self.file_source = file_source
+        self.file = root / source_unit_name
+        self.imports = [ImportDirective(imported) for imported in imports]
+        self.contracts: List["Contract"] = []
+
+
+class Contract:
+    """
+    Contract declared in `parent`, given as a source unit or as the name of a new source unit.
+    """
+
+    def __init__(
+        self,
+        parent: "SourceUnit | str",
+        name: str,
+        bases: Sequence["Contract"] = (),
+        kind: ContractKind = ContractKind.CONTRACT,
+        abstract: bool = False,
+    ):
+        self.parent = SourceUnit(parent) if isinstance(parent, str) else parent
+        self.name = name
+        self.kind = kind
+        self.abstract = abstract
+        self.base_contracts = list(bases)
+        self.child_contracts: List[Contract] = []
+        linearized = {self: None}
+        for base in bases:
+            base.child_contracts.append(self)
+            linearized.update(dict.fromkeys(base.linearized_base_contracts))
+        self.linearized_base_contracts = list(linearized)
+        self.parent.contracts.append(self)
+
+
+def graph(contracts: Iterable[Contract], edges=(), kind: ReferenceKind = ReferenceKind.IDENTIFIER) -> ReferenceGraph:
+    """
+    Graph of `contracts` with `edges` given as `(source, target)` or `(source, target, count)` node pairs.
+    """
+    g = ReferenceGraph()
+    for contract in contracts:
+        g.add_node(contract)
+    for source, target, *count in edges:
+        g.add_edge(source, target, kind, *count)
+    return g
+
+
+def hierarchy(n: int, seed: int) -> List[Contract]:
+    """
+    `n` contracts in their own source units, each deriving from up to two earlier ones.
+    """
+    rng = random.Random(seed)
+    contracts: List[Contract] = []
+    for i in range(n):
+        bases = rng.sample(contracts, min(len(contracts), rng.randrange(3)))
+        contracts.append(Contract(SourceUnit(f"C{i}.sol", b"0"), f"C{i}", bases))
+    return contracts
+
+
+def random_edges(
+    sources: List[Contract], targets: List[Contract], rng: random.Random, count: int
+) -> Dict[str, list]:
+    """
+    `count` random edges as cached per source unit, keyed by the source unit name of every contract in `sources`.
+    """
+    edges: Dict[str, list] = {contract.parent.source_unit_name: [] for contract in sources}
+    for _ in range(count):
+        source, target = rng.choice(sources), rng.choice(targets)
+        edges[source.parent.source_unit_name].append(
+            (f"{source.parent.source_unit_name}:{source.name}", f"{target.parent.source_unit_name}:{target.name}", 1, 1, [])
+        )
+    return edges
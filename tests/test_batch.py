@@ -0,0 +1,95 @@
+import os
+from pathlib import Path
+
+import pytest
+
+from printers.batch import (
+    STATUS_FAILED,
+    STATUS_OK,
+    BatchTask,
+    ProjectResult,
+    configure_worker,
+    limited_memory,
+    project_out,
+    read_project_list,
+    run_batch,
+    summarize,
+)
+
+
+def _limit_only(printer: str, memory_limit):
+    configure_worker(memory_limit)
+
+
+def _analyse(task: BatchTask) -> ProjectResult:
+    import resource
+
+    import printers.batch
+
+    if task.root.name == "broken":
+        raise ValueError("broken project")
+    unlimited = resource.getrlimit(resource.RLIMIT_AS)[0]
+    with limited_memory(printers.batch._memory_limit):
+        limit = resource.getrlimit(resource.RLIMIT_AS)[0]
+    # lifted again for the compilation of the next project
+    assert resource.getrlimit(resource.RLIMIT_AS)[0] == unlimited
+    # the worker pid and its limit stand in for a profile
+    return ProjectResult(str(task.root), STATUS_OK, 0.5, 1, {"counters": {"pid": os.getpid(), "limit": limit}}, None)
+
+
+def _tasks(tmp_path: Path, names):
+    return [BatchTask(tmp_path / name, "contract-cross-reference-graph", (), tmp_path / "out" / name, False) for name in names]
+
+
+def test_read_project_list(tmp_path: Path):
+    (tmp_path / "repos.txt").write_text("# nightly\na\n\n  b  # fork of a\n/abs/c\n")
+    assert read_project_list(tmp_path / "repos.txt") == [tmp_path / "a", tmp_path / "b", Path("/abs/c")]
+
+
+def test_project_out(tmp_path: Path):
+    first = project_out(tmp_path, Path("/repos/x/contracts"))
+    assert first.name.startswith("contracts-")
+    assert first == project_out(tmp_path, Path("/repos/x/contracts"))
+    assert first != project_out(tmp_path, Path("/repos/y/contracts"))
+
+
+def test_run_batch(tmp_path: Path):
+    pytest.importorskip("resource")
+    tasks = _tasks(tmp_path, ["p0", "broken", "p2", "p3"])
+    results = run_batch(tasks, 2, 8 * 2**30, 1, analyse=_analyse, initializer=_limit_only)
+
+    assert [result.root for result in results] == [str(task.root) for task in tasks]
+    assert [result.status for result in results] == [STATUS_OK, STATUS_FAILED, STATUS_OK, STATUS_OK]
+    assert results[1].error == "ValueError: broken project"
+    ok = [result for result in results if result.status == STATUS_OK]
+    assert all(result.profile["counters"]["limit"] == 8 * 2**30 for result in ok)
+    # every worker is replaced after one project
+    assert len({result.profile["counters"]["pid"] for result in ok}) == 3
+
+
+def test_summarize():
+    results = [
+        ProjectResult("/a", STATUS_OK, 1.25, 100, {"counters": {"contracts": 3, "edges in graph": 2}}, None),
+        ProjectResult("/b", STATUS_OK, 2.0, 300, {"counters": {"contracts": 4}}, None),
+        ProjectResult("/c", STATUS_FAILED, 0.5, None, None, "ValueError: broken"),
+    ]
+    summary = summarize(results)
+
+    assert summary["projects"] == 3
+    assert summary["statuses"] == {STATUS_OK: 2, STATUS_FAILED: 1}
+    assert summary["seconds"] == 3.75
+    assert summary["max_peak_rss"] == 300
+    assert summary["counters"] == {"contracts": 7, "edges in graph": 2}
+    assert summary["results"][2]["error"] == "ValueError: broken"
+
+
+def test_run_batch_without_max_tasks_per_child(tmp_path: Path, monkeypatch):
+    # Python < 3.11: one fresh pool per chunk of projects_per_worker * jobs tasks
+    monkeypatch.setattr("printers.batch._RECYCLES_WORKERS", False)
+    tasks = _tasks(tmp_path, [f"p{i}" for i in range(5)])
+    results = run_batch(tasks, 2, None, 1, analyse=_analyse, initializer=_limit_only)
+
+    assert [result.root for result in results] == [str(task.root) for task in tasks]
+    assert all(result.status == STATUS_OK for result in results)
+    # 3 pools of at most 2 workers, no worker is reused across pools
+    assert len({result.profile["counters"]["pid"] for result in results}) >= 3
@@ -0,0 +1,89 @@
+"""
+End-to-end benchmarks of both printers on generated projects, compiled by wake.
+They need solc and take minutes, so they only run with CORPUS_BENCHMARK=1.
+"""
+import json
+import os
+import re
+import shutil
+import subprocess
+from pathlib import Path
+from typing import Dict
+
+import pytest
+
+from benchmarks.corpus import CorpusParameters, generate_corpus
+
+pytestmark = pytest.mark.skipif(
+    os.environ.get("CORPUS_BENCHMARK") != "1", reason="set CORPUS_BENCHMARK=1 to run end-to-end benchmarks"
+)
+
+PRINTERS = Path(__file__).parent.parent / "printers"
+SIZES = (100, 400, 1_600)
+# allowed growth of a phase relative to the growth of the corpus, anything worse than n log n fails
+GROWTH_FACTOR = 3.0
+# phases faster than this are dominated by noise
+MIN_PHASE_SECONDS = 0.02
+
+
+def _project(tmp_path: Path, contracts: int) -> Path:
+    project = tmp_path / f"project-{contracts}"
+    if not project.exists():
+        # the same seed generates the same first contracts for every size
+        generate_corpus(project, CorpusParameters(contracts=contracts, contracts_per_file=4))
+        shutil.copytree(PRINTERS, project / "printers", ignore=shutil.ignore_patterns("__pycache__"))
+    return project
+
+
+def _profile(project: Path, command: str, *args: str) -> Dict[str, float]:
+    profile = project / "profile.json"
+    subprocess.run(
+        ["wake", "print", command, "--no-cache", "--profile-json", str(profile), *args],
+        cwd=project,
+        input="y\n",  # trust the copied printers
+        text=True,
+        check=True,
+        capture_output=True,
+    )
+    report = json.loads(profile.read_text())
+    print(f"{command} {project.name}: {report}")
+    return report["phases"]
+
+
+def _assert_scaling(profiles: Dict[int, Dict[str, float]]) -> None:
+    sizes = sorted(profiles)
+    for small, large in zip(sizes, sizes[1:]):
+        for phase, seconds in profiles[large].items():
+            baseline = max(profiles[small].get(phase, 0.0), MIN_PHASE_SECONDS)
+            assert seconds / baseline <= GROWTH_FACTOR * large / small, (
+                f"phase {phase} grew from {baseline:.3f} s to {seconds:.3f} s between {small} and {large} contracts"
+            )
+
+
+def test_tree_printer_scaling(tmp_path: Path):
+    _assert_scaling({n: _profile(_project(tmp_path, n), "contract-cross-reference") for n in SIZES})
+
+
+@pytest.mark.parametrize("args", [(), ("--inherit", "--kind", "contract", "--kind", "abstract"), ("--format", "csr")])
+def test_graph_printer_scaling(tmp_path: Path, args):
+    _assert_scaling(
+        {
+            n: _profile(_project(tmp_path, n), "contract-cross-reference-graph", "-f", "-o", str(tmp_path / f"out-{n}"), *args)
+            for n in SIZES
+        }
+    )
+
+
+def test_graph_printer_named_lazy(tmp_path: Path):
+    # a single named contract must not get much slower with the size of the project
+    name = re.search(r"^contract (C\d+)", (_project(tmp_path, SIZES[0]) / "src" / "F0.sol").read_text(), re.M)
+    assert name is not None
+    profiles = {
+        n: _profile(
+            _project(tmp_path, n), "contract-cross-reference-graph", "-f", "-o", str(tmp_path / f"out-{n}"), "--name", name.group(1)
+        )
+        for n in SIZES
+    }
+    for phase, seconds in profiles[SIZES[-1]].items():
+        if phase != "visit":
+            assert seconds <= max(profiles[SIZES[0]].get(phase, 0.0), MIN_PHASE_SECONDS) * GROWTH_FACTOR * 4
@@ -0,0 +1,90 @@
+import os
+import random
+import time
+from typing import List, Tuple
+
+import pytest
+
+from printers.contract_cross_reference import build_trees, line_numbers, plain_lines, transitive_adjacency
+from printers.reference_graph import ReferenceGraph, ReferenceKind
+
+from .fakes import Contract
+
+
+def _synthetic_graph(n: int, fan_out: int = 5, seed: int = 0) -> Tuple[ReferenceGraph, List[Tuple[str, str]]]:
+    rng = random.Random(seed)
+    graph = ReferenceGraph()
+    nodes = []
+    for i in range(n):
+        graph.add_node(Contract(f"src/C{i}.sol", f"C{i}"))
+        nodes.append((f"C{i}", f"file:///src/C{i}.sol"))
+    for i in range(n):
+        for _ in range(fan_out):
+            graph.add_edge(i, rng.randrange(n), ReferenceKind.IDENTIFIER)
+    return graph, nodes
+
+
+def _render(graph: ReferenceGraph, nodes) -> float:
+    start = time.perf_counter()
+    referring, referrers = graph.adjacency()
+    for _ in build_trees(nodes, referring):
+        pass
+    for _ in build_trees(nodes, referrers):
+        pass
+    return time.perf_counter() - start
+
+
+def test_trees():
+    graph = ReferenceGraph()
+    for name in "ABC":
+        graph.add_node(Contract("a.sol", name))
+    graph.add_edge(0, 1, ReferenceKind.IDENTIFIER)
+    graph.add_edge(0, 2, ReferenceKind.IDENTIFIER_PATH_PART)
+    graph.add_edge(2, 1, ReferenceKind.MEMBER_ACCESS)
+    nodes = [(name, name.lower()) for name in graph.names]
+
+    referring, referrers = graph.adjacency(~ReferenceKind.MEMBER_ACCESS & ReferenceKind.ALL)
+    assert referring == [[1, 2], [], []]
+    assert referrers == [[], [0], [0]]
+
+    referring, referrers = graph.adjacency()
+    trees = list(build_trees(nodes, referrers))
+    assert [child.label for child in trees[1].children] == [
+        "[link=a]A[/link]",
+        "[link=c]C[/link]",
+    ]
+
+
+def test_selected_plain_lines():
+    graph = ReferenceGraph()
+    for name in "ABCD":
+        graph.add_node(Contract("a.sol", name))
+    graph.add_edge(0, 1, ReferenceKind.IDENTIFIER)
+    graph.add_edge(1, 2, ReferenceKind.IDENTIFIER)
+    referring, _ = graph.adjacency()
+    # only the selected contracts and their adjacent contracts need labels
+    nodes = {0: ("A", "a"), 1: ("B", "b"), 2: ("C", "c")}
+
+    assert "".join(plain_lines(nodes, referring, [1])) == "B\tb\n\tC\tc\n"
+    trees = list(build_trees(nodes, referring, [0, 1]))
+    assert [tree.label for tree in trees] == ["[link=a]A[/link]", "[link=b]B[/link]"]
+
+    assert transitive_adjacency(referring, selected=[0]) == [[1, 2], [], [], []]
+    assert transitive_adjacency(referring, 1, [0, 1]) == [[1], [2], [], []]
+
+
+@pytest.mark.skipif(
+    os.environ.get("CORPUS_BENCHMARK") != "1", reason="set CORPUS_BENCHMARK=1 to run timing benchmarks"
+)
+def test_render_scales_linearly():
+    small = min(_render(*_synthetic_graph(2_000)) for _ in range(3))
+    large = min(_render(*_synthetic_graph(8_000)) for _ in range(3))
+    print(f"2,000 contracts: {small * 1000:.1f} ms, 8,000 contracts: {large * 1000:.1f} ms")
+    # 4x the contracts and edges; a quadratic scan would be ~16x slower
+    assert large < small * 10
+
+
+def test_line_numbers():
+    source = b"a\nbb\n\nccc"
+    newlines = [i for i, c in enumerate(source) if c == ord("\n")]
+    assert line_numbers(newlines, [0, 1, 2, 4, 5, 6, 8]) == [1, 1, 2, 2, 3, 4, 4]
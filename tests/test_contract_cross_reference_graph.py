@@ -0,0 +1,96 @@
+from pathlib import Path
+
+from printers.contract_cross_reference_graph import ContractCrossReferenceGraphPrinter
+from printers.export import ExportGraph, export_graph
+from printers.name_index import NameIndex
+from printers.profiling import Profiler
+from printers.reference_graph import ReferenceGraph, ReferenceKind
+
+from .fakes import Contract, SourceUnit
+
+
+def _printer(tmp_path: Path, **options) -> ContractCrossReferenceGraphPrinter:
+    units = {name: SourceUnit(name) for name in ["src/a/A.sol", "src/a/B.sol", "src/c/C.sol"]}
+    graph = ReferenceGraph()
+    for source_unit_name, name in [("src/a/A.sol", "A1"), ("src/a/A.sol", "A2"), ("src/a/B.sol", "B"), ("src/c/C.sol", "C")]:
+        graph.add_node(Contract(units[source_unit_name], name))
+    # A1 -> A2, A1 -> B, A2 -> B, B -> C, C -> A1
+    for source, target in [(0, 1), (0, 2), (1, 2), (2, 3), (3, 0)]:
+        graph.add_edge(source, target, ReferenceKind.IDENTIFIER)
+    rows = [sum(1 << t for t in targets) for targets in graph.referring]
+    reverse = [sum(1 << s for s in sources) for sources in graph.referrers]
+
+    printer = ContractCrossReferenceGraphPrinter()
+    printer._graph = graph
+    printer._out = tmp_path
+    printer._direction = "TB"
+    printer._names = ()
+    printer._referrer = True
+    printer._referring = True
+    printer._cluster_by = None
+    printer._collapse = False
+    printer._force = False
+    printer._referring_mask = rows.__getitem__
+    printer._referrers_mask = reverse.__getitem__
+    printer.generate_link = lambda contract: f"file:///{contract.parent.source_unit_name}"
+    for option, value in options.items():
+        setattr(printer, f"_{option}", value)
+    printer._named, _ = NameIndex(graph).select_all(printer._names)
+    return printer
+
+
+def _print(printer: ContractCrossReferenceGraphPrinter, tmp_path: Path) -> str:
+    nodes = list(range(len(printer._graph)))
+    referrers = lambda node: (n for n in range(4) if printer._referrers_mask(node) >> n & 1)
+    referring = lambda node: (n for n in range(4) if printer._referring_mask(node) >> n & 1)
+    p = tmp_path / "graph.dot"
+    printer._print_clustered(p, nodes, referrers, referring)
+    return p.read_text()
+
+
+def test_cluster_by_directory(tmp_path: Path):
+    dot = _print(_printer(tmp_path, cluster_by="directory"), tmp_path)
+    assert dot.count("subgraph cluster_") == 2
+    assert 'label="src/a"' in dot and 'label="src/c"' in dot
+    a_cluster = dot[dot.index('label="src/a"') : dot.index('label="src/c"')]
+    assert all(name in a_cluster for name in ["A1", "A2", '"src/a/B.sol_B"'])
+    assert dot.count(" -> ") == 5
+
+
+def test_collapse(tmp_path: Path):
+    dot = _print(_printer(tmp_path, cluster_by="source-unit", collapse=True), tmp_path)
+    assert '"src/a/A.sol" [label="src/a/A.sol\\n2 contracts"]' in dot
+    # A1 -> B and A2 -> B are aggregated, A1 -> A2 stays inside its cluster
+    assert '"src/a/A.sol" -> "src/a/B.sol" [label=2]' in dot
+    assert '"src/c/C.sol" -> "src/a/A.sol" [label=1]' in dot
+    assert dot.count(" -> ") == 3
+
+
+def test_collapse_named(tmp_path: Path):
+    dot = _print(_printer(tmp_path, cluster_by="directory", collapse=True, names=("B",)), tmp_path)
+    # B with its referrers A1, A2 and the referred C
+    assert '"src/a" [label="src/a\\n3 contracts" style=filled]' in dot
+    assert '"src/a" -> "src/c" [label=1]' in dot
+    assert dot.count(" -> ") == 1
+
+
+def test_diff_base(tmp_path: Path, capsys):
+    base = tmp_path / "base.jsonl"
+    base_printer = _printer(tmp_path, links=False)
+    head = base_printer._export_graph(0b1111)
+    # the base had no C -> A1 reference
+    c_row = head.referring[3].index(0)
+    base_graph = ExportGraph(
+        head.nodes,
+        head.referring[:3] + [head.referring[3][:c_row] + head.referring[3][c_row + 1 :]],
+        head.edge_kinds[:3] + [head.edge_kinds[3][:c_row] + head.edge_kinds[3][c_row + 1 :]],
+        head.edge_counts[:3] + [head.edge_counts[3][:c_row] + head.edge_counts[3][c_row + 1 :]],
+    )
+    export_graph(base_graph, base, "jsonl")
+
+    printer = _printer(tmp_path, links=False, diff_base=base, diff_format="text", profiler=Profiler(False))
+    assert printer._print_diff(printer._export_graph(0b1111)) == []
+    assert capsys.readouterr().out.startswith("+ src/c/C.sol:C -> src/a/A.sol:A1 (1 references")
+
+    printer._diff_format = "dot"
+    assert printer._print_diff(printer._export_graph(0b1111)) == [tmp_path / "contract-cross-reference-diff.dot"]
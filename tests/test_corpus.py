@@ -0,0 +1,63 @@
+import re
+from pathlib import Path
+
+import pytest
+
+from benchmarks.corpus import IMPORT_TOPOLOGIES, CorpusParameters, generate_corpus
+
+
+def _declarations(files):
+    declared = {}
+    for path in files:
+        for match in re.finditer(r"^(?:abstract contract|contract|interface|library) (\w+)(?: is ([\w, ]+))?", path.read_text(), re.M):
+            declared[match.group(1)] = (path.name, match.group(2).split(", ") if match.group(2) else [])
+    return declared
+
+
+@pytest.mark.parametrize("topology", IMPORT_TOPOLOGIES)
+def test_corpus(tmp_path: Path, topology: str):
+    parameters = CorpusParameters(contracts=200, contracts_per_file=3, import_topology=topology, seed=1)
+    files = generate_corpus(tmp_path / "a", parameters)
+    assert [p.read_text() for p in files] == [p.read_text() for p in generate_corpus(tmp_path / "b", parameters)]
+
+    declared = _declarations(files)
+    assert len(declared) == 200
+    for name, (file, bases) in declared.items():
+        # bases are declared earlier and listed from the most base-like one
+        indices = [int(base[1:]) for base in bases]
+        assert indices == sorted(indices) and all(index < int(name[1:]) for index in indices)
+        assert len(bases) <= parameters.inheritance_fan_out
+
+    names = {p.name for p in files}
+    for path in files:
+        for imported in re.findall(r'^import "\./(.+)";', path.read_text(), re.M):
+            assert imported in names
+
+    if topology == "direct":
+        for path in files:
+            text = path.read_text()
+            imported = set(re.findall(r'^import "\./(.+)";', text, re.M)) | {path.name}
+            for used in re.findall(r"\b([CIAL]\d+)\b", text):
+                assert declared[used][0] in imported
+
+
+def test_corpus_mix(tmp_path: Path):
+    files = generate_corpus(tmp_path, CorpusParameters(contracts=2_000, interface_ratio=0.5, abstract_ratio=0.2, library_ratio=0.1))
+    text = "".join(p.read_text() for p in files)
+    assert 900 < text.count("\ninterface ") < 1_100
+    assert 300 < text.count("\nabstract contract ") < 500
+    assert 150 < text.count("\nlibrary ") < 250
+
+
+def test_corpus_call_and_cast_density(tmp_path: Path):
+    parameters = CorpusParameters(contracts=300, interface_ratio=0.5, library_ratio=0.0, calls_per_contract=2, casts_per_contract=3)
+    text = "".join(p.read_text() for p in generate_corpus(tmp_path, parameters))
+    implementations = len(re.findall(r"^(?:abstract contract|contract) ", text, re.M))
+    # the first contract has nothing to cast to
+    casts = re.findall(r"^        (\w+) t = (\w+)\(target\);$", text, re.M)
+    assert 3 * (implementations - 1) <= len(casts) <= 3 * implementations
+    assert all(variable_type == cast for variable_type, cast in casts)
+    assert len(re.findall(r"\(target\)\.f\d+\(x\)", text)) <= 2 * implementations
+
+    text = "".join(p.read_text() for p in generate_corpus(tmp_path / "none", parameters._replace(casts_per_contract=0)))
+    assert " t = " not in text
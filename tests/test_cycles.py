@@ -0,0 +1,56 @@
+from wake.ir.enums import ContractKind
+
+from printers.cycles import Condensation
+from printers.reference_graph import ReferenceGraph, ReferenceKind
+
+from . import fakes
+
+
+def _graph(n: int, edges, kind=ReferenceKind.IDENTIFIER | ReferenceKind.CAST) -> ReferenceGraph:
+    contracts = [
+        fakes.Contract(f"C{i}.sol", f"C{i}", kind=ContractKind.INTERFACE if i == n - 1 else ContractKind.CONTRACT)
+        for i in range(n)
+    ]
+    return fakes.graph(contracts, edges, kind)
+
+
+def test_cycles_and_condensed_dag():
+    # 0 <-> 1, 1 -> 2 -> 3 -> 1, 3 -> 4, 4 -> 4, 5 -> 0
+    graph = _graph(6, [(0, 1, 2), (1, 0, 1), (1, 2, 1), (2, 3, 1), (3, 1, 1), (3, 4, 3), (4, 4, 5), (5, 0, 1), (5, 1, 2)])
+    condensation = Condensation(graph)
+
+    assert [condensation.components[c] for c in condensation.cycles()] == [[0, 1, 2, 3]]
+    cycle = condensation.cycles()[0]
+    assert condensation.witness(cycle) == [0, 1, 0]
+    assert condensation.internal_edges(cycle) == [(0, 1), (1, 0), (1, 2), (2, 3), (3, 1)]
+
+    component_of = condensation.component_of
+    assert condensation.successors[component_of[5]] == {cycle: 3}
+    assert condensation.successors[cycle] == {component_of[4]: 3}
+    # reverse topological order
+    assert component_of[4] < cycle < component_of[5]
+
+
+def test_filters():
+    graph = _graph(4, [(0, 1, 1), (1, 2, 1), (2, 0, 1), (2, 3, 1), (3, 2, 1)])
+    graph.add_edge(1, 0, ReferenceKind.IDENTIFIER | ReferenceKind.TYPE_USE, 1)
+
+    condensation = Condensation(graph, mask=graph.node_mask(["contract"]))
+    assert [condensation.components[c] for c in condensation.cycles()] == [[0, 1, 2]]
+    assert condensation.witness(condensation.cycles()[0]) == [0, 1, 0]
+    assert 3 not in condensation.component_of
+
+    condensation = Condensation(graph, ReferenceKind.CAST, graph.node_mask(["contract"]))
+    assert condensation.witness(condensation.cycles()[0]) == [0, 1, 2, 0]
+    assert Condensation(graph, ReferenceKind.TYPE_USE).cycles() == []
+
+
+def test_large_ring():
+    n = 50_000
+    graph = _graph(n, [(i, (i + 1) % n, 1) for i in range(n)] + [(i, i + 2, 1) for i in range(0, n - 2, 7)])
+    condensation = Condensation(graph)
+
+    assert len(condensation.cycles()) == 1
+    witness = condensation.witness(condensation.cycles()[0])
+    assert witness[0] == witness[-1] == 0
+    assert len(witness) < n
@@ -0,0 +1,90 @@
+from pathlib import Path
+
+import pytest
+
+from printers.dot import DotGraph, DotNode, DotWriter, save_dots
+
+
+def _graphs(out: Path):
+    graphs = []
+    for i in range(20):
+        nodes = [DotNode(f"src_C{i}", f"C{i}", f"file:///src/C{i}.sol", True)]
+        edges = []
+        for j in range(i % 4):
+            nodes.append(DotNode(f"src_D{j}", f"D{j}", f"file:///src/D{j}.sol", False))
+            edges.append((f"src_C{i}", f"src_D{j}"))
+        graphs.append(DotGraph(out / f"C{i}.dot", "TB", nodes, edges))
+    return graphs
+
+
+def test_save_dots_jobs_deterministic(tmp_path: Path):
+    sequential = tmp_path / "sequential"
+    parallel = tmp_path / "parallel"
+    sequential.mkdir()
+    parallel.mkdir()
+
+    save_dots(_graphs(sequential), 1)
+    save_dots(_graphs(parallel), 3)
+
+    names = sorted(p.name for p in sequential.iterdir())
+    assert names == sorted(p.name for p in parallel.iterdir())
+    assert len(names) == 20
+    for name in names:
+        assert (sequential / name).read_text() == (parallel / name).read_text()
+
+
+def test_dot_writer_matches_graphviz(tmp_path: Path):
+    gv = pytest.importorskip("graphviz")
+
+    nodes = [
+        DotNode("src/A.sol_A", "A", "file:///src/A.sol#L1", True),
+        DotNode("B_B", "B", "", False),
+        DotNode("strict", 'q"uote', "file:///a b.sol", False),
+    ]
+    edges = [("src/A.sol_A", "B_B"), ("B_B", "strict"), ("strict", "src/A.sol_A")]
+
+    g = gv.Digraph("Contract cross reference")
+    g.attr(rankdir="LR")
+    g.attr("node", shape="box")
+    for node in nodes:
+        if node.filled:
+            g.node(node.id, node.label, URL=node.url, style="filled")
+        else:
+            g.node(node.id, node.label, URL=node.url)
+    for from_, to in edges:
+        g.edge(from_, to)
+
+    p = tmp_path / "graph.dot"
+    with DotWriter(p, "LR") as writer:
+        for node in nodes:
+            writer.node(*node)
+        for from_, to in edges:
+            writer.edge(from_, to)
+    assert p.read_text() == g.source
+
+
+def test_unchanged_dot_files_are_not_rewritten(tmp_path: Path):
+    graphs = _graphs(tmp_path)
+    assert save_dots(graphs, 1) == 20
+    mtimes = {p: p.stat().st_mtime_ns for p in tmp_path.iterdir()}
+
+    changed = graphs[3]._replace(edges=[])
+    graphs[3] = changed
+    assert save_dots(graphs, 2) == 1
+    assert {p: p.stat().st_mtime_ns for p in tmp_path.iterdir() if p != changed.path} == {
+        p: mtime for p, mtime in mtimes.items() if p != changed.path
+    }
+    assert "->" not in changed.path.read_text()
+    assert save_dots(graphs, 1, force=True) == 20
+    assert not any(p.name.endswith(".tmp") for p in tmp_path.iterdir())
+
+
+def test_dot_writer_keeps_previous_file_on_error(tmp_path: Path):
+    p = tmp_path / "graph.dot"
+    p.write_text("previous")
+    with pytest.raises(RuntimeError):
+        with DotWriter(p, "TB") as writer:
+            writer.node("A", "A", None)
+            raise RuntimeError
+    assert p.read_text() == "previous"
+    assert list(tmp_path.iterdir()) == [p]
@@ -0,0 +1,50 @@
+import json
+from pathlib import Path
+
+import pytest
+
+from printers.export import ExportGraph, ExportNode, export_graph, read_csr
+
+
+def _graph() -> ExportGraph:
+    nodes = [
+        ExportNode(f"src/C{i}.sol:C{i}", f"C{i}", f"src/C{i}.sol", "contract", f"file:///src/C{i}.sol")
+        for i in range(4)
+    ]
+    return ExportGraph(nodes, [[1, 2], [], [0, 3], [3]], [[1, 2], [], [4, 0], [1]], [[3, 1], [], [2, 0], [1]])
+
+
+def test_jsonl(tmp_path: Path):
+    p = tmp_path / "graph.jsonl"
+    export_graph(_graph(), p, "jsonl")
+    lines = [json.loads(line) for line in p.read_text().splitlines()]
+
+    assert [line["key"] for line in lines if line["type"] == "node"] == [f"src/C{i}.sol:C{i}" for i in range(4)]
+    assert [
+        (line["source"], line["target"], line["kind"], line["references"]) for line in lines if line["type"] == "edge"
+    ] == [(0, 1, 1, 3), (0, 2, 2, 1), (2, 0, 4, 2), (2, 3, 0, 0), (3, 3, 1, 1)]
+
+
+def test_csr_round_trip(tmp_path: Path):
+    graph = _graph()
+    p = tmp_path / "graph.csr"
+    export_graph(graph, p, "csr")
+    nodes, offsets, targets, counts, kinds = read_csr(p)
+
+    assert nodes == graph.nodes
+    assert list(offsets) == [0, 2, 2, 4, 5]
+    assert list(targets) == [1, 2, 0, 3, 3]
+    assert list(counts) == [3, 1, 2, 0, 1]
+    assert list(kinds) == [1, 2, 4, 0, 1]
+
+
+def test_graphml(tmp_path: Path):
+    nx = pytest.importorskip("networkx")
+    p = tmp_path / "graph.graphml"
+    export_graph(_graph(), p, "graphml")
+    g = nx.read_graphml(p, node_type=int)
+
+    assert g.nodes[2]["key"] == "src/C2.sol:C2"
+    assert sorted(g.edges) == [(0, 1), (0, 2), (2, 0), (2, 3), (3, 3)]
+    assert g.edges[2, 0]["kind"] == 4
+    assert g.edges[2, 0]["references"] == 2
@@ -0,0 +1,97 @@
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+from printers.export import ExportGraph, ExportNode, export_graph, load_graph
+from printers.graph_diff import diff_graphs, diff_json, diff_text, write_diff_dot
+
+
+def _node(name: str) -> ExportNode:
+    return ExportNode(f"src/{name}.sol:{name}", name, f"src/{name}.sol", "contract", "")
+
+
+def _graphs():
+    # base: A -> B, B -> C; head: C renumbered first, A -> B gone, A -> D and D -> C added
+    base = ExportGraph([_node("A"), _node("B"), _node("C")], [[1], [2], []], [[9], [16], []], [[2], [1], []])
+    head = ExportGraph(
+        [_node("C"), _node("B"), _node("A"), _node("D")], [[], [0], [3], [0]], [[], [16], [32], [16]], [[], [1], [1], [4]]
+    )
+    return base, head
+
+
+def test_diff_uses_keys_not_ids():
+    diff = diff_graphs(*_graphs())
+
+    assert [node.name for node in diff.added_nodes] == ["D"]
+    assert diff.removed_nodes == []
+    assert [(edge.source, edge.target) for edge in diff.added_edges] == [
+        ("src/A.sol:A", "src/D.sol:D"),
+        ("src/D.sol:D", "src/C.sol:C"),
+    ]
+    assert [(edge.source, edge.target, edge.references) for edge in diff.removed_edges] == [
+        ("src/A.sol:A", "src/B.sol:B", 2)
+    ]
+    assert [node.name for node in diff.unchanged_nodes] == ["A", "B", "C"]
+    assert diff
+
+
+def test_no_changes():
+    base, _ = _graphs()
+    diff = diff_graphs(base, base)
+
+    assert not diff
+    assert diff_text(diff) == ""
+
+
+def test_text_and_json():
+    diff = diff_graphs(*_graphs())
+
+    assert diff_text(diff).splitlines() == [
+        "+ src/D.sol:D",
+        "+ src/A.sol:A -> src/D.sol:D (1 references: external-call)",
+        "+ src/D.sol:D -> src/C.sol:C (4 references: type-use)",
+        "- src/A.sol:A -> src/B.sol:B (2 references: inheritance)",
+    ]
+    data = json.loads(diff_json(diff))
+    assert data["added_nodes"][0]["key"] == "src/D.sol:D"
+    assert data["removed_edges"] == [{"source": "src/A.sol:A", "target": "src/B.sol:B", "kind": 9, "references": 2}]
+
+
+def test_dot(tmp_path: Path):
+    p = tmp_path / "diff.dot"
+    write_diff_dot(diff_graphs(*_graphs()), p)
+    dot = p.read_text()
+
+    assert '"src/D.sol:D" [label=D color=darkgreen fontcolor=darkgreen]' in dot
+    assert '"src/A.sol:A" [label=A]' in dot
+    assert '"src/A.sol:A" -> "src/B.sol:B" [color=red style=dashed]' in dot
+    assert dot.count(" -> ") == 3
+
+
+@pytest.mark.parametrize("format", ["jsonl", "csr", "graphml"])
+def test_load_graph_round_trip(tmp_path: Path, format: str):
+    if format == "graphml":
+        pytest.importorskip("networkx")
+    _, head = _graphs()
+    p = tmp_path / f"head.{format}"
+    export_graph(head, p, format)
+
+    assert load_graph(p) == head
+
+
+def test_script(tmp_path: Path):
+    base, head = _graphs()
+    export_graph(base, tmp_path / "base.csr", "csr")
+    export_graph(head, tmp_path / "head.jsonl", "jsonl")
+
+    result = subprocess.run(
+        [sys.executable, "-m", "printers.graph_diff", str(tmp_path / "base.csr"), str(tmp_path / "head.jsonl"), "--exit-code"],
+        cwd=Path(__file__).parent.parent,
+        capture_output=True,
+        text=True,
+    )
+    assert result.returncode == 1
+    assert result.stdout.splitlines()[0] == "+ src/D.sol:D"
@@ -0,0 +1,86 @@
+import subprocess
+import sys
+from pathlib import Path
+
+from printers.import_graph import ImportGraph
+
+from .fakes import Contract, ImportDirective, SourceUnit
+
+
+def _project(root: Path):
+    # d.sol only re-exports c.sol, a.sol and b.sol import each other, B2 is C
+    c = SourceUnit("c.sol", root=root)
+    base = Contract(c, "C")
+    d = SourceUnit("d.sol", imports=[c], root=root)
+    b = SourceUnit("b.sol", imports=[d], root=root)
+    Contract(b, "B1")
+    Contract(b, "B2", [base])
+    a = SourceUnit("a.sol", imports=[b], root=root)
+    Contract(a, "A")
+    b.imports.append(ImportDirective(a))
+    e = SourceUnit("e.sol", imports=[c], root=root)
+    Contract(e, "E")
+    return [a, e]
+
+
+def test_affected_contracts(tmp_path: Path):
+    graph = ImportGraph.from_source_units(_project(tmp_path))
+    assert graph.source_unit_names == ["a.sol", "b.sol", "c.sol", "d.sol", "e.sol"]
+    assert graph.imports == [[1], [0, 3], [], [2], [2]]
+    assert graph.importers == [[1], [0], [3, 4], [1], []]
+
+    assert graph.derived == {"c.sol:C": ["b.sol:B2"]}
+
+    # without reference analysis every contract e.sol can refer to may gain or lose it as a referrer
+    assert graph.affected_contracts(["e.sol"]) == (["b.sol:B2", "c.sol:C", "e.sol:E"], [])
+    assert graph.affected_contracts(["a.sol"]) == (["a.sol:A", "b.sol:B1", "b.sol:B2", "c.sol:C"], [])
+    assert graph.affected_contracts([str(tmp_path / "d.sol"), "x.sol"]) == (
+        ["a.sol:A", "b.sol:B1", "b.sol:B2", "c.sol:C"],
+        ["x.sol"],
+    )
+    assert graph.affected_contracts(["c.sol"])[0] == ["a.sol:A", "b.sol:B1", "b.sol:B2", "c.sol:C", "e.sol:E"]
+
+
+def test_affected_contracts_referenced(tmp_path: Path):
+    graph = ImportGraph.from_source_units(_project(tmp_path))
+    requested = []
+
+    def referenced(source_unit_names):
+        requested.append(sorted(source_unit_names))
+        return {"a.sol": {"b.sol:B1"}, "b.sol": set(), "d.sol": set(), "e.sol": {"c.sol:C"}}
+
+    # E refers to C and so to B2 derived from it
+    assert graph.affected_contracts(["e.sol"], referenced) == (["b.sol:B2", "c.sol:C", "e.sol:E"], [])
+    assert graph.affected_contracts(["a.sol"], referenced) == (["a.sol:A", "b.sol:B1", "b.sol:B2"], [])
+    assert requested == [["e.sol"], ["a.sol", "b.sol"]]
+    # c.sol is not known to the analysis, its import closure is taken instead
+    assert graph.affected_contracts(["c.sol"], referenced)[0] == [
+        "a.sol:A",
+        "b.sol:B1",
+        "b.sol:B2",
+        "c.sol:C",
+        "e.sol:E",
+    ]
+
+
+def test_save_and_query_without_wake(tmp_path: Path):
+    graph = ImportGraph.from_source_units(_project(tmp_path))
+    path = tmp_path / "import-graph.json"
+    graph.save(path)
+    mtime = path.stat().st_mtime_ns
+    ImportGraph.from_source_units(_project(tmp_path)).save(path)
+    assert path.stat().st_mtime_ns == mtime
+
+    loaded = ImportGraph.load(path)
+    assert loaded.importers == graph.importers
+    assert loaded.affected_contracts(["c.sol"]) == graph.affected_contracts(["c.sol"])
+
+    script = Path(__file__).parent.parent / "printers" / "import_graph.py"
+    result = subprocess.run(
+        [sys.executable, str(script), "--graph", str(path), "e.sol", "x.sol"],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    assert result.stdout == "b.sol:B2\nc.sol:C\ne.sol:E\n"
+    assert "x.sol" in result.stderr
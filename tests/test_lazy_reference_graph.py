@@ -0,0 +1,46 @@
+import random
+
+from printers.lazy_reference_graph import LazyReferenceGraph
+from printers.reachability import ReachabilityIndex
+from printers.reference_graph import InheritedReferenceGraph, ReferenceGraphBuilder
+
+from .fakes import ImportDirective, hierarchy, random_edges
+
+
+def _project(n: int, seed: int):
+    rng = random.Random(seed)
+    contracts = hierarchy(n, seed)
+    edges = random_edges(contracts, contracts, rng, n * 2)
+    by_name = {contract.parent.source_unit_name: contract.parent for contract in contracts}
+    # a reference needs the declaration to be imported, bases are imported as well
+    for contract in contracts:
+        for base in contract.base_contracts:
+            contract.parent.imports.append(ImportDirective(base.parent))
+    for source_unit_name, unit_edges in edges.items():
+        for _, target, *_ in unit_edges:
+            by_name[source_unit_name].imports.append(ImportDirective(by_name[target.split(":")[0]]))
+    return contracts, edges
+
+
+def test_lazy_matches_inherited(monkeypatch):
+    contracts, edges = _project(80, 4)
+    analysed = []
+
+    def analyse_source_unit(self, source_unit):
+        analysed.append(source_unit.source_unit_name)
+        return edges[source_unit.source_unit_name]
+
+    monkeypatch.setattr(ReferenceGraphBuilder, "analyse_source_unit", analyse_source_unit)
+    inherited = InheritedReferenceGraph(ReferenceGraphBuilder(False).build(contracts))
+    referring_index = ReachabilityIndex(inherited.referring)
+    referrers_index = ReachabilityIndex(inherited.referrers)
+
+    for node in range(0, 80, 7):
+        analysed.clear()
+        lazy = LazyReferenceGraph(contracts, ReferenceGraphBuilder(False))
+        assert lazy.referring(node) == inherited.referring[node]
+        assert len(analysed) == len(contracts[node].linearized_base_contracts)
+        assert lazy.referrers(node) == inherited.referrers[node]
+        assert lazy.reachable(node, False) == referring_index.reachable(node)
+        assert lazy.reachable(node, True, 2) == referrers_index.reachable(node, 2)
+        assert len(set(analysed)) == len(analysed)
@@ -0,0 +1,46 @@
+from typing import List
+
+from printers.graph_algorithms import iter_bits
+from printers.name_index import NameIndex
+
+from . import fakes
+from .fakes import Contract
+
+
+def _index(contracts: List[Contract]) -> NameIndex:
+    return NameIndex(fakes.graph(contracts))
+
+
+def test_selectors():
+    index = _index(
+        [
+            Contract("src/tokens/Token.sol", "Token"),
+            Contract("src/mocks/Token.sol", "Token"),
+            Contract("src/tokens/TokenVault.sol", "TokenVault"),
+            Contract("src/pools/Pool.sol", "PoolV2"),
+            Contract("src/pools/Pool.sol", "PoolV3"),
+        ]
+    )
+
+    def select(selector: str):
+        return list(iter_bits(index.select(selector)))
+
+    assert select("Token") == [0, 1]
+    assert select("token") == []
+    assert select("Token*") == [0, 1, 2]
+    assert select("re:Pool") == []
+    assert select(r"re:PoolV\d") == [3, 4]
+    assert select("src/mocks/Token.sol:Token") == [1]
+    assert select("src/tokens/*:Token*") == [0, 2]
+    assert select("src/pools/Pool.sol:re:x") == []
+    assert index.is_ambiguous("Token") and not index.is_ambiguous("TokenVault")
+
+    mask, unmatched = index.select_all(["TokenVault", "Missing", "PoolV3"])
+    assert list(iter_bits(mask)) == [2, 4]
+    assert unmatched == ["Missing"]
+
+
+def test_select_many():
+    index = _index([Contract(f"src/C{i}.sol", f"{'Pool' if i % 2 else 'Vault'}{i}") for i in range(20_000)])
+    mask = index.select("Pool*")
+    assert bin(mask).count("1") == 10_000
@@ -0,0 +1,33 @@
+import json
+from pathlib import Path
+
+from printers.profiling import Profiler
+
+
+def test_profiler(tmp_path: Path):
+    profiler = Profiler(True)
+    for _ in range(3):
+        with profiler.phase("build"):
+            sum(range(10_000))
+    profiler.begin("output")
+    profiler.end("output")
+    profiler.end("never started")
+    profiler.count("edges", 2)
+    profiler.count("edges", 3)
+
+    p = tmp_path / "profile.json"
+    profiler.dump(p)
+    report = json.loads(p.read_text())
+    assert list(report["phases"]) == ["build", "output"]
+    assert report["phases"]["build"] > 0
+    assert report["counters"] == {"edges": 5}
+    assert report["peak_rss"] is None or report["peak_rss"] > 0
+
+
+def test_disabled_profiler():
+    profiler = Profiler(False)
+    with profiler.phase("build"):
+        pass
+    profiler.count("edges", 1)
+    assert profiler.report()["phases"] == {}
+    assert profiler.report()["counters"] == {}
@@ -0,0 +1,206 @@
+import socket
+import threading
+from pathlib import Path
+
+import pytest
+
+from printers.query_client import QueryClient
+from printers.query_server import GraphSnapshot, QueryError, QueryServer, answer
+from printers.reference_graph import InheritedReferenceGraph, ReferenceGraph
+
+from . import fakes
+
+
+def _graph(edges, names=("Vault", "Pool", "Token", "Router"), bases=None) -> ReferenceGraph:
+    # Vault -> Pool -> Token, Router -> Pool, Token -> Token
+    contracts = []
+    for name in names:
+        contract_bases = [contracts[base] for base in (bases or {}).get(name, ())]
+        contracts.append(fakes.Contract(f"src/{name}.sol", name, contract_bases))
+    return fakes.graph(contracts, edges)
+
+
+def _snapshot(graph: ReferenceGraph) -> GraphSnapshot:
+    return GraphSnapshot(graph, InheritedReferenceGraph(graph), 1)
+
+
+def _publish(server: QueryServer, graph: ReferenceGraph) -> None:
+    server.publish(graph, InheritedReferenceGraph(graph))
+
+
+EDGES = [(0, 1), (1, 2), (3, 1), (2, 2)]
+
+
+def _keys(result):
+    return [item["key"] for item in result]
+
+
+def test_answer():
+    snapshot = _snapshot(_graph(EDGES))
+
+    assert _keys(answer(snapshot, {"query": "referrers", "contract": "Pool"})) == ["src/Vault.sol:Vault", "src/Router.sol:Router"]
+    assert _keys(answer(snapshot, {"query": "referring", "contract": "Vault"})) == ["src/Pool.sol:Pool"]
+    assert _keys(answer(snapshot, {"query": "referring", "contract": "Vault", "transitive": True})) == [
+        "src/Pool.sol:Pool",
+        "src/Token.sol:Token",
+    ]
+    assert _keys(answer(snapshot, {"query": "referrers", "contract": "Token", "depth": 1})) == [
+        "src/Pool.sol:Pool",
+        "src/Token.sol:Token",
+    ]
+    assert answer(snapshot, {"query": "path", "from": "Router", "to": "Token"}) == [
+        "src/Router.sol:Router",
+        "src/Pool.sol:Pool",
+        "src/Token.sol:Token",
+    ]
+    assert answer(snapshot, {"query": "path", "from": "Token", "to": "Vault"}) is None
+    assert _keys(answer(snapshot, {"query": "contracts", "contract": "*o*"})) == [
+        "src/Pool.sol:Pool",
+        "src/Token.sol:Token",
+        "src/Router.sol:Router",
+    ]
+    assert answer(snapshot, {"query": "status"})["contracts"] == 4
+
+
+def test_answer_inherited():
+    # Pool -> Token, StablePool is Pool, Vault -> Pool
+    graph = _graph([(1, 0), (3, 1)], names=("Token", "Pool", "StablePool", "Vault"), bases={"StablePool": [1]})
+    snapshot = _snapshot(graph)
+
+    # StablePool refers to what Pool refers to, Vault refers to everything derived from Pool
+    assert _keys(answer(snapshot, {"query": "referring", "contract": "StablePool"})) == ["src/Token.sol:Token"]
+    assert _keys(answer(snapshot, {"query": "referrers", "contract": "StablePool"})) == ["src/Vault.sol:Vault"]
+    assert _keys(answer(snapshot, {"query": "referrers", "contract": "Token", "transitive": True})) == [
+        "src/Pool.sol:Pool",
+        "src/StablePool.sol:StablePool",
+        "src/Vault.sol:Vault",
+    ]
+    assert answer(snapshot, {"query": "path", "from": "Vault", "to": "Token"}) == [
+        "src/Vault.sol:Vault",
+        "src/Pool.sol:Pool",
+        "src/Token.sol:Token",
+    ]
+
+
+@pytest.mark.parametrize(
+    "request_",
+    [
+        {"query": "referrers", "contract": "Missing"},
+        {"query": "referrers"},
+        {"query": "referring", "contract": "Vault", "depth": 0},
+        {"query": "unknown"},
+    ],
+)
+def test_answer_errors(request_):
+    with pytest.raises(QueryError):
+        answer(_snapshot(_graph(EDGES)), request_)
+
+
+@pytest.fixture
+def server(tmp_path: Path):
+    server = QueryServer(tmp_path / "ccr.sock")
+    server.start()
+    yield server
+    server.stop()
+
+
+def test_server_concurrent_clients(server: QueryServer):
+    with QueryClient(server.path) as client:
+        assert client.request("status")["error"] == "The graph is not built yet"
+    _publish(server, _graph(EDGES))
+
+    errors = []
+
+    def ask():
+        try:
+            with QueryClient(server.path) as client:
+                for _ in range(50):
+                    response = client.request("referrers", contract="Pool")
+                    assert response["id"] > 0
+                    assert _keys(response["result"]) == ["src/Vault.sol:Vault", "src/Router.sol:Router"]
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=ask) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert errors == []
+
+
+def test_server_slow_query(server: QueryServer):
+    graph = _graph(EDGES)
+    snapshot = server.publish(graph, InheritedReferenceGraph(graph))
+    started = threading.Event()
+    release = threading.Event()
+
+    def slow_path(sources: int, targets: int):
+        started.set()
+        release.wait(10)
+        return None
+
+    snapshot.path = slow_path
+    responses = []
+
+    def ask_path():
+        with QueryClient(server.path) as client:
+            responses.append(client.request("path", **{"from": "Vault", "to": "Token"}))
+
+    thread = threading.Thread(target=ask_path)
+    thread.start()
+    try:
+        assert started.wait(10)
+        # answered while the path query is still running
+        with QueryClient(server.path, timeout=5) as client:
+            assert client.request("status")["result"]["contracts"] == 4
+    finally:
+        release.set()
+        thread.join()
+    assert responses[0]["result"] is None
+
+
+def test_server_publish(server: QueryServer):
+    _publish(server, _graph(EDGES))
+    with QueryClient(server.path) as client:
+        first = client.request("referrers", contract="Pool")
+        # a newer build is served on the same connection
+        _publish(server, _graph([(0, 1), (1, 2)]))
+        second = client.request("referrers", contract="Pool")
+        invalid = client.request("referring", contract="re:(")
+
+    assert (first["generation"], second["generation"]) == (1, 2)
+    assert _keys(second["result"]) == ["src/Vault.sol:Vault"]
+    assert "error" in invalid
+
+
+def test_server_unexpected_error(server: QueryServer, monkeypatch):
+    def answer(snapshot, request):
+        raise KeyError("contract")
+
+    _publish(server, _graph(EDGES))
+    with QueryClient(server.path) as client:
+        monkeypatch.setattr("printers.query_server.answer", answer)
+        failed = client.request("referrers", contract="Pool")
+        monkeypatch.undo()
+        # the connection is still open
+        answered = client.request("referrers", contract="Pool")
+
+    assert failed == {"id": 1, "generation": 1, "error": "KeyError: 'contract'"}
+    assert _keys(answered["result"]) == ["src/Vault.sol:Vault", "src/Router.sol:Router"]
+
+
+def test_stale_socket(tmp_path: Path):
+    path = tmp_path / "ccr.sock"
+    stale = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    stale.bind(str(path))
+    stale.close()
+
+    server = QueryServer(path)
+    server.start()
+    try:
+        with pytest.raises(RuntimeError):
+            QueryServer(path).start()
+    finally:
+        server.stop()
+    assert not path.exists()
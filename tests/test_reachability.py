@@ -0,0 +1,46 @@
+import random
+from typing import List
+
+from printers.contract_cross_reference import transitive_adjacency
+from printers.graph_algorithms import iter_bits
+from printers.reachability import ReachabilityIndex
+
+
+def _random_rows(n: int, edges: int, seed: int) -> List[int]:
+    rng = random.Random(seed)
+    rows = [0] * n
+    for _ in range(edges):
+        rows[rng.randrange(n)] |= 1 << rng.randrange(n)
+    return rows
+
+
+def _bfs(rows: List[int], node: int, depth: int | None) -> int:
+    reached = 0
+    frontier = [node]
+    hops = 0
+    while frontier and (depth is None or hops < depth):
+        hops += 1
+        next_frontier = []
+        for current in frontier:
+            for successor in iter_bits(rows[current]):
+                if not reached >> successor & 1:
+                    reached |= 1 << successor
+                    next_frontier.append(successor)
+        frontier = next_frontier
+    return reached
+
+
+def test_reachable_matches_bfs():
+    for seed, (n, edges) in enumerate([(1, 0), (1, 1), (30, 20), (200, 250), (200, 600)]):
+        rows = _random_rows(n, edges, seed)
+        index = ReachabilityIndex(rows)
+        for node in range(n):
+            for depth in (None, 1, 2, 5):
+                assert index.reachable(node, depth) == _bfs(rows, node, depth), (seed, node, depth)
+
+
+def test_transitive_adjacency():
+    # 0 -> 1 -> 2 -> 1, 3 isolated with a self reference
+    adjacency = [[1], [2], [1], [3]]
+    assert transitive_adjacency(adjacency) == [[1, 2], [1, 2], [1, 2], [3]]
+    assert transitive_adjacency(adjacency, 1) == adjacency
@@ -0,0 +1,240 @@
+import weakref
+from typing import List
+
+import wake.ir as ir
+from wake.ir.enums import ContractKind, FunctionCallKind
+
+from printers.reference_graph import ReferenceGraph, ReferenceGraphBuilder, ReferenceKind, reference_usage
+from printers.reference_graph_cache import ReferenceGraphCache
+from printers.reference_graph_session import ReferenceGraphSession
+
+from .fakes import SourceUnit
+
+
+class _Node:
+    def __init__(self, parent):
+        self.parent = parent
+
+
+def _ir_node(cls, parent):
+    node = object.__new__(cls)
+    node._parent = weakref.ref(parent)
+    return node
+
+
+def _function_bodies(contract, functions: int, depth: int, references: int) -> List[_Node]:
+    leaves = []
+    for _ in range(functions):
+        node = _Node(contract)
+        for _ in range(depth):
+            node = _Node(node)
+        leaves.extend(_Node(node) for _ in range(references))
+    return leaves
+
+
+def test_inheritance_specifier_rule():
+    contract = object.__new__(ir.ContractDefinition)
+    specifier = _ir_node(ir.InheritanceSpecifier, contract)
+    argument = _Node(specifier)
+
+    builder = ReferenceGraphBuilder(inherit=False)
+    assert builder.find_contract_definition(argument) is None
+    assert builder.find_contract_definition(_Node(contract)) is contract
+    assert builder.find_contract_definition(argument) is None
+
+    builder = ReferenceGraphBuilder(inherit=True)
+    assert builder.find_contract_definition(argument) is contract
+
+
+def test_enclosing_contract_cache():
+    contract = object.__new__(ir.ContractDefinition)
+    references = _function_bodies(contract, functions=200, depth=30, references=20)
+
+    builder = ReferenceGraphBuilder(inherit=False)
+    for reference in references:
+        builder._enclosing_contracts.clear()
+        assert builder.find_contract_definition(reference) is contract
+    # every reference walks itself, its 31 ancestors in the function body and the contract
+    assert builder.parent_walk_steps == len(references) * 33
+
+    builder = ReferenceGraphBuilder(inherit=False)
+    for reference in references:
+        assert builder.find_contract_definition(reference) is contract
+    # only the first reference of a function body walks up, stopping at the contract cached by the first function,
+    # the other references stop at their cached parent
+    assert builder.parent_walk_steps == 33 + 199 * 32 + (len(references) - 200)
+
+
+class _Identifier:
+    def __init__(self, parent, source_unit, referenced_declaration):
+        self.parent = parent
+        self.source_unit = source_unit
+        self.referenced_declaration = referenced_declaration
+        self.statement = None
+        self.byte_location = (1, 5)
+
+
+def _contract(source_unit: SourceUnit, name: str):
+    contract = _ir_node(ir.ContractDefinition, source_unit)
+    contract._name = name
+    contract._kind = ContractKind.CONTRACT
+    contract._abstract = False
+    contract._linearized_base_contracts = []
+    source_unit.contracts.append(contract)
+    return contract
+
+
+def test_edges_collected_during_visit(monkeypatch):
+    a_unit, b_unit = SourceUnit("a.sol"), SourceUnit("b.sol")
+    a, b = _contract(a_unit, "A"), _contract(b_unit, "B")
+    walked = []
+    monkeypatch.setattr(
+        ReferenceGraphBuilder, "analyse_source_unit", lambda self, source_unit: walked.append(source_unit) or []
+    )
+
+    builder = ReferenceGraphBuilder(inherit=False)
+    builder.visit_source_unit(a_unit)
+    builder.visit_identifier(_Identifier(_Node(a), a_unit, b))
+    builder.visit_identifier(_Identifier(_Node(a), a_unit, b))
+    builder.visit_identifier(_Identifier(_Node(a), a_unit, a_unit))
+    # b.sol was not visited, a reference there must not be recorded as a complete unit
+    builder.visit_identifier(_Identifier(_Node(b), b_unit, a))
+
+    graph = builder.build([a, b])
+    assert walked == [b_unit]
+    assert graph.edge_kinds == {(0, 1): ReferenceKind.IDENTIFIER | ReferenceKind.TYPE_USE}
+    assert graph.edge_counts == {(0, 1): 2}
+
+
+def test_cached_source_units_not_recorded():
+    def rebuild(session: ReferenceGraphSession, a_source: bytes, b_source: bytes):
+        # every build has new IR, as after recompiling
+        a_unit, b_unit = SourceUnit("a.sol", a_source), SourceUnit("b.sol", b_source)
+        a, b = _contract(a_unit, "A"), _contract(b_unit, "B")
+        build = object()
+        builder = session.visit_builder(build, [a_unit, b_unit])
+        assert builder is not None
+        # a second printer with the same options does not record the build again
+        assert session.visit_builder(build, [a_unit, b_unit]) is None
+        # as wake visits the build
+        for source_unit, nodes in (
+            (a_unit, [_Identifier(_Node(a), a_unit, b), _Identifier(_Node(a), a_unit, b)]),
+            (b_unit, [_Identifier(_Node(b), b_unit, a)]),
+        ):
+            builder.visit_source_unit(source_unit)
+            for node in nodes:
+                builder.visit_identifier(node)
+        graph = session.refresh(build, [a, b])
+        assert session.builder is builder
+        assert graph.edge_counts == {(0, 1): 2, (1, 0): 1}
+        return builder
+
+    session = ReferenceGraphSession(False, ReferenceGraphCache(None, "settings"))
+    assert rebuild(session, b"a", b"b").references_resolved == 3
+    unchanged = rebuild(session, b"a", b"b")
+    assert (unchanged.references_resolved, unchanged.source_units_walked) == (0, 0)
+    assert rebuild(session, b"a", b"b2").references_resolved == 1
+
+
+def test_referenced_contracts(monkeypatch):
+    def build(a_source: bytes, a_target: str):
+        a_unit, b_unit, c_unit = SourceUnit("a.sol", a_source), SourceUnit("b.sol"), SourceUnit("c.sol")
+        contracts = [_contract(a_unit, "A"), _contract(b_unit, "B"), _contract(c_unit, "C")]
+        edges = {"a.sol": [("a.sol:A", f"{a_target.lower()}.sol:{a_target}", 1, 1, [])], "b.sol": [], "c.sol": []}
+        # contracts only hold weak references to their source units
+        return contracts, edges, [a_unit, b_unit, c_unit]
+
+    analysed = []
+
+    def analyse_source_unit(self, source_unit):
+        analysed.append(source_unit.source_unit_name)
+        return edges[source_unit.source_unit_name]
+
+    monkeypatch.setattr(ReferenceGraphBuilder, "analyse_source_unit", analyse_source_unit)
+    session = ReferenceGraphSession(False, ReferenceGraphCache(None, "settings"))
+    contracts, edges, source_units = build(b"a", "B")
+    # nothing was analysed before, the earlier references of a.sol are not known
+    assert session.referenced_contracts(contracts, ["a.sol", "d.sol"]) == {"d.sol": set()}
+    assert analysed == []
+
+    session.refresh(object(), contracts)
+    # A refers to C instead of B, both gain or lose a referrer
+    contracts, edges, source_units = build(b"a2", "C")
+    analysed.clear()
+    assert session.referenced_contracts(contracts, ["a.sol"]) == {"a.sol": {"b.sol:B", "c.sol:C"}}
+    assert analysed == ["a.sol"]
+    assert session.referenced_contracts(contracts, ["a.sol", "b.sol"]) == {"a.sol": {"c.sol:C"}, "b.sol": set()}
+    assert analysed == ["a.sol"]
+
+
+def test_weighted_edges_with_locations():
+    a_unit, b_unit = SourceUnit("a.sol"), SourceUnit("b.sol")
+    a, b = _contract(a_unit, "A"), _contract(b_unit, "B")
+
+    builder = ReferenceGraphBuilder(inherit=False, locations=True)
+    builder.visit_source_unit(a_unit)
+    builder.visit_identifier(_Identifier(_Node(a), a_unit, b))
+    builder.visit_identifier(_Identifier(_Node(a), a_unit, b))
+    builder.visit_identifier(_Identifier(_Node(a), a_unit, a))
+    assert sorted(builder.collected_edges(a_unit)) == [
+        ("a.sol:A", "a.sol:A", ReferenceKind.IDENTIFIER | ReferenceKind.TYPE_USE, 1, [1, 5]),
+        ("a.sol:A", "b.sol:B", ReferenceKind.IDENTIFIER | ReferenceKind.TYPE_USE, 2, [1, 5, 1, 5]),
+    ]
+
+
+def _call(expression, parent, kind=FunctionCallKind.FUNCTION_CALL):
+    call = _ir_node(ir.FunctionCall, parent)
+    call._kind = kind
+    call._expression = expression
+    return call
+
+
+def test_reference_usage():
+    source_unit = SourceUnit("a.sol")
+    target = _contract(source_unit, "B")
+    library = _contract(source_unit, "L")
+    library._kind = ContractKind.LIBRARY
+    body = _Node(_contract(source_unit, "A"))
+
+    # B(addr).f()
+    call = _call(None, body)
+    access = _ir_node(ir.MemberAccess, call)
+    call._expression = access
+    cast = _call(None, access, FunctionCallKind.TYPE_CONVERSION)
+    identifier = _ir_node(ir.Identifier, cast)
+    cast._expression = identifier
+    assert reference_usage(identifier, target) == ReferenceKind.EXTERNAL_CALL
+
+    # B(addr).f.selector
+    selector = _ir_node(ir.MemberAccess, body)
+    access._parent = weakref.ref(selector)
+    assert reference_usage(identifier, target) == ReferenceKind.CAST
+
+    specifier = _ir_node(ir.InheritanceSpecifier, body)
+    assert reference_usage(_ir_node(ir.IdentifierPath, specifier), target) == ReferenceKind.INHERITANCE
+    assert reference_usage(_ir_node(ir.IdentifierPath, specifier), library) == ReferenceKind.LIBRARY_USE
+    assert reference_usage(_ir_node(ir.IdentifierPath, body), target) == ReferenceKind.TYPE_USE
+
+
+def test_coupled_pairs_and_filtered():
+    graph = ReferenceGraph()
+    source_unit = SourceUnit("a.sol")
+    for name in "ABCD":
+        graph.add_node(_contract(source_unit, name))
+    graph.add_edge(0, 1, ReferenceKind.IDENTIFIER | ReferenceKind.TYPE_USE, 3)
+    graph.add_edge(1, 0, ReferenceKind.MEMBER_ACCESS | ReferenceKind.EXTERNAL_CALL, 2)
+    graph.add_edge(2, 3, ReferenceKind.IDENTIFIER | ReferenceKind.CAST, 5, [10, 15])
+    graph.add_edge(3, 3, ReferenceKind.IDENTIFIER | ReferenceKind.TYPE_USE, 9)
+    graph.add_edge(0, 2, ReferenceKind.IDENTIFIER | ReferenceKind.TYPE_USE, 1)
+
+    assert graph.coupled_pairs(10) == [(0, 1, 5), (2, 3, 5), (0, 2, 1)]
+    assert graph.coupled_pairs(1, ReferenceKind.EXTERNAL_CALL | ReferenceKind.CAST) == [(2, 3, 5)]
+    assert graph.coupled_pairs(10, mask=1 << 0) == [(0, 1, 5), (0, 2, 1)]
+
+    filtered = graph.filtered(ReferenceKind.CAST | ReferenceKind.EXTERNAL_CALL)
+    assert filtered.keys == graph.keys
+    assert filtered.referring == [set(), {0}, {3}, set()]
+    assert list(filtered.edge_locations[(2, 3)]) == [10, 15]
+
+    graph.remove_edges_from(2)
+    assert (2, 3) not in graph.edge_counts and (2, 3) not in graph.edge_locations
@@ -0,0 +1,105 @@
+import gc
+import weakref
+from pathlib import Path
+
+from printers.graph_algorithms import strongly_connected_components
+from printers.reference_graph_cache import ReferenceGraphCache
+
+from .fakes import ImportDirective, SourceUnit
+
+
+def test_strongly_connected_components():
+    # 0 -> 1 -> 2 -> 0, 2 -> 3
+    components = strongly_connected_components([[1], [2], [0, 3], []])
+    assert components == [[3], [2, 1, 0]]
+
+    # a long chain does not hit the recursion limit
+    n = 100_000
+    components = strongly_connected_components([[i + 1] for i in range(n - 1)] + [[]])
+    assert len(components) == n
+    assert components[0] == [n - 1]
+
+
+def test_cache_invalidates_importers(tmp_path: Path):
+    path = tmp_path / "cache.json"
+
+    def run(a_source: bytes, b_source: bytes, c_source: bytes):
+        b = SourceUnit("b.sol", b_source)
+        a = SourceUnit("a.sol", a_source, [b])
+        c = SourceUnit("c.sol", c_source)
+        cache = ReferenceGraphCache(path, "settings")
+        cache.prepare([a, b, c])
+        hits = {unit.source_unit_name: cache.get(unit) for unit in (a, b, c)}
+        for unit in (a, b, c):
+            if hits[unit.source_unit_name] is None:
+                cache.set(unit, [(f"{unit.source_unit_name}:X", "b.sol:B", 1, 1, [])])
+        cache.save()
+        return {name for name, edges in hits.items() if edges is None}
+
+    assert run(b"a", b"b", b"c") == {"a.sol", "b.sol", "c.sol"}
+    assert run(b"a", b"b", b"c") == set()
+    assert run(b"a", b"b2", b"c") == {"a.sol", "b.sol"}
+    assert run(b"a2", b"b2", b"c") == {"a.sol"}
+    assert run(b"a2", b"b2", b"c2") == {"c.sol"}
+
+    cache = ReferenceGraphCache(path, "other settings")
+    unit = SourceUnit("c.sol", b"c2")
+    cache.prepare([unit])
+    assert cache.get(unit) is None
+
+
+def test_import_cycle(tmp_path: Path):
+    a = SourceUnit("a.sol", b"a")
+    b = SourceUnit("b.sol", b"b", [a])
+    a.imports.append(ImportDirective(b))
+    cache = ReferenceGraphCache(tmp_path / "cache.json", "settings")
+    cache.prepare([a])
+    cache.set(a, [("a.sol:A", "b.sol:B", 2, 3, [10, 14, 40, 44, 90, 94]), ("a.sol:A", "a.sol:A", 1, 1, [])])
+    cache.save()
+
+    cache = ReferenceGraphCache(tmp_path / "cache.json", "settings")
+    cache.prepare([a])
+    assert cache.get(a) == [("a.sol:A", "b.sol:B", 2, 3, [10, 14, 40, 44, 90, 94]), ("a.sol:A", "a.sol:A", 1, 1, [])]
+
+
+def test_prepare_releases_previous_builds():
+    cache = ReferenceGraphCache(None, "settings")
+    builds = []
+    for build in range(5):
+        units = [SourceUnit(f"s{i}.sol", b"s") for i in range(100)]
+        cache.prepare(units)
+        for unit in units:
+            if cache.get(unit) is None:
+                cache.set(unit, [])
+        builds.append([weakref.ref(unit) for unit in units])
+        del units, unit
+    gc.collect()
+    assert sum(ref() is not None for refs in builds for ref in refs) == 0
+    # the entries themselves survive across builds
+    unit = SourceUnit("s0.sol", b"s")
+    cache.prepare([unit])
+    assert cache.get(unit) == []
+
+
+def test_save_drops_removed_files(tmp_path: Path):
+    path = tmp_path / "cache.json"
+    cache = ReferenceGraphCache(path, "settings")
+    a = SourceUnit("a.sol", b"a")
+    b = SourceUnit("b.sol", b"b")
+    cache.prepare([a, b])
+    cache.set(a, [])
+    cache.set(b, [])
+    cache.save()
+
+    # b.sol was deleted, a.sol is still cached so nothing is analysed
+    cache = ReferenceGraphCache(path, "settings")
+    a = SourceUnit("a.sol", b"a")
+    cache.prepare([a])
+    assert cache.get(a) == []
+    cache.save()
+
+    cache = ReferenceGraphCache(path, "settings")
+    b = SourceUnit("b.sol", b"b")
+    cache.prepare([a, b])
+    assert cache.get(a) == []
+    assert cache.get(b) is None
@@ -0,0 +1,203 @@
+import random
+from collections import deque
+from pathlib import Path
+from typing import List
+
+import pytest
+from wake.ir.enums import ContractKind
+
+from printers.graph_algorithms import iter_bits
+from printers.reference_graph import (
+    CyclicInheritanceError,
+    InheritedReferenceGraph,
+    ReferenceGraph,
+    ReferenceGraphBuilder,
+    ReferenceKind,
+)
+from printers.reference_graph_cache import ReferenceGraphCache
+from printers.reference_graph_session import ReferenceGraphSession, cache_path, drop_sessions, get_session
+
+from .fakes import Contract, SourceUnit, hierarchy, random_edges
+
+
+def _topsort_propagation(graph: ReferenceGraph):
+    # propagation as originally done by the graph printer: copy sets from parents to children in topological order
+    referrers = [set(s) for s in graph.referrers]
+    referring = [set(s) for s in graph.referring]
+    in_degree = [len(contract.base_contracts) for contract in graph.contracts]
+    queue = deque(i for i in range(len(graph)) if in_degree[i] == 0)
+    order = []
+    while queue:
+        current = queue.popleft()
+        order.append(current)
+        for child in graph.contracts[current].child_contracts:
+            in_degree[graph.index[child]] -= 1
+            if in_degree[graph.index[child]] == 0:
+                queue.append(graph.index[child])
+    for contract in order:
+        for child in map(graph.index.__getitem__, graph.contracts[contract].child_contracts):
+            for referrer in list(referrers[contract]):
+                referrers[child].add(referrer)
+                referring[referrer].add(child)
+            for referred in list(referring[contract]):
+                referring[child].add(referred)
+                referrers[referred].add(child)
+    return referring, referrers
+
+
+def test_inherited_matches_topsort_propagation():
+    for seed in range(5):
+        rng = random.Random(seed)
+        contracts = hierarchy(60, seed)
+        graph = ReferenceGraph()
+        for contract in contracts:
+            graph.add_node(contract)
+        for _ in range(80):
+            graph.add_edge(rng.randrange(60), rng.randrange(60), ReferenceKind.IDENTIFIER)
+
+        inherited = InheritedReferenceGraph(graph)
+        referring, referrers = _topsort_propagation(graph)
+        assert [set(iter_bits(mask)) for mask in inherited.referring] == referring
+        assert [set(iter_bits(mask)) for mask in inherited.referrers] == referrers
+
+
+def test_cyclic_inheritance():
+    a = Contract(SourceUnit("a.sol", b""), "A", [])
+    b = Contract(SourceUnit("b.sol", b""), "B", [a])
+    a.linearized_base_contracts.append(b)
+    graph = ReferenceGraph()
+    graph.add_node(a)
+    graph.add_node(b)
+
+    with pytest.raises(CyclicInheritanceError, match="a.sol:A, b.sol:B"):
+        InheritedReferenceGraph(graph)
+
+
+def test_session_updates_incrementally(monkeypatch):
+    rng = random.Random(0)
+    contracts = hierarchy(50, 1)
+    edges = random_edges(contracts, contracts, rng, 100)
+    analysed = []
+
+    def analyse_source_unit(self, source_unit):
+        analysed.append(source_unit.source_unit_name)
+        return edges[source_unit.source_unit_name]
+
+    monkeypatch.setattr(ReferenceGraphBuilder, "analyse_source_unit", analyse_source_unit)
+
+    session = ReferenceGraphSession(False, ReferenceGraphCache(None, "settings"))
+    session.refresh(object(), contracts)
+    session.inherited
+    assert len(analysed) == 50
+
+    for step in range(10):
+        analysed.clear()
+        changed = rng.choice(contracts)
+        changed.parent.file_source = f"edit {step}".encode()
+        edges.update(random_edges([changed], contracts, rng, 5))
+        build = object()
+        graph = session.refresh(build, contracts)
+        assert analysed == [changed.parent.source_unit_name]
+        assert session.refresh(build, contracts) is graph
+
+        fresh = ReferenceGraphBuilder(False).build(contracts)
+        assert graph.edge_kinds == fresh.edge_kinds
+        assert graph.referrers == fresh.referrers
+        expected = InheritedReferenceGraph(fresh)
+        assert session.inherited.referring == expected.referring
+        assert session.inherited.referrers == expected.referrers
+
+
+def test_session_updates_contract_kinds(monkeypatch):
+    monkeypatch.setattr(ReferenceGraphBuilder, "analyse_source_unit", lambda self, source_unit: [])
+    contracts = [Contract(SourceUnit("A.sol", b"0"), "A", []), Contract(SourceUnit("B.sol", b"0"), "B", [])]
+    session = ReferenceGraphSession(False, ReferenceGraphCache(None, "settings"))
+    assert session.refresh(object(), contracts).kinds == ["contract", "contract"]
+
+    # contract A -> abstract contract A, contract B -> interface B, same keys and bases
+    rebuilt = [
+        Contract(SourceUnit("A.sol", b"1"), "A", [], abstract=True),
+        Contract(SourceUnit("B.sol", b"1"), "B", [], ContractKind.INTERFACE),
+    ]
+    graph = session.refresh(object(), rebuilt)
+    assert graph.kinds == ["abstract", "interface"]
+    assert graph.node_mask(["contract"]) == 0
+
+
+def test_deep_hierarchy_propagation():
+    # OpenZeppelin-style: many contracts deriving from long chains of bases
+    rng = random.Random(2)
+    contracts: List[Contract] = []
+    for i in range(3_000):
+        bases = [contracts[-1]] if i % 30 else []
+        if contracts and rng.random() < 0.05:
+            bases.append(rng.choice(contracts))
+        contracts.append(Contract(SourceUnit(f"C{i}.sol", b""), f"C{i}", list(dict.fromkeys(bases))))
+    graph = ReferenceGraph()
+    for contract in contracts:
+        graph.add_node(contract)
+    for _ in range(15_000):
+        graph.add_edge(rng.randrange(3_000), rng.randrange(3_000), ReferenceKind.IDENTIFIER)
+
+    inherited = InheritedReferenceGraph(graph)
+    referring, referrers = _topsort_propagation(graph)
+    assert [set(iter_bits(mask)) for mask in inherited.referring] == referring
+    assert [set(iter_bits(mask)) for mask in inherited.referrers] == referrers
+
+
+def test_filter_10k_contracts():
+    # codebase of mostly interfaces: filtering must not be quadratic
+    rng = random.Random(3)
+    kinds = [ContractKind.INTERFACE] * 6 + [ContractKind.LIBRARY, ContractKind.CONTRACT, ContractKind.CONTRACT]
+    contracts = []
+    for i in range(12_000):
+        kind = rng.choice(kinds)
+        abstract = kind == ContractKind.CONTRACT and rng.random() < 0.2
+        contracts.append(Contract(SourceUnit(f"C{i}.sol", b""), f"C{i}", [], kind, abstract))
+    graph = ReferenceGraph()
+    for contract in contracts:
+        graph.add_node(contract)
+    for _ in range(60_000):
+        graph.add_edge(rng.randrange(12_000), rng.randrange(12_000), ReferenceKind.IDENTIFIER)
+    inherited = InheritedReferenceGraph(graph)
+
+    keep = graph.node_mask(["contract", "library"])
+    edges = [
+        (referrer, node)
+        for node in iter_bits(keep)
+        for referrer in iter_bits(inherited.referrers[node] & keep)
+    ]
+
+    kept = {
+        node
+        for node, contract in enumerate(contracts)
+        if contract.kind == ContractKind.LIBRARY or contract.kind == ContractKind.CONTRACT and not contract.abstract
+    }
+    assert set(iter_bits(keep)) == kept
+    assert sorted(edges, key=lambda e: (e[1], e[0])) == sorted(
+        ((source, target) for source, target in graph.edge_kinds if source in kept and target in kept),
+        key=lambda e: (e[1], e[0]),
+    )
+
+
+def test_drop_sessions(tmp_path: Path):
+    a = get_session(tmp_path / "a", False, "settings", False)
+    b = get_session(tmp_path / "b", False, "settings", False)
+    assert get_session(tmp_path / "a", False, "settings", False) is a
+
+    drop_sessions(tmp_path / "a")
+    assert get_session(tmp_path / "a", False, "settings", False) is not a
+    assert get_session(tmp_path / "b", False, "settings", False) is b
+
+
+def test_sessions_per_options(tmp_path: Path):
+    # the graph printer and contract-cross-reference --top run with different options on the same project
+    plain = get_session(tmp_path, False, "inherit=False;locations=False;", True)
+    located = get_session(tmp_path, False, "inherit=False;locations=True;", True, locations=True)
+    inherited = get_session(tmp_path, True, "inherit=True;locations=False;", True)
+
+    assert get_session(tmp_path, False, "inherit=False;locations=False;", True) is plain
+    assert get_session(tmp_path, False, "inherit=False;locations=True;", True, locations=True) is located
+    assert get_session(tmp_path, True, "inherit=True;locations=False;", True) is inherited
+    assert len({cache_path(tmp_path, inherit, locations) for inherit in (False, True) for locations in (False, True)}) == 4
+    drop_sessions(tmp_path)
@@ -0,0 +1,107 @@
+import shutil
+import subprocess
+import threading
+from pathlib import Path
+
+import pytest
+
+from printers.render import Renderer, render_key
+
+
+class _Layout:
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, source: Path, target: Path, engine: str, format: str) -> None:
+        self.calls.append((source.name, engine))
+        target.write_text(f"<svg>{engine} {source.read_text()}</svg>")
+
+
+def test_render_key():
+    assert render_key(b"digraph {}", "dot", "svg") == render_key(b"digraph {}", "dot", "svg")
+    assert render_key(b"digraph {}", "dot", "svg") != render_key(b"digraph {}", "neato", "svg")
+    assert render_key(b"digraph {}", "dot", "svg") != render_key(b"digraph {}", "dot", "png")
+    assert render_key(b"digraph {}", "dot", "svg") != render_key(b"digraph { A }", "dot", "svg")
+
+
+def test_unchanged_graphs_are_not_laid_out_again(tmp_path: Path):
+    out = tmp_path / "out"
+    out.mkdir()
+    sources = [out / f"C{i}.dot" for i in range(6)]
+    for i, source in enumerate(sources):
+        source.write_text(f"digraph {{ C{i} }}")
+    layout = _Layout()
+    renderer = Renderer(tmp_path / "cache", layout=layout)
+
+    results = renderer.render_all(sources, 3)
+    assert [result.path for result in results] == [source.with_suffix(".svg") for source in sources]
+    assert all(result.laid_out for result in results)
+    assert len(layout.calls) == 6
+
+    sources[2].write_text("digraph { changed }")
+    # a removed image is restored from the cache
+    sources[4].with_suffix(".svg").unlink()
+    results = renderer.render_all(sources, 3)
+    assert [result.laid_out for result in results] == [False, False, True, False, False, False]
+    assert len(layout.calls) == 7
+    assert sources[2].with_suffix(".svg").read_text() == "<svg>dot digraph { changed }</svg>"
+    assert sources[4].with_suffix(".svg").read_text() == "<svg>dot digraph { C4 }</svg>"
+
+    # a different engine is a different artifact, reverting a graph reuses its earlier layout
+    Renderer(tmp_path / "cache", engine="neato", layout=layout).render(sources[0])
+    assert layout.calls[-1] == ("C0.dot", "neato")
+    sources[2].write_text("digraph { C2 }")
+    assert not renderer.render(sources[2]).laid_out
+    assert sources[2].with_suffix(".svg").read_text() == "<svg>dot digraph { C2 }</svg>"
+
+    assert all(result.laid_out for result in Renderer(tmp_path / "cache", force=True, layout=layout).render_all(sources, 1))
+
+
+def test_failed_layout_is_skipped(tmp_path: Path):
+    sources = [tmp_path / f"C{i}.dot" for i in range(3)]
+    for i, source in enumerate(sources):
+        source.write_text(f"digraph {{ C{i} }}")
+    layout = _Layout()
+
+    def failing(source: Path, target: Path, engine: str, format: str) -> None:
+        if source.name == "C1.dot":
+            target.write_text("<svg>trunc")
+            raise subprocess.CalledProcessError(1, ["dot"], stderr=b"Error: syntax error in line 1")
+        layout(source, target, engine, format)
+
+    results = Renderer(tmp_path / "cache", layout=failing).render_all(sources, 2)
+    assert [result.error for result in results] == [None, "Error: syntax error in line 1", None]
+    assert not sources[1].with_suffix(".svg").exists()
+    assert sources[2].with_suffix(".svg").exists()
+    # no partial artifact is left in the cache
+    assert len(list((tmp_path / "cache").iterdir())) == 2
+
+
+def test_identical_graphs_render_concurrently(tmp_path: Path):
+    sources = [tmp_path / f"C{i}.dot" for i in range(2)]
+    for source in sources:
+        source.write_text("digraph { A }")
+    barrier = threading.Barrier(2)
+    targets = []
+
+    def layout(source: Path, target: Path, engine: str, format: str) -> None:
+        targets.append(target)
+        # both layouts of the same cache entry are in progress at once
+        barrier.wait(5)
+        target.write_text(f"<svg>{source.read_text()}</svg>")
+
+    results = Renderer(tmp_path / "cache", layout=layout).render_all(sources, 2)
+    assert targets[0] != targets[1]
+    assert all(result.path.read_text() == "<svg>digraph { A }</svg>" for result in results)
+
+
+def test_graphviz_layout(tmp_path: Path):
+    pytest.importorskip("graphviz")
+    if shutil.which("dot") is None:
+        pytest.skip("Graphviz binaries are not installed")
+
+    source = tmp_path / "graph.dot"
+    source.write_text("digraph { A -> B }")
+    result = Renderer(tmp_path / "cache").render(source)
+    assert result.laid_out
+    assert "<svg" in result.path.read_text()